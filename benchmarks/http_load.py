@@ -0,0 +1,180 @@
+"""
+A load test of the HTTP service mode against localhost.
+Starts this script as a server in a subprocess (serving its `echo` and `numbers` commands), and measures the
+throughput and latency of keep-alive clients hammering it.
+
+`http_load.py load-test` will run the benchmark with 8 connections for 5 seconds.
+`http_load.py check-examples` checks that examples/Examples.py is served, exiting with an error if it isn't.
+"""
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from scripto.app import Scripto
+
+script = Scripto("HTTP service mode load test", suppress_warnings=True)
+
+
+@script.register()
+def echo(value: str):
+    """
+    Returns its input, the cheapest possible command.
+    :param value: The value to return.
+    :return: The value.
+    """
+    return value
+
+
+@script.register()
+def numbers(count: int):
+    """
+    Streams a sequence of numbers.
+    :param count: The amount of numbers to stream.
+    :return: Generates the numbers.
+    """
+    yield from range(count)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("The server did not start")
+
+
+def client(port: int, path: str, deadline: float, latencies: list) -> None:
+    """
+    Sends requests over a single keep-alive connection until the deadline.
+    :param port: The port of the server.
+    :param path: The path to request.
+    :param deadline: The monotonic time to stop at.
+    :param latencies: The list to append the latency of every request to, in seconds.
+    :return: None
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Request failed with {response.status}")
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+@script.register()
+def load_test(connections: int = 8, duration: float = 5, workers: int = 8, stream: int = 0):
+    """
+    Measures the requests per second and latency percentiles of the HTTP service mode.
+    :param connections: The amount of concurrent keep-alive client connections.
+    :param duration: How long to send requests for, in seconds.
+    :param workers: The amount of server worker threads.
+    :param stream: Request the streaming `numbers` command with this many items, instead of `echo`.
+    :return: None
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--scripto-serve", f"127.0.0.1:{port}", "--scripto-jobs", str(workers)],
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(port)
+        path = f"/numbers?count={stream}" if stream else "/echo?value=hello"
+        per_client = [[] for _ in range(connections)]
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=client, args=(port, path, deadline, latencies))
+            for latencies in per_client
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = sorted(latency for latencies in per_client for latency in latencies)
+    if not latencies:
+        print("No requests completed")
+        return
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+    print(f"{'requests':>10} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print(
+        f"{len(latencies):>10} {len(latencies) / elapsed:>10.0f} "
+        f"{percentile(0.5):>10.3f} {percentile(0.99):>10.3f}"
+    )
+
+
+# Requests covering every command of examples/Examples.py - choice, boolean, list and set parameters.
+EXAMPLE_REQUESTS = {
+    "/test-func": ({"param_a": 2, "param_b": 3}, "a: 2, b: 3"),
+    "/bool-func": ({"super_long_parameter_name": True}, "success"),
+    "/list-func": ({"opt_arg": ["x", "y"]}, "x,y"),
+    "/set-func": ({"text": "foo"}, "foo"),
+}
+
+
+@script.register()
+def check_examples():
+    """
+    Serves examples/Examples.py, and checks that its index lists every command with a summary,
+    and that a request to every command succeeds.
+    :return: None
+    """
+    example = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples", "Examples.py")
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, example, "--scripto-serve", f"127.0.0.1:{port}"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        wait_for_server(port)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.request("GET", "/")
+        index = json.loads(connection.getresponse().read())["commands"]
+        missing = [path for path in EXAMPLE_REQUESTS if not index.get(path)]
+        if missing:
+            raise RuntimeError(f"Commands missing from the index, or listed without a summary: {missing}")
+        for path, (values, _) in EXAMPLE_REQUESTS.items():
+            connection.request("POST", path, body=json.dumps(values))
+            response = connection.getresponse()
+            body = response.read()
+            if response.status != 200:
+                raise RuntimeError(f"Requesting {path} failed with {response.status}: {body.decode()}")
+        connection.close()
+    finally:
+        server.terminate()
+        output, errors = server.communicate()
+    # The example commands print rather than return, so their output goes to the server's stdout.
+    printed = output.decode().splitlines()
+    for path, (_, expected) in EXAMPLE_REQUESTS.items():
+        if expected not in printed:
+            raise RuntimeError(f"{path} didn't print {expected!r}:\n{errors.decode()}")
+    print(f"Served all {len(EXAMPLE_REQUESTS)} commands of examples/Examples.py")
+
+
+if __name__ == "__main__":
+    script.run()
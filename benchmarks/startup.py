@@ -0,0 +1,80 @@
+"""
+A startup benchmark comparing the eager and lazy parser construction modes.
+Generates scripts with a growing number of registered commands, and measures how long
+`Scripto.run` takes to invoke a single one of them.
+
+`startup.py` will run the benchmark with 10, 100 and 1000 commands.
+"""
+
+import sys
+import time
+
+from scripto.app import Scripto
+
+script = Scripto("Parser construction startup benchmark")
+
+COMMAND_TEMPLATE = '''
+def command_{index}(path: str, count: int = 1, verbose: bool = False):
+    """
+    Synthetic command number {index}.
+    Does nothing, but has a docstring that needs to be parsed.
+    :param path: A positional parameter.
+    :param count: A parameter with a default value.
+    :param verbose: A boolean flag.
+    :return: None
+    """
+'''
+
+
+def build_script(commands: int, lazy: bool) -> Scripto:
+    """
+    Creates a script with the requested amount of synthetic commands.
+    :param commands: The amount of commands to register.
+    :param lazy: Whether the script should be built in lazy mode.
+    :return: The generated script.
+    """
+    namespace = {}
+    exec("".join(COMMAND_TEMPLATE.format(index=i) for i in range(commands)), namespace)
+    generated = Scripto("Benchmark", suppress_warnings=True, lazy=lazy)
+    for i in range(commands):
+        generated.register()(namespace[f"command_{i}"])
+    return generated
+
+
+def time_run(generated: Scripto, argv: list[str], repeat: int) -> float:
+    """
+    Measures the average time of a single run of the script.
+    :param generated: The script to run.
+    :param argv: The command line to run the script with.
+    :param repeat: How many runs to average over.
+    :return: The average run time in milliseconds.
+    """
+    original_argv = sys.argv
+    sys.argv = ["benchmark", *argv]
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            generated.run()
+        return (time.perf_counter() - start) * 1000 / repeat
+    finally:
+        sys.argv = original_argv
+
+
+@script.register()
+def startup(sizes: list[int] = (10, 100, 1000), repeat: int = 5):
+    """
+    Compares eager and lazy parser construction for scripts of different sizes.
+    :param sizes: The amounts of commands to benchmark with.
+    :param repeat: How many runs to average every measurement over.
+    :return: None
+    """
+    print(f"{'commands':>10} {'eager (ms)':>12} {'lazy (ms)':>12} {'speedup':>9}")
+    for size in sizes:
+        argv = [f"command-{size - 1}", "some/path", "--count", "3"]
+        eager = time_run(build_script(size, lazy=False), argv, repeat)
+        lazy = time_run(build_script(size, lazy=True), argv, repeat)
+        print(f"{size:>10} {eager:>12.2f} {lazy:>12.2f} {eager / lazy:>8.1f}x")
+
+
+if __name__ == "__main__":
+    script.run()
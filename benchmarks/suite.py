@@ -0,0 +1,241 @@
+"""
+A benchmark suite for the parser pipeline.
+Generates synthetic apps of N commands with M parameters each, covering every kind of parameter the parser handles
+(positional, defaulted, bool, list, and list/dict/set initializers), and measures the registration time,
+parser build time (eager and lazy), parse time and peak memory, along with the batch and shell throughput.
+
+`suite.py --output results.json` writes the results as JSON.
+`suite.py --save-baseline` stores them as the baseline, and following runs are compared against it,
+exiting with a non-zero code if any measurement regressed by more than the tolerance.
+Timings depend on the machine, so the baseline should be recorded on the machine it's compared on.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from scripto.app import Scripto
+
+script = Scripto("Parser pipeline benchmark suite", suppress_warnings=True)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Measurements where a higher value is better, every other measurement is better when lower.
+THROUGHPUT_METRICS = ("batch_records_per_s", "shell_lines_per_s")
+
+# The source, registration initializer and command line arguments of every kind of parameter.
+PARAMETER_KINDS = [
+    ("p{i}: str", None, ["value"]),
+    ("p{i}: int = {i}", None, ["--p{i}", "5"]),
+    ("p{i}: bool = False", None, ["--p{i}"]),
+    ("p{i}: list[int] = None", None, ["--p{i}", "1", "2", "3"]),
+    ('p{i}: str = "a"', ["a", "b", "c"], ["--p{i}", "b"]),
+    ('p{i}: str = "none"', {"lo{i}": "low", "hi{i}": "high"}, ["--lo{i}"]),
+    ('p{i}: str = "none"', {"s{i}a", "s{i}b"}, ["--s{i}a"]),
+]
+
+
+def _format(value, i: int):
+    if isinstance(value, str):
+        return value.format(i=i)
+    if isinstance(value, list):
+        return [_format(item, i) for item in value]
+    if isinstance(value, dict):
+        return {_format(key, i): item for key, item in value.items()}
+    return {_format(item, i) for item in value}
+
+
+def generate_app(commands: int, parameters: int):
+    """
+    Generates the source of the functions of a synthetic app.
+    :param commands: The amount of commands.
+    :param parameters: The amount of parameters of every command.
+    :return: A tuple of the source, the initializers of every command, and the arguments invoking the last command.
+    """
+    kinds = [PARAMETER_KINDS[i % len(PARAMETER_KINDS)] for i in range(parameters)]
+    # Positional parameters must come before the defaulted ones.
+    signature = ", ".join(
+        _format(kind[0], i) for i, kind in sorted(enumerate(kinds), key=lambda item: "=" in item[1][0])
+    )
+    params_doc = "".join(f"\n    :param p{i}: Parameter number {i}." for i in range(parameters))
+    source = "".join(
+        f'def command_{index}({signature}):\n    """\n    Synthetic command number {index}.'
+        f'{params_doc}\n    :return: None\n    """\n\n\n'
+        for index in range(commands)
+    )
+    initializers = {f"p{i}": _format(kind[1], i) for i, kind in enumerate(kinds) if kind[1] is not None}
+    argv = [f"command-{commands - 1}"]
+    for i, kind in enumerate(kinds):
+        argv += _format(kind[2], i)
+    return source, initializers, argv
+
+
+def register_app(source: str, initializers: dict, commands: int, lazy: bool = False) -> Scripto:
+    namespace = {}
+    exec(source, namespace)  # pylint: disable=exec-used
+    app = Scripto("Benchmark", suppress_warnings=True, lazy=lazy)
+    for index in range(commands):
+        app.register(**initializers)(namespace[f"command_{index}"])
+    return app
+
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+@contextlib.contextmanager
+def _silenced():
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def measure(commands: int, parameters: int, repeat: int, records: int) -> dict:
+    """
+    Runs all measurements for a single app size.
+    :param commands: The amount of commands.
+    :param parameters: The amount of parameters of every command.
+    :param repeat: How many times to repeat every timing, reporting the median.
+    :param records: The amount of batch records and shell lines to measure the throughput with.
+    :return: The measurements.
+    """
+    source, initializers, argv = generate_app(commands, parameters)
+    result = {"commands": commands, "parameters": parameters}
+    result["register_ms"] = _median_ms(lambda: register_app(source, initializers, commands), repeat)
+
+    app = register_app(source, initializers, commands)
+    lazy_app = register_app(source, initializers, commands, lazy=True)
+    # pylint: disable=protected-access
+    result["build_eager_ms"] = _median_ms(lambda: app._build_parser(argv), repeat)
+    result["build_lazy_ms"] = _median_ms(lambda: lazy_app._build_parser(argv), repeat)
+    parser = app._build_parser(argv)
+    result["parse_ms"] = _median_ms(lambda: parser.parse_args(argv), repeat * 10)
+
+    tracemalloc.start()
+    register_app(source, initializers, commands)._build_parser(argv)
+    result["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    line = " ".join(argv) + "\n"
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as batch_file:
+        batch_file.write(line * records)
+    try:
+        options = argparse.Namespace(batch=batch_file.name)
+        with _silenced():
+            elapsed = _median_ms(lambda: app._run_batch(options, []), repeat)
+        result["batch_records_per_s"] = records / elapsed * 1000
+    finally:
+        os.remove(batch_file.name)
+
+    def run_shell():
+        sys.stdin = io.StringIO(line * records)
+        app._run_shell("benchmark")
+
+    original_stdin = sys.stdin
+    try:
+        with _silenced():
+            elapsed = _median_ms(run_shell, repeat)
+        result["shell_lines_per_s"] = records / elapsed * 1000
+    finally:
+        sys.stdin = original_stdin
+    return result
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Compares results against a baseline, printing a table of the changes.
+    :param results: The measurements of this run.
+    :param baseline: The stored baseline, as written by a previous run.
+    :param tolerance: The relative change considered a regression, such as 0.2 for 20%.
+    :return: Descriptions of the regressions found.
+    """
+    stored = {(entry["commands"], entry["parameters"]): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"{'size':>10} {'metric':<22} {'baseline':>12} {'current':>12} {'change':>8}", file=sys.stderr)
+    for entry in results:
+        size = (entry["commands"], entry["parameters"])
+        if size not in stored:
+            continue
+        for metric, value in entry.items():
+            previous = stored[size].get(metric)
+            if metric in ("commands", "parameters") or not previous:
+                continue
+            change = value / previous - 1
+            worse = -change if metric in THROUGHPUT_METRICS else change
+            mark = " !" if worse > tolerance else ""
+            print(
+                f"{'%dx%d' % size:>10} {metric:<22} {previous:>12.3f} {value:>12.3f} {change:>+7.0%}{mark}",
+                file=sys.stderr,
+            )
+            if worse > tolerance:
+                regressions.append(f"{metric} of {size[0]}x{size[1]} regressed by {worse:.0%}")
+    return regressions
+
+
+@script.register()
+def suite(
+    commands: list[int] = (10, 100, 1000),
+    parameters: list[int] = (2, 8),
+    repeat: int = 5,
+    records: int = 2000,
+    output: str = None,
+    baseline: str = DEFAULT_BASELINE,
+    save_baseline: bool = False,
+    tolerance: float = 0.25,
+):
+    """
+    Benchmarks the parser pipeline over synthetic apps of every combination of sizes.
+    :param commands: The amounts of commands to benchmark with.
+    :param parameters: The amounts of parameters per command to benchmark with.
+    :param repeat: How many times to repeat every timing, reporting the median.
+    :param records: The amount of batch records and shell lines to measure the throughput with.
+    :param output: A path to write the results to as JSON, printed if not given.
+    :param baseline: The path of the baseline to compare the results against.
+    :param save_baseline: Store the results as the baseline, instead of comparing against it.
+    :param tolerance: The relative change considered a regression.
+    :return: None
+    """
+    results = [
+        measure(command_count, parameter_count, repeat, records)
+        for command_count in commands
+        for parameter_count in parameters
+    ]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    data = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as output_file:
+            output_file.write(data)
+    else:
+        print(data)
+    if save_baseline:
+        with open(baseline, "w", encoding="utf-8") as baseline_file:
+            baseline_file.write(data)
+        print(f"Baseline saved to {baseline}", file=sys.stderr)
+        return
+    if not os.path.exists(baseline):
+        print(f"No baseline at {baseline}, run with --save-baseline to store one", file=sys.stderr)
+        return
+    with open(baseline, "r", encoding="utf-8") as baseline_file:
+        regressions = compare(results, json.load(baseline_file), tolerance)
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    script.run()
@@ -2,9 +2,14 @@
 A utility module for all the various functions used in building the argument parser.
 """
 
+import argparse
+from copy import copy
 from types import FunctionType
-from typing import Tuple
+from typing import List, Tuple
 
+from scripto.Context import is_context
+from scripto.Converters import BulkConvertAction, argument_settings, is_sequence, unwrap_optional, with_choices
+from scripto.FileTypes import is_file_type
 from scripto.FuncUtils import (
     make_kebab_case,
     get_description,
@@ -13,6 +18,88 @@ from scripto.FuncUtils import (
 )
 
 
+class ArgumentParsingError(Exception):
+    """
+    Raised by RaisingArgumentParser instead of exiting the program.
+    """
+
+
+class ScriptoArgumentParser(argparse.ArgumentParser):
+    """
+    An argument parser passing the values of sequence parameters to their action as is, to be converted in bulk.
+    argparse otherwise runs every value through the type registry and the choices check separately.
+    """
+
+    def _get_values(self, action, arg_strings):
+        if isinstance(action, BulkConvertAction) and arg_strings:
+            # Like argparse, dropping the first '--' separating the values from the options.
+            if "--" in arg_strings:
+                arg_strings = list(arg_strings)
+                arg_strings.remove("--")
+            return arg_strings
+        return super()._get_values(action, arg_strings)
+
+
+class RaisingArgumentParser(ScriptoArgumentParser):
+    """
+    An argument parser raising an ArgumentParsingError on invalid arguments, instead of exiting the program.
+    Used when parsing many command lines in-process, where a single invalid one shouldn't stop the rest.
+    """
+
+    def error(self, message):
+        raise ArgumentParsingError(message)
+
+
+# Prefixes the runner options, so they can't collide with the parameters of the functions.
+RUNNER_OPTION_PREFIX = "--scripto-"
+RUNNER_HELP_FLAG = f"{RUNNER_OPTION_PREFIX}help"
+
+
+def split_runner_options(
+    runner_parser: argparse.ArgumentParser, argv: List[str]
+) -> Tuple[argparse.Namespace, List[str]]:
+    """
+    Splits the runner options at the start of the command line from the rest of it.
+    :param runner_parser: The parser holding the runner options.
+    :param argv: The command line arguments, excluding the program name.
+    :return: A tuple of the parsed runner options and the remaining arguments.
+    """
+    # pylint: disable=protected-access
+    actions = runner_parser._option_string_actions
+    index = 0
+    while index < len(argv):
+        flag, has_value, _ = argv[index].partition("=")
+        action = actions.get(flag)
+        if action is None:
+            break
+        index += 1
+        if has_value or action.nargs == 0:
+            continue
+        # Optional values must be attached with '=', as the next token might be the command.
+        if action.nargs != "?":
+            index += 1
+    return runner_parser.parse_args(argv[:index]), argv[index:]
+
+
+def make_optional(parser: argparse.ArgumentParser, dest: str) -> None:
+    """
+    Makes a parameter optional, for parameters receiving their value by other means than the command line.
+    Positional parameters take at most a single value, and mutually exclusive groups setting it are no longer required.
+    :param parser: The parser of the command.
+    :param dest: The name of the parameter.
+    :return: None
+    """
+    # pylint: disable=protected-access
+    actions = [action for action in parser._actions if action.dest == dest]
+    for action in actions:
+        if not action.option_strings and action.nargs is None:
+            action.nargs = "?"
+        action.required = False
+    for group in parser._mutually_exclusive_groups:
+        if any(action in group._group_actions for action in actions):
+            group.required = False
+
+
 def add_logging_flags(parser) -> None:
     """
     Adds logging flags to the parser.
@@ -78,23 +165,29 @@ def generate_action_settings(func: FunctionType):
     parameters = get_parameters(func)
     for param in parameters:
         original_parm_name = param["name"]
-        settings = {"type": param["type"], "help": param["description"]}
-        if param["type"] is bool:
+        annotation = unwrap_optional(param["type"])
+        if is_context(annotation):
+            # Injected when the function is called, never an argument.
+            continue
+        settings = {**argument_settings(annotation), "help": param["description"]}
+        if annotation is bool:
             name = param["name"]
             param["name"] = []
             param["name"].append(f"--{make_kebab_case(name)}")
             param["name"].append(f"-{name[0]}")
             settings["action"] = "store_true"
             settings.pop("type")
-        elif hasattr(param["type"], "__origin__") and param["type"].__origin__ is list:
+        elif is_sequence(annotation):
             name = param["name"]
             param["name"] = []
             param["name"].append(f"--{make_kebab_case(name)}")
             param["name"].append(f"-{name[0]}")
-            settings["nargs"] = "*"
-            settings["type"] = param["type"].__args__[0]
+        file_type = settings.get("type", settings.get("converter"))
+        if is_file_type(file_type):
+            settings["metavar"] = file_type.metavar
+            settings["help"] = f'{settings["help"]} {file_type.help}'.strip()
         if "default" in param:
-            if param["type"] is not bool:
+            if annotation is not bool:
                 name = (
                     param["name"]
                     if type(param["name"]) is not list
@@ -106,3 +199,114 @@ def generate_action_settings(func: FunctionType):
             settings["default"] = param["default"]
             settings["help"] += f' Defaults to {param["default"]} if not provided.'
         yield param["name"], settings
+
+
+def generate_parser_spec(func: FunctionType, arg_initializers: dict) -> dict:
+    """
+    Derives everything required to build the parser of a function, without building it.
+    The result is made of plain data, so it can be stored and used to re-create the parser later.
+    :param func: The function to generate the specification for.
+    :param arg_initializers: The registration arguments given for the function's parameters.
+    :return: A dictionary with the following keys:
+     - name: The default command name of the function.
+     - parser: The definitions for creating a sub-parser for the function.
+     - description: Text to append to the description of the parser.
+     - defaults: Default values to set on the parser.
+     - context: The names of the parameters taking the execution context, injected when calling the function.
+     - arguments: The arguments to add, in order. Each is either a dictionary with 'flags' and 'settings',
+        or a dictionary with 'required' and 'arguments' describing a mutually exclusive group.
+    """
+    name, definitions = generate_parser_definitions(func)
+    spec = {
+        "name": name,
+        "parser": definitions,
+        "description": "",
+        "defaults": {},
+        "context": [
+            param["name"] for param in get_parameters(func) if is_context(unwrap_optional(param["type"]))
+        ],
+        "arguments": [],
+    }
+    for name, settings in generate_action_settings(func):
+        flags = name if isinstance(name, list) else [name]
+        target_name = name
+        if isinstance(name, list):
+            target_name = name[0][2:].replace("-", "_")
+        if target_name not in arg_initializers:
+            spec["arguments"].append({"flags": flags, "settings": settings})
+            continue
+        # Copying, so generating the spec more than once won't accumulate defaults.
+        argument_values = copy(arg_initializers[target_name])
+        if isinstance(argument_values, list):
+            if settings.get("default") and settings.get("default") not in argument_values:
+                argument_values.append(settings["default"])
+            spec["arguments"].append(
+                {
+                    "flags": flags,
+                    "settings": {**with_choices(settings), "choices": sorted(argument_values)},
+                }
+            )
+        elif isinstance(argument_values, (dict, set)):
+            spec["description"] += f'\n\t{target_name} - {settings["help"]}'
+            values = (
+                argument_values.values()
+                if isinstance(argument_values, dict)
+                else argument_values
+            )
+            should_be_required = True
+            if settings.get("default") and settings.get("default") not in values:
+                should_be_required = False
+                spec["defaults"][target_name] = settings["default"]
+                if isinstance(argument_values, dict):
+                    argument_values[target_name] = settings["default"]
+                else:
+                    argument_values.add(settings["default"])
+            options = (
+                argument_values.items()
+                if isinstance(argument_values, dict)
+                else ((value, value) for value in argument_values)
+            )
+            spec["arguments"].append(
+                {
+                    "required": should_be_required,
+                    "arguments": [
+                        {
+                            "flags": [
+                                f"--{make_kebab_case(option)}",
+                                f"-{make_kebab_case(option)[0]}",
+                            ],
+                            "settings": {
+                                "dest": target_name,
+                                "action": "store_const",
+                                "const": value,
+                                "help": f"Sets {target_name} to {value}",
+                            },
+                        }
+                        for option, value in options
+                    ],
+                }
+            )
+    return spec
+
+
+def apply_parser_spec(parser, spec: dict) -> None:
+    """
+    Adds the arguments described by a parser specification to a parser.
+    :param parser: The parser to add the arguments to.
+    :param spec: The specification, as generated by generate_parser_spec.
+    :return: None
+    """
+    if spec["description"]:
+        # Parsers built outside of the command tree, such as those of the service mode, have no description.
+        parser.description = (parser.description or "") + spec["description"]
+    if spec["defaults"]:
+        parser.set_defaults(**spec["defaults"])
+    for argument in spec["arguments"]:
+        if "arguments" in argument:
+            mutex_group = parser.add_mutually_exclusive_group(
+                required=argument["required"]
+            )
+            for option in argument["arguments"]:
+                mutex_group.add_argument(*option["flags"], **option["settings"])
+        else:
+            parser.add_argument(*argument["flags"], **argument["settings"])
@@ -0,0 +1,140 @@
+"""
+Utilities for the batch mode, running a command once per record read from a file or stdin.
+"""
+
+import argparse
+import contextlib
+import json
+import shlex
+import sys
+from typing import Iterator, List, TextIO, Tuple
+
+from scripto.ArgParserUtils import ArgumentParsingError
+
+
+@contextlib.contextmanager
+def open_batch_source(path: str) -> Iterator[TextIO]:
+    """
+    Opens the source of the batch records.
+    :param path: The path of the file to read, or '-' for stdin.
+    :return: A context manager yielding the opened stream.
+    """
+    if path == "-":
+        yield sys.stdin
+    else:
+        with open(path, "r", encoding="utf-8") as source:
+            yield source
+
+
+def read_records(source: TextIO, record_format: str) -> Iterator[Tuple[int, object]]:
+    """
+    Lazily reads the batch records from a stream, skipping empty lines.
+    :param source: The stream to read.
+    :param record_format: 'lines' for shell-like argument lines, or 'json' for a JSON value per line.
+    :return: Generates tuples of the line number and the record.
+    """
+    for number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        if record_format == "json":
+            try:
+                yield number, json.loads(line)
+            except ValueError as e:
+                # Deferring the error, so it is reported as a failure of the record.
+                yield number, e
+        else:
+            yield number, line
+
+
+def find_command_parser(parser: argparse.ArgumentParser, command: str | None):
+    """
+    Finds the sub-parser of a command.
+    :param parser: The main parser.
+    :param command: The name or alias of the command.
+    :return: The sub-parser of the command, or the main parser if it has no sub-parsers.
+    """
+    # pylint: disable=protected-access
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            if command not in action.choices:
+                raise ArgumentParsingError(f"Unknown command: {command}")
+            return action.choices[command]
+    return parser
+
+
+def to_argument(value) -> str:
+    """
+    Converts a value into the command line argument representing it.
+    Mappings and nested lists are passed on as JSON, which their converters accept.
+    :param value: The value.
+    :return: The argument.
+    """
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value)
+    return str(value)
+
+
+def dict_to_argv(parser: argparse.ArgumentParser, values: dict) -> List[str]:
+    """
+    Converts a mapping of parameter names to values into the command line arguments setting them.
+    :param parser: The parser of the command.
+    :param values: The values of the parameters.
+    :return: The command line arguments.
+    """
+    # pylint: disable=protected-access
+    positionals = []
+    options = []
+    for key, value in values.items():
+        dest = key.replace("-", "_")
+        actions = [action for action in parser._actions if action.dest == dest]
+        if not actions:
+            raise ArgumentParsingError(f"Unknown parameter: {key}")
+        action = actions[0]
+        if not action.option_strings:
+            positionals.append((parser._actions.index(action), action, value))
+        elif isinstance(action, argparse._StoreTrueAction):
+            if value:
+                options.append(action.option_strings[0])
+        elif isinstance(action, argparse._StoreConstAction):
+            matching = [option for option in actions if option.const == value]
+            if not matching:
+                raise ArgumentParsingError(f"Invalid value for {key}: {value!r}")
+            options.append(matching[0].option_strings[0])
+        elif action.nargs == "*" and isinstance(value, (list, tuple)):
+            options.extend([action.option_strings[0], *map(to_argument, value)])
+        else:
+            options.extend([action.option_strings[0], to_argument(value)])
+    argv = []
+    for _, action, value in sorted(positionals, key=lambda item: item[0]):
+        if action.nargs == "*" and isinstance(value, (list, tuple)):
+            argv.extend(map(to_argument, value))
+        else:
+            argv.append(to_argument(value))
+    return argv + options
+
+
+def record_to_argv(
+    parser: argparse.ArgumentParser, prefix: List[str], record
+) -> List[str]:
+    """
+    Converts a batch record into the command line arguments it represents.
+    :param parser: The main parser of the script.
+    :param prefix: Arguments prepended to every record, usually the command to run.
+    :param record: The record - an argument line, a list of arguments, or a mapping of parameters to values.
+     When the script has several commands and no prefix is given, mappings select the command with a 'command' key.
+    :return: The full command line arguments of the record.
+    """
+    if isinstance(record, Exception):
+        raise ArgumentParsingError(f"Invalid record: {record}")
+    if isinstance(record, str):
+        return [*prefix, *shlex.split(record, comments=True)]
+    if isinstance(record, list):
+        return [*prefix, *map(str, record)]
+    if isinstance(record, dict):
+        values = dict(record)
+        command = prefix[0] if prefix else values.pop("command", None)
+        command_parser = find_command_parser(parser, command)
+        if command_parser is parser:
+            return [*prefix, *dict_to_argv(parser, values)]
+        return [*(prefix or [command]), *dict_to_argv(command_parser, values)]
+    raise ArgumentParsingError(f"Invalid record: {record!r}")
@@ -0,0 +1,329 @@
+"""
+Generates standalone entry point modules from scripts, with the parsers spelled out as literal argparse calls.
+The generated module never imports scripto.app, doesn't inspect any function and only imports the function it runs.
+Functions and types are referenced by module name, except for those of the script itself, which is usually not
+importable: its source is embedded in the generated module without its scripto registrations,
+and executed as a module of its own on first use.
+
+What the compiled module doesn't carry over from scripto: runner options (such as --scripto-batch
+and --scripto-output-format - outputs are printed as text), result caches, config sources, progress reporting
+and cancellation (contexts are never cancelled and don't report), and the script's Scripto instance itself.
+File parameters are still opened around the call, through scripto.FileTypes.
+"""
+
+import ast
+import builtins
+import inspect
+import os.path
+import sys
+from typing import List, Set, Tuple
+
+from scripto.Converters import Converter
+
+APP_MODULE = "scripto.app"
+# The names scripts run under - as a program, or as loaded by load_script - which can't be imported by name.
+SCRIPT_MODULES = ("__main__", "__scripto_script__")
+
+MODULE_HEADER = '''"""
+$DESCRIPTION
+
+Generated by scripto.compile from $SOURCE - regenerate instead of editing.
+"""
+
+import argparse
+import importlib
+import sys
+$DEFINITIONS
+
+def _load(module, qualname):
+    # The embedded definitions of the script are referenced by a None module.
+    target = _script() if module is None else importlib.import_module(module)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def _add_logging_flags(parser):
+    log_level = parser.add_mutually_exclusive_group()
+    for level, name in (("trace", "trace"), ("debug", "debug"), ("warn", "warning"), ("info", "info")):
+        log_level.add_argument(
+            f"--{level}", dest="log_level", action="store_const", const=level, help=f"Set log level to {name}"
+        )
+'''
+
+MODULE_FOOTER = '''
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(
+        description=$DESCRIPTION_LITERAL,
+        conflict_handler="resolve",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    $BUILD
+    args = parser.parse_args(argv)
+    func_args = {**vars(args)}
+    if len(func_args) == 0:
+        parser.print_help()
+        sys.exit(1)
+    func = _load(*func_args.pop("func"))
+    file_types = sys.modules.get("scripto.FileTypes")
+    if file_types is not None:
+        # Loaded by the parsers of file parameters - opening the files around the call, as scripto does.
+        func = file_types.with_files(func, func_args)
+    if "log_level" in func_args:
+        import logging
+
+        logging.basicConfig(level=func_args.pop("log_level"))
+    output = func(**func_args)
+    if hasattr(output, "__await__"):
+        import asyncio
+
+        output = asyncio.run(output)
+    if hasattr(output, "__next__"):
+        for item in output:
+            print(item, flush=True)
+    elif output:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+SINGLE_BUILD = """_build_0(parser)"""
+
+SCRIPT_DEFINITIONS = '''import types
+
+# The definitions of the script without its scripto registrations, blanked out to keep the line numbers of tracebacks.
+_SCRIPT_MODULE = "__scripto_script__"
+_SCRIPT_NAME = {name!r}
+_SCRIPT_SOURCE = "".join(
+    [
+{source}
+    ]
+)
+
+
+def _script():
+    # Executed once, so the types and functions loaded from the script match.
+    if _SCRIPT_MODULE not in sys.modules:
+        module = types.ModuleType(_SCRIPT_MODULE)
+        sys.modules[_SCRIPT_MODULE] = module
+        exec(compile(_SCRIPT_SOURCE, _SCRIPT_NAME, "exec"), vars(module))  # pylint: disable=exec-used
+    return sys.modules[_SCRIPT_MODULE]
+'''
+
+MULTI_BUILD = """sub = parser.add_subparsers(required=False)
+    # Building only the invoked command, or all of them for the help message and unknown commands.
+    builders = [_COMMANDS[argv[0]]] if argv and argv[0] in _COMMANDS else _BUILDERS
+    for build in builders:
+        build(sub)"""
+
+
+def _reference(value, scripts: Set[str]) -> Tuple[str | None, str]:
+    """
+    Creates a reference to a function or a type by its module name, as loaded by the generated module.
+    :param value: The function or type.
+    :param scripts: Collects the paths of the scripts defining the script-local values.
+    :return: The name of its module - None for the script itself - and its qualified name.
+    """
+    module = value.__module__
+    if module in SCRIPT_MODULES:
+        code = getattr(inspect.unwrap(value), "__code__", None)
+        scripts.add(code.co_filename if code is not None else sys.modules[module].__file__)
+        module = None
+    return module, value.__qualname__
+
+
+def _literal(value, scripts: Set[str]) -> str:
+    """
+    Renders a value as Python source.
+    :param value: The value to render.
+    :param scripts: Collects the paths of the scripts defining the script-local types.
+    :return: Source evaluating to the value.
+    """
+    if isinstance(value, type):
+        if getattr(builtins, value.__name__, None) is value:
+            return value.__name__
+        return f"_load{_literal(_reference(value, scripts), scripts)}"
+    if isinstance(value, Converter):
+        arguments = ", ".join(_literal(argument, scripts) for argument in value.arguments())
+        return f"_load{_literal(_reference(type(value), scripts), scripts)}({arguments})"
+    if isinstance(value, (list, tuple)):
+        items = ", ".join(_literal(item, scripts) for item in value)
+        return f"[{items}]" if isinstance(value, list) else f"({items}{',' if len(value) == 1 else ''})"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{_literal(k, scripts)}: {_literal(v, scripts)}" for k, v in value.items()) + "}"
+    source = repr(value)
+    try:
+        if ast.literal_eval(source) == value:
+            return source
+    except (ValueError, SyntaxError):
+        pass
+    raise ValueError(f"Cannot compile the value {source} into a literal")
+
+
+def _call(target: str, method: str, args: list, kwargs: dict, scripts: Set[str], *raw: str) -> str:
+    rendered = [_literal(arg, scripts) for arg in args]
+    rendered += [f"{key}={_literal(value, scripts)}" for key, value in kwargs.items()]
+    return f"{target}.{method}({', '.join([*rendered, *raw])})"
+
+
+def _render_arguments(target: str, spec: dict, scripts: Set[str]) -> List[str]:
+    """
+    Renders the argparse calls adding the arguments of a parser specification.
+    :param target: The name of the parser variable.
+    :param spec: The parser specification.
+    :param scripts: Collects the paths of the scripts defining the script-local types.
+    :return: The lines of source.
+    """
+    lines = []
+    if spec["description"]:
+        lines.append(f"{target}.description += {_literal(spec['description'], scripts)}")
+    if spec["defaults"]:
+        lines.append(_call(target, "set_defaults", [], spec["defaults"], scripts))
+    if spec.get("context"):
+        # A context that's never cancelled and doesn't report progress, as the runner options aren't available.
+        context = "_load('scripto.Context', 'Context')()"
+        lines.append(
+            _call(target, "set_defaults", [], {}, scripts, *(f"{name}={context}" for name in spec["context"]))
+        )
+    for argument in spec["arguments"]:
+        if "arguments" in argument:
+            lines.append(
+                f"group = {target}.add_mutually_exclusive_group(required={argument['required']!r})"
+            )
+            for option in argument["arguments"]:
+                lines.append(_call("group", "add_argument", option["flags"], option["settings"], scripts))
+        else:
+            lines.append(_call(target, "add_argument", argument["flags"], argument["settings"], scripts))
+    return lines
+
+
+def _names(node: ast.AST) -> Set[str]:
+    """
+    :param node: A node of a syntax tree.
+    :return: The dotted names the node and its children refer to, such as 'scripto.app.Scripto'.
+    """
+    names = set()
+    for child in ast.walk(node):
+        parts = []
+        while isinstance(child, ast.Attribute):
+            parts.append(child.attr)
+            child = child.value
+        if isinstance(child, ast.Name):
+            names.add(".".join([child.id, *reversed(parts)]))
+    return names
+
+
+def _uses(node: ast.AST, app_names: Set[str]) -> bool:
+    """
+    :param node: A node of a syntax tree.
+    :param app_names: The names bound to scripto.app or to what's created with it.
+    :return: Whether the node refers to scripto.app, or to any of the names.
+    """
+    return any(
+        name.split(".")[0] in app_names or name == APP_MODULE or name.startswith(APP_MODULE + ".")
+        for name in _names(node)
+    )
+
+
+def strip_registrations(source: str) -> str:
+    """
+    Blanks out the top level statements of a script which import or use scripto.app - its imports, the Scripto
+    instance, the registration decorators and calls, and running the script - keeping only its definitions.
+    The lines are blanked rather than removed, so the definitions keep their line numbers.
+    :param source: The source of the script.
+    :return: The source of its definitions.
+    """
+    lines = source.splitlines(keepends=True)
+    app_names = set()
+    stripped = []
+    for statement in ast.parse(source).body:
+        if isinstance(statement, ast.Import) and any(alias.name == APP_MODULE for alias in statement.names):
+            app_names.update(alias.asname for alias in statement.names if alias.asname)
+            stripped.append(statement)
+        elif isinstance(statement, ast.ImportFrom) and (
+            statement.module == APP_MODULE
+            or (statement.module == "scripto" and any(alias.name == "app" for alias in statement.names))
+        ):
+            app_names.update(alias.asname or alias.name for alias in statement.names)
+            stripped.append(statement)
+        elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            stripped += [decorator for decorator in statement.decorator_list if _uses(decorator, app_names)]
+        elif _uses(statement, app_names):
+            # Names assigned here hold the Scripto instance, or something made by it.
+            if isinstance(statement, (ast.Assign, ast.AnnAssign)):
+                targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+                app_names.update(name for target in targets for name in _names(target) if "." not in name)
+            stripped.append(statement)
+    for node in stripped:
+        for index in range(node.lineno - 1, node.end_lineno):
+            lines[index] = "\n"
+    return "".join(lines)
+
+
+def generate_module(
+    description: str,
+    source: str,
+    commands: List[Tuple[object, dict, str | None, List[str]]],
+    use_logger: bool,
+) -> str:
+    """
+    Generates the source of a standalone entry point module.
+    :param description: The description of the script.
+    :param source: The name of the compiled script, mentioned in the generated module.
+    :param commands: Tuples of the function, its parser specification, its name override and aliases.
+    :param use_logger: Whether the logging flags are added to every command.
+    :return: The source of the module.
+    """
+    single = len(commands) == 1
+    scripts = set()
+    blocks = []
+    table = []
+    for index, (func, spec, name, aliases) in enumerate(commands):
+        name = name or spec["name"]
+        if single:
+            body = _render_arguments("parser", spec, scripts)
+            signature = f"def _build_{index}(parser):"
+        else:
+            settings = {**spec["parser"], "aliases": aliases or []}
+            add_parser = _call(
+                "sub",
+                "add_parser",
+                [name],
+                settings,
+                scripts,
+                'conflict_handler="resolve"',
+                "formatter_class=argparse.RawDescriptionHelpFormatter",
+            )
+            body = [f"parser = {add_parser}", *_render_arguments("parser", spec, scripts)]
+            signature = f"def _build_{index}(sub):"
+            table += [f"    {command!r}: _build_{index}," for command in [name, *(aliases or [])]]
+        if use_logger:
+            body.append("_add_logging_flags(parser)")
+        body.append(f"parser.set_defaults(func={_literal(_reference(func, scripts), scripts)})")
+        blocks.append("\n\n" + signature + "\n" + "\n".join(f"    {line}" for line in body) + "\n")
+    module = MODULE_HEADER + "".join(blocks)
+    if not single:
+        module += "\n\n_COMMANDS = {\n" + "\n".join(table) + "\n}\n"
+        module += "_BUILDERS = [" + ", ".join(f"_build_{i}" for i in range(len(commands))) + "]\n"
+    module += MODULE_FOOTER
+    first_line = description.strip().splitlines()[0] if description.strip() else "Compiled script"
+    module = (
+        module.replace("$DESCRIPTION_LITERAL", repr(description))
+        .replace("$DESCRIPTION", first_line.replace('"""', "'''"))
+        .replace("$SOURCE", source)
+        .replace("$BUILD", SINGLE_BUILD if single else MULTI_BUILD)
+    )
+    if len(scripts) > 1:
+        raise ValueError(f"Cannot compile commands defined by several scripts: {', '.join(sorted(scripts))}")
+    definitions = ""
+    for path in scripts:
+        with open(path, encoding="utf-8") as script_file:
+            script_source = strip_registrations(script_file.read())
+        lines = "\n".join(f"        {line!r}," for line in script_source.splitlines(keepends=True))
+        definitions = SCRIPT_DEFINITIONS.format(name=os.path.basename(path), source=lines)
+    # Last, so the placeholders aren't looked for in the source of the script.
+    return module.replace("$DEFINITIONS", definitions)
@@ -0,0 +1,221 @@
+"""
+Shell completion support, based on a static index file that the shell reads directly.
+The index is generated along with the completion script, and regenerated by the completion script itself
+when completing a word after any of the source files of the commands was modified - the only time completion
+starts Python. Ordinary runs of the script never touch it, so they don't pay for building the parsers of every command.
+
+The index is a tab separated file, with the following line formats:
+ - 'src', followed by the path of a source file of the script or of its commands, checked for modifications.
+ - 'cmd', followed by a command name or alias.
+ - 'opt', followed by a command name (empty for single function scripts) and a flag.
+ - 'choice', followed by a command name, a flag (empty for positional arguments) and a possible value.
+"""
+
+import os
+import re
+import sys
+from typing import Iterable
+
+from scripto.SpecCache import get_cache_directory
+
+COMPLETION_FLAG = "--scripto-completion"
+SHELLS = ("bash", "zsh", "fish")
+# Passed to the completion flag instead of a shell, to only regenerate the index.
+INDEX_ONLY = "index"
+
+_LOGGING_FLAGS = ("--trace", "--debug", "--warn", "--info")
+
+BASH_TEMPLATE = r"""
+_scripto_complete_$ID() {
+    local index="$INDEX" script="$SCRIPT"
+    local cur="${COMP_WORDS[COMP_CWORD]}" prev="${COMP_WORDS[COMP_CWORD-1]}" command="" stale="" source
+    [[ -e "$index" ]] || stale=1
+    while [[ -z "$stale" ]] && IFS= read -r source; do
+        [[ "$source" -nt "$index" ]] && stale=1
+    done < <(awk -F'\t' '$1=="src"{print $2}' "$index" 2>/dev/null)
+    if [[ -n "$stale" ]]; then
+        "$PYTHON" "$script" $FLAG $INDEX_ONLY >/dev/null 2>&1
+    fi
+    [[ -r "$index" ]] || return
+    if grep -q "^cmd"$'\t' "$index"; then
+        if (( COMP_CWORD == 1 )); then
+            COMPREPLY=($(compgen -W "$(awk -F'\t' '$1=="cmd"{print $2}' "$index")" -- "$cur"))
+            return
+        fi
+        command="${COMP_WORDS[1]}"
+    fi
+    local words
+    words="$(awk -F'\t' -v c="$command" -v p="$prev" '$1=="choice" && $2==c && $3==p {print $4}' "$index")"
+    if [[ -z "$words" ]]; then
+        if [[ "$cur" == -* ]]; then
+            words="$(awk -F'\t' -v c="$command" '$1=="opt" && $2==c {print $3}' "$index")"
+        else
+            words="$(awk -F'\t' -v c="$command" '$1=="choice" && $2==c && $3=="" {print $4}' "$index")"
+        fi
+    fi
+    [[ -n "$words" ]] && COMPREPLY=($(compgen -W "$words" -- "$cur"))
+}
+complete -o default -F _scripto_complete_$ID $PROG
+"""
+
+ZSH_TEMPLATE = (
+    """
+autoload -U +X bashcompinit && bashcompinit
+"""
+    + BASH_TEMPLATE
+)
+
+FISH_TEMPLATE = r"""
+function __scripto_complete_$ID
+    set -l index "$INDEX"
+    set -l script "$SCRIPT"
+    set -l stale (test -e $index; or echo 1)
+    if not set -q stale[1]
+        for source in (awk -F'\t' '$1=="src"{print $2}' $index)
+            if command test "$source" -nt "$index"
+                set stale 1
+                break
+            end
+        end
+    end
+    if set -q stale[1]
+        "$PYTHON" "$script" $FLAG $INDEX_ONLY >/dev/null 2>&1
+    end
+    test -r $index; or return
+    set -l words (commandline -opc)
+    set -l cur (commandline -ct)
+    set -l command ""
+    if grep -q '^cmd'\t $index
+        if test (count $words) -eq 1
+            awk -F'\t' '$1=="cmd"{print $2}' $index
+            return
+        end
+        set command $words[2]
+    end
+    set -l choices (awk -F'\t' -v c="$command" -v p="$words[-1]" '$1=="choice" && $2==c && $3==p {print $4}' $index)
+    if test -n "$choices"
+        printf '%s\n' $choices
+    else if string match -q -- '-*' $cur
+        awk -F'\t' -v c="$command" '$1=="opt" && $2==c {print $3}' $index
+    else
+        awk -F'\t' -v c="$command" '$1=="choice" && $2==c && $3=="" {print $4}' $index
+    end
+end
+complete -c $PROG -a '(__scripto_complete_$ID)'
+"""
+
+TEMPLATES = {"bash": BASH_TEMPLATE, "zsh": ZSH_TEMPLATE, "fish": FISH_TEMPLATE}
+
+
+def get_index_path(script_path: str) -> str:
+    """
+    Returns the path of the completion index of a script.
+    Keyed by the absolute path of the script, so different scripts sharing a name don't share an index.
+    :param script_path: The path of the script.
+    :return: The path of the index file.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.sha256(os.path.abspath(script_path).encode()).hexdigest()[:16]
+    return get_cache_directory("completion", f"{os.path.basename(script_path)}-{digest}.idx")
+
+
+def _clean(value) -> str:
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+
+def _spec_lines(command: str, spec: dict, use_logger: bool):
+    """
+    Generates the index lines of a single command.
+    :param command: The command name (or alias), empty for single function scripts.
+    :param spec: The parser specification of the command.
+    :param use_logger: Whether the logging flags are added to the command.
+    :return: Generates index lines.
+    """
+    flags = ["-h", "--help", *(_LOGGING_FLAGS if use_logger else ())]
+    arguments = []
+    for argument in spec["arguments"]:
+        arguments.extend(argument.get("arguments", [argument]))
+    for argument in arguments:
+        options = [flag for flag in argument["flags"] if flag.startswith("-")]
+        flags.extend(options)
+        for choice in argument["settings"].get("choices") or ():
+            for option in options or [""]:
+                yield f"choice\t{command}\t{option}\t{_clean(choice)}"
+    for flag in flags:
+        yield f"opt\t{command}\t{flag}"
+
+
+def build_index(sources: Iterable[str], commands: list, use_logger: bool) -> str:
+    """
+    Builds the content of a completion index.
+    :param sources: The source files of the script and its commands, the index is stale once any is modified.
+    :param commands: A list of (names, spec) tuples, names being the command name and its aliases.
+     For single function scripts, the only name should be an empty string.
+    :param use_logger: Whether the logging flags are added to every command.
+    :return: The content of the index file.
+    """
+    lines = [f"src\t{_clean(source)}" for source in sorted(set(sources))]
+    for names, spec in commands:
+        for name in names:
+            if name:
+                lines.append(f"cmd\t{name}")
+            lines.extend(_spec_lines(name, spec, use_logger))
+    return "\n".join(lines) + "\n"
+
+
+def write_index(path: str, content: str) -> None:
+    """
+    Atomically writes a completion index, so a shell never reads a partially written file.
+    :param path: The path of the index file.
+    :param content: The content of the index.
+    :return: None
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as index_file:
+        index_file.write(content)
+    os.replace(temp_path, path)
+
+
+def sources_fingerprint(files: Iterable[str], names: Iterable[str]) -> str:
+    """
+    A cheap fingerprint of the registered functions, based on the modification times of their source files.
+    Cheap enough to be checked on every invocation by the daemon, unlike hashing the functions themselves.
+    :param files: The source files of the script and its registered functions.
+    :param names: Names identifying the registered functions, such as their qualified names.
+    :return: A hex digest identifying the current state of the sources.
+    """
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.sha256()
+    for filename in sorted(set(files)):
+        try:
+            mtime = os.stat(filename).st_mtime_ns
+        except OSError:
+            mtime = 0
+        digest.update(f"{filename}\0{mtime}\0".encode())
+    digest.update(",".join(names).encode())
+    return digest.hexdigest()
+
+
+def completion_script(shell: str, prog: str, script_path: str, index_path: str) -> str:
+    """
+    Generates the completion script for a shell.
+    :param shell: The shell to generate the script for.
+    :param prog: The name the script is invoked with.
+    :param script_path: The absolute path of the script, run to regenerate the index once it's modified.
+    :param index_path: The path of the completion index.
+    :return: The completion script, to be sourced by the shell.
+    """
+    identifier = re.sub(r"\W", "_", prog)
+    return (
+        TEMPLATES[shell]
+        .replace("$ID", identifier)
+        .replace("$INDEX_ONLY", INDEX_ONLY)
+        .replace("$INDEX", index_path)
+        .replace("$SCRIPT", script_path)
+        .replace("$PYTHON", sys.executable)
+        .replace("$FLAG", COMPLETION_FLAG)
+        .replace("$PROG", prog)
+    )
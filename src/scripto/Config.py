@@ -0,0 +1,300 @@
+"""
+Argument values read from configuration files and environment variables, used as the defaults of the parsers.
+Sources are layered, each taking precedence over the ones before it:
+
+- The user config - <config directory>/scripto/<script>.toml (or .json), with a table per command.
+- The project config - the nearest .scripto.toml (or .json) from the working directory up,
+  with a table per script, holding a table per command.
+- Environment variables - SCRIPTO_<COMMAND>_<PARAMETER>, such as SCRIPTO_TEST_FUNC_COUNT.
+- The command line, always taking precedence.
+
+Config files are parsed once, and stored in a compact form in the cache directory until they are modified.
+"""
+
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import sys
+import warnings
+from typing import Dict, List, Tuple
+
+from scripto.ArgParserUtils import make_optional
+from scripto.Batch import to_argument
+from scripto.Converters import BoolConverter, BulkConvertAction, SequenceConverter
+from scripto.SpecCache import get_cache_directory
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11.
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+ENVIRONMENT_PREFIX = "SCRIPTO_"
+PROJECT_CONFIG_NAME = ".scripto"
+CONFIG_SUFFIXES = (".toml", ".json")
+DEFAULT_SOURCE = "default"
+COMMAND_LINE_SOURCE = "command line"
+
+
+def get_config_directory(*parts: str) -> str:
+    """
+    Returns the scripto directory inside the user's config directory.
+    :param parts: Sub-directories to append to the path.
+    :return: The path of the directory, which might not exist.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA", os.path.expanduser("~/AppData/Roaming"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+    return os.path.join(base, "scripto", *parts)
+
+
+def _plain(value):
+    """
+    Converts parsed config values into the types marshal can store, keeping other values as strings.
+    :param value: The parsed value.
+    :return: The value, made of dictionaries, lists, strings, numbers and booleans.
+    """
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Such as the dates and times of TOML, converted again by the parameter's converter.
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _compact(content: dict, depth: int) -> dict:
+    """
+    Serializes the tables of the commands in a config separately, so a run only deserializes the table it uses.
+    :param content: The parsed config.
+    :param depth: The depth of the command tables - 1 when the config holds them directly,
+     or 2 when they are grouped by script.
+    :return: The config, with the command tables serialized.
+    """
+    if depth == 0:
+        return marshal.dumps(_plain(content))
+    return {str(key): _compact(item, depth - 1) for key, item in content.items() if isinstance(item, dict)}
+
+
+def _table(tables: dict, command: str) -> dict:
+    """
+    :param tables: Compacted command tables.
+    :param command: The name of the command.
+    :return: The deserialized table of the command, empty if missing.
+    """
+    table = tables.get(command)
+    return marshal.loads(table) if table is not None else {}
+
+
+class ConfigSources:
+    """
+    Reads the layered argument values of the commands of a script.
+    Parsed files are kept in memory, and stored in the cache directory keyed by their path,
+    along with their modification time and size, so they are only parsed again once modified.
+    """
+
+    _user_directory: str
+    _project_directory: str | None
+    _cache_directory: str
+    _parsed: Dict[str, Tuple[tuple, dict]]
+
+    def __init__(self, user_directory: str = None, project_directory: str = None, cache_directory: str = None):
+        """
+        :param user_directory: The directory of the user configs, defaults to the user's config directory.
+        :param project_directory: The directory to look for the project config from, up to the root.
+         Defaults to the working directory.
+        :param cache_directory: The directory to store the parsed configs in, defaults to the user's cache directory.
+        """
+        self._user_directory = user_directory or get_config_directory()
+        self._project_directory = project_directory
+        self._cache_directory = cache_directory or get_cache_directory("config")
+        self._parsed = {}
+
+    @staticmethod
+    def _find_file(directory: str, name: str) -> str | None:
+        for suffix in CONFIG_SUFFIXES:
+            path = os.path.join(directory, f"{name}{suffix}")
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _find_project_config(self) -> str | None:
+        directory = os.path.abspath(self._project_directory or os.getcwd())
+        while True:
+            path = self._find_file(directory, PROJECT_CONFIG_NAME)
+            if path is not None:
+                return path
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+
+    def _read(self, path: str, depth: int) -> dict:
+        """
+        Reads a config file, from memory or from the cache directory unless it was modified since it was parsed.
+        :param path: The path of the file.
+        :param depth: The depth of the command tables in the file, as passed to _compact.
+        :return: The compacted content of the file, or an empty dictionary if it can't be read.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if path in self._parsed and self._parsed[path][0] == stamp:
+            return self._parsed[path][1]
+        cache_path = os.path.join(
+            self._cache_directory, hashlib.sha256(os.path.abspath(path).encode()).hexdigest() + ".marshal"
+        )
+        try:
+            with open(cache_path, "rb") as cache_file:
+                cached_stamp, content = marshal.load(cache_file)
+            if tuple(cached_stamp) != stamp:
+                raise ValueError("Modified since it was cached")
+        except (OSError, EOFError, ValueError, TypeError):
+            content = _compact(self._parse(path), depth)
+            self._store(cache_path, stamp, content)
+        self._parsed[path] = (stamp, content)
+        return content
+
+    @staticmethod
+    def _parse(path: str) -> dict:
+        try:
+            if path.endswith(".toml"):
+                if tomllib is None:
+                    warnings.warn(f"Install tomli to read {path}, TOML is only supported natively on Python 3.11+")
+                    return {}
+                with open(path, "rb") as config_file:
+                    content = tomllib.load(config_file)
+            else:
+                with open(path, "r", encoding="utf-8") as config_file:
+                    content = json.load(config_file)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"Ignoring the invalid config {path}: {e}")
+            return {}
+        if not isinstance(content, dict):
+            warnings.warn(f"Ignoring the config {path}, which should hold a table per command")
+            return {}
+        return content
+
+    @staticmethod
+    def _store(cache_path: str, stamp: tuple, content: dict) -> None:
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, "wb") as cache_file:
+                marshal.dump((stamp, content), cache_file)
+            os.replace(temp_path, cache_path)
+        except (OSError, ValueError):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def layers(self, script: str) -> List[Tuple[str, dict]]:
+        """
+        Reads the config files of a script.
+        :param script: The name of the script, without its extension.
+        :return: Tuples of the name of the source and its compacted tables of commands,
+         from the lowest precedence up.
+        """
+        layers = []
+        user_path = self._find_file(self._user_directory, script)
+        if user_path is not None:
+            layers.append((f"user config {user_path}", self._read(user_path, 1)))
+        project_path = self._find_project_config()
+        if project_path is not None:
+            tables = self._read(project_path, 2).get(script)
+            if tables is not None:
+                layers.append((f"project config {project_path}", tables))
+        return layers
+
+    @staticmethod
+    def environment_variable(command: str, dest: str) -> str:
+        """
+        :param command: The name of the command.
+        :param dest: The name of the parameter.
+        :return: The name of the environment variable setting the parameter.
+        """
+        return f"{ENVIRONMENT_PREFIX}{command}_{dest}".upper().replace("-", "_")
+
+    def values(self, script: str, command: str, dests: List[str]) -> Dict[str, Tuple[object, str]]:
+        """
+        Merges the values of the parameters of a command from all sources.
+        :param script: The name of the script, without its extension.
+        :param command: The name of the command.
+        :param dests: The names of the parameters of the command.
+        :return: A mapping of parameter names to tuples of the value and the name of the source it came from.
+        """
+        merged = {}
+        for source, tables in self.layers(script):
+            for key, value in _table(tables, command).items():
+                dest = key.replace("-", "_")
+                if dest in dests:
+                    merged[dest] = (value, source)
+        for dest in dests:
+            variable = self.environment_variable(command, dest)
+            if variable in os.environ:
+                merged[dest] = (os.environ[variable], f"environment {variable}")
+        return merged
+
+
+def _convert(action: argparse.Action, actions: List[argparse.Action], value):
+    """
+    Converts a value read from a config source as the command line value of an action would be.
+    :param action: The action of the parameter.
+    :param actions: All actions storing into the parameter, such as the flags of a mutually exclusive group.
+    :param value: The value, a string unless read from a config file.
+    :return: The converted value.
+    """
+    if isinstance(action, argparse._StoreTrueAction):  # pylint: disable=protected-access
+        return value if isinstance(value, bool) else BoolConverter()(to_argument(value))
+    if isinstance(action, argparse._StoreConstAction):  # pylint: disable=protected-access
+        for option in actions:
+            if option.const == value or str(option.const) == to_argument(value):
+                return option.const
+        raise ValueError(f"expected one of: {', '.join(str(option.const) for option in actions)}")
+    if isinstance(action, BulkConvertAction):
+        values = value if isinstance(value, list) else SequenceConverter(str)(value)
+        return action.collection(map(action.converter, map(to_argument, values)))
+    if action.nargs == "*":
+        values = value if isinstance(value, list) else SequenceConverter(str)(value)
+        return [action.type(to_argument(item)) if action.type else item for item in values]
+    converted = action.type(to_argument(value)) if action.type else value
+    if action.choices is not None and converted not in action.choices:
+        raise ValueError(f"expected one of: {', '.join(map(str, action.choices))}")
+    return converted
+
+
+def apply_config(parser: argparse.ArgumentParser, values: Dict[str, Tuple[object, str]]) -> Dict[str, Tuple[object, str]]:
+    """
+    Sets the values of config sources as the defaults of a parser, so arguments given on the command line override them.
+    Positional parameters and required groups with a configured value become optional.
+    Invalid values are skipped with a warning.
+    :param parser: The parser of the command.
+    :param values: The values, as returned by ConfigSources.values.
+    :return: The converted values that were applied, with their sources.
+    """
+    # pylint: disable=protected-access
+    applied = {}
+    for dest, (value, source) in values.items():
+        actions = [action for action in parser._actions if action.dest == dest]
+        if not actions:
+            continue
+        try:
+            applied[dest] = (_convert(actions[0], actions, value), source)
+        except (ValueError, TypeError, argparse.ArgumentTypeError) as e:
+            warnings.warn(f"Ignoring the value of {dest} from {source}: {value!r} ({e})")
+            continue
+        make_optional(parser, dest)
+    if applied:
+        parser.set_defaults(**{dest: value for dest, (value, _) in applied.items()})
+    return applied
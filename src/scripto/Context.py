@@ -0,0 +1,377 @@
+"""
+The execution context of a command, injected into parameters annotated with Context:
+
+    @script.register()
+    def process(paths: list[str], ctx: Context):
+        ctx.progress(total=len(paths))
+        for path in paths:
+            handle(path)
+            ctx.advance()
+
+The context reports progress (rendered to stderr at most a few times a second, or as JSON events),
+and carries the cancellation token of the run - cancelled by Ctrl-C, or once the --scripto-timeout deadline passes.
+advance() is a counter increment in the common case, and checks for cancellation (raising Cancelled)
+whenever it reports, so commands reporting their progress are cancellable for free.
+"""
+
+import contextlib
+import signal
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, List, TextIO
+
+from scripto.Output import is_stream
+
+PROGRESS_FORMATS = ("auto", "text", "json", "off")
+# The minimal amount of seconds between progress reports.
+REPORT_INTERVAL = 0.1
+TIMEOUT_EXIT_CODE = 124
+INTERRUPT_EXIT_CODE = 130
+
+
+class Cancelled(BaseException):
+    """
+    Raised once a run is cancelled. Derives from BaseException like KeyboardInterrupt,
+    so it isn't swallowed by handlers of regular errors, such as the failure reporting of batches.
+    """
+
+    exit_code: int
+
+    def __init__(self, reason: str, exit_code: int = INTERRUPT_EXIT_CODE):
+        super().__init__(reason)
+        self.exit_code = exit_code
+
+
+class CancellationToken:
+    """
+    The cooperative cancellation state of a run, shared by the contexts of all calls it makes.
+    """
+
+    __slots__ = ("_event", "deadline", "reason", "exit_code", "cooperative")
+
+    def __init__(self, timeout: float = None):
+        """
+        :param timeout: The amount of seconds until the token is cancelled, never if not given.
+        """
+        self._event = threading.Event()
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.reason = None
+        self.exit_code = INTERRUPT_EXIT_CODE
+        # Whether a command is checking the token, otherwise an interrupt stops the command right away.
+        self.cooperative = False
+
+    def cancel(self, reason: str = "Cancelled", exit_code: int = INTERRUPT_EXIT_CODE) -> None:
+        """
+        Cancels the run. Has no effect on an already cancelled token.
+        :param reason: The reason, reported when the run stops.
+        :param exit_code: The exit code of the run.
+        :return: None
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self.exit_code = exit_code
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        :return: Whether the run was cancelled, or its deadline passed.
+        """
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("Timed out", TIMEOUT_EXIT_CODE)
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """
+        Raises Cancelled if the run was cancelled.
+        :return: None
+        """
+        if self.cancelled:
+            raise Cancelled(self.reason, self.exit_code)
+
+    def remaining(self) -> float | None:
+        """
+        :return: The amount of seconds until the deadline, or None if there is none.
+        """
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def guard(self, output):
+        """
+        Stops streamed output once the run is cancelled, after the items produced so far were written.
+        :param output: The output of a command.
+        :return: The output, checking the token before every item of streams.
+        """
+        if not is_stream(output):
+            return output
+
+        def guarded():
+            try:
+                for item in output:
+                    self.check()
+                    yield item
+            finally:
+                close = getattr(output, "close", None)
+                if close is not None:
+                    close()
+
+        return guarded()
+
+
+@contextlib.contextmanager
+def handle_signals(token: CancellationToken) -> Iterator[None]:
+    """
+    Cancels the token on Ctrl-C, and once its deadline passes, while running a command.
+    Commands checking the token stop at their next check, others are stopped right away,
+    as is any command on a second Ctrl-C.
+    Only applies in the main thread, where signal handlers can be installed. The deadline is only
+    enforced on commands that never check the token where SIGALRM is available.
+    :param token: The cancellation token of the run.
+    :return: A context manager handling the signals while active.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def interrupt(signum, frame):  # pylint: disable=unused-argument
+        if token.cooperative and not token.cancelled:
+            token.cancel("Interrupted")
+            return
+        raise KeyboardInterrupt
+
+    def alarm(signum, frame):  # pylint: disable=unused-argument
+        token.cancel("Timed out", TIMEOUT_EXIT_CODE)
+        if not token.cooperative:
+            raise Cancelled(token.reason, token.exit_code)
+
+    previous_interrupt = signal.signal(signal.SIGINT, interrupt)
+    remaining = token.remaining()
+    timer = remaining is not None and hasattr(signal, "setitimer")
+    if timer:
+        previous_alarm = signal.signal(signal.SIGALRM, alarm)
+        # A zero delay disables the timer, so an expired deadline is checked by the token itself.
+        signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6))
+    try:
+        yield
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_alarm)
+        signal.signal(signal.SIGINT, previous_interrupt)
+
+
+def finish_after(output, contexts: List["Context"]):
+    """
+    Reports the end of the progress of the contexts of a call once its output is consumed.
+    :param output: The output of the call.
+    :param contexts: The contexts the call was made with.
+    :return: The output, finishing the contexts after its last item if it's a stream.
+    """
+    if not is_stream(output):
+        for context in contexts:
+            context.finish()
+        return output
+
+    def finishing():
+        outcome = "cancelled"
+        try:
+            yield from output
+            outcome = "done"
+        finally:
+            for context in contexts:
+                context.finish(outcome)
+
+    return finishing()
+
+
+class _TextReporter:
+    """
+    Renders the progress as a single line, rewritten in place.
+    """
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self._rendered = False
+
+    def report(self, context: "Context", elapsed: float) -> None:
+        rate = context.count / elapsed if elapsed > 0 else 0
+        line = f"{context.description + ': ' if context.description else ''}{context.count}"
+        if context.total:
+            line += f"/{context.total} ({100 * context.count / context.total:.0f}%)"
+        line += f" - {rate:,.1f}/s"
+        remaining = context.token.remaining()
+        if remaining is not None:
+            line += f" - {remaining:.0f}s left"
+        self._stream.write(f"\r\033[K{line}")
+        self._stream.flush()
+        self._rendered = True
+
+    def finish(self, context: "Context", elapsed: float, outcome: str) -> None:
+        if self._rendered:
+            self.report(context, elapsed)
+            self._stream.write(f" - {outcome}\n" if outcome != "done" else "\n")
+            self._stream.flush()
+
+
+class _JsonReporter:
+    """
+    Writes the progress as JSON lines, for machines.
+    """
+
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+
+    def _write(self, event: str, context: "Context", elapsed: float) -> None:
+        import json  # pylint: disable=import-outside-toplevel
+
+        self._stream.write(
+            json.dumps(
+                {
+                    "event": event,
+                    "description": context.description,
+                    "count": context.count,
+                    "total": context.total,
+                    "elapsed": round(elapsed, 3),
+                }
+            )
+            + "\n"
+        )
+        self._stream.flush()
+
+    def report(self, context: "Context", elapsed: float) -> None:
+        self._write("progress", context, elapsed)
+
+    def finish(self, context: "Context", elapsed: float, outcome: str) -> None:
+        self._write(outcome, context, elapsed)
+
+
+class Context:
+    """
+    The execution context of a single call of a command. See the module documentation.
+    """
+
+    __slots__ = ("token", "count", "total", "description", "_reporter", "_start", "_last_report", "_next_check")
+
+    token: CancellationToken
+    count: int
+    total: int | None
+    description: str | None
+
+    def __init__(self, token: CancellationToken = None, progress: str = "off", stream: TextIO = None):
+        """
+        :param token: The cancellation token of the run, a token that's never cancelled if not given.
+        :param progress: How progress is reported - one of PROGRESS_FORMATS. 'auto' renders it as text
+         only when the stream is a terminal.
+        :param stream: The stream to report the progress to, defaults to stderr.
+        """
+        self.token = token or CancellationToken()
+        self.token.cooperative = True
+        stream = stream or sys.stderr
+        if progress == "auto":
+            progress = "text" if stream.isatty() else "off"
+        self._reporter = {"text": _TextReporter, "json": _JsonReporter}.get(progress)
+        if self._reporter is not None:
+            self._reporter = self._reporter(stream)
+        self.count = 0
+        self.total = None
+        self.description = None
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self._next_check = 1
+
+    def __reduce__(self):
+        # Passed to process workers as a fresh context, as the token and the reporter are bound to this process.
+        return Context, ()
+
+    def __repr__(self):
+        # Stable, so contexts don't affect the keys of result caches.
+        return "Context()"
+
+    def progress(self, total: int = None, description: str = None) -> "Context":
+        """
+        Starts reporting the progress of a new task, resetting the counter.
+        :param total: The amount of steps of the task, if known.
+        :param description: A short description of the task.
+        :return: The context.
+        """
+        self.count = 0
+        self.total = total
+        self.description = description
+        self._start = self._last_report = time.monotonic()
+        self._next_check = 1
+        return self
+
+    def advance(self, amount: int = 1) -> None:
+        """
+        Advances the progress counter. Only looks at the clock, reports and checks for cancellation
+        once enough steps were made to take about REPORT_INTERVAL, keeping the common case to an increment.
+        :param amount: The amount of steps made.
+        :return: None
+        """
+        self.count += amount
+        if self.count >= self._next_check:
+            self._tick()
+
+    def _tick(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._start
+        if self._reporter is not None and now - self._last_report >= REPORT_INTERVAL:
+            self._reporter.report(self, elapsed)
+            self._last_report = now
+        # Scheduling the next check after roughly another interval, at the rate observed so far.
+        rate = self.count / elapsed if elapsed > 0 else 0
+        self._next_check = self.count + max(1, int(rate * REPORT_INTERVAL))
+        self.token.check()
+
+    def track(self, iterable: Iterable, total: int = None, description: str = None) -> Iterator:
+        """
+        Iterates over items, advancing the progress with every item.
+        :param iterable: The items.
+        :param total: The amount of items, taken from the iterable if it has a length.
+        :param description: A short description of the task.
+        :return: Generates the items.
+        """
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(iterable)
+        self.progress(total, description)
+        for item in iterable:
+            yield item
+            self.advance()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        :return: Whether the run was cancelled, for commands that wind down on their own rather than raising.
+        """
+        return self.token.cancelled
+
+    def check(self) -> None:
+        """
+        Raises Cancelled if the run was cancelled.
+        :return: None
+        """
+        self.token.check()
+
+    def remaining(self) -> float | None:
+        """
+        :return: The amount of seconds until the --scripto-timeout deadline, or None if there is none.
+        """
+        return self.token.remaining()
+
+    def finish(self, outcome: str = "done") -> None:
+        """
+        Reports the end of the progress, called by Scripto once the command returns.
+        :param outcome: 'done', or 'cancelled'.
+        :return: None
+        """
+        if self._reporter is not None and self.count:
+            self._reporter.finish(self, time.monotonic() - self._start, outcome)
+            self._reporter = None
+
+
+def is_context(annotation) -> bool:
+    """
+    :param annotation: The annotation of a parameter.
+    :return: Whether the parameter takes the context, rather than a command line argument.
+    """
+    return isinstance(annotation, type) and issubclass(annotation, Context)
@@ -0,0 +1,436 @@
+"""
+Converts command line strings into the annotated types of parameters.
+Every annotation is compiled once into the argparse settings converting it, and the compiled settings are reused
+by every parser built afterwards. Supported out of the box:
+
+- Optional[X] / X | None - converted as X.
+- Union[X, Y] - the first of X and Y converting the value successfully.
+- Literal[...] - one of the literal values.
+- Enum subclasses - a member, by its name (case-insensitive) or value.
+- datetime / date / time - an ISO 8601 string.
+- bool inside containers - true/false, yes/no, on/off or 1/0.
+- dict[K, V] - a JSON object, or comma separated key=value pairs.
+- list / tuple / set / frozenset of X - any amount of values, converted in a single pass when the command is parsed.
+  Nested sequences are given as JSON arrays, or comma separated values.
+- Any other callable annotation (int, float, Path...) - called with the string, as argparse does.
+
+Converters of other types (or overriding the built-in ones) are registered with register_converter.
+"""
+
+import argparse
+import enum
+import functools
+import types
+import typing
+from typing import Callable, Dict
+
+SEQUENCE_TYPES = (list, tuple, set, frozenset)
+TRUE_STRINGS = ("true", "yes", "on", "1")
+FALSE_STRINGS = ("false", "no", "off", "0")
+
+_converters: Dict[object, Callable[[str], object]] = {}
+_compiled: Dict[object, dict] = {}
+# Bumped by every registration, so anything compiled with the previous converters can be told apart.
+_version = 0
+
+
+def register_converter(annotation, converter: Callable[[str], object] = None):
+    """
+    Registers the converter of an annotation, taking precedence over the built-in conversions.
+    Can be used as a decorator - @register_converter(Decimal).
+    :param annotation: The annotation to convert into, such as a class.
+    :param converter: A callable converting a command line string, raising ValueError on invalid values.
+    :return: The converter.
+    """
+    global _version  # pylint: disable=global-statement
+    if converter is None:
+        return functools.partial(register_converter, annotation)
+    _converters[annotation] = converter
+    # Compiled settings might contain the previous converter of the annotation.
+    _compiled.clear()
+    _version += 1
+    return converter
+
+
+def converters_version() -> str:
+    """
+    Identifies the registered converters, as part of the keys of cached parser specifications.
+    :return: The amount of registrations, along with the names of the registered converters,
+     so specifications cached by runs registering other converters aren't reused.
+    """
+    names = (
+        f"{getattr(annotation, '__qualname__', annotation)}="
+        f"{getattr(converter, '__module__', '')}.{getattr(converter, '__qualname__', type(converter).__qualname__)}"
+        for annotation, converter in _converters.items()
+    )
+    return f"{_version}:{','.join(names)}"
+
+
+class Converter:
+    """
+    The base class of the built-in converters.
+    Converters are plain objects rather than closures, so parser specifications holding them can be stored
+    by the spec cache and rendered by the compiler.
+    """
+
+    # The name argparse shows in its error messages.
+    __name__: str = "value"
+
+    def arguments(self) -> tuple:
+        """
+        :return: The arguments the converter was created with.
+        """
+        raise NotImplementedError
+
+    def __call__(self, value: str):
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.arguments() == self.arguments()
+
+    def __hash__(self):
+        return hash((type(self), self.arguments()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.arguments()!r}"
+
+
+class BoolConverter(Converter):
+    """
+    Converts the usual spellings of true and false.
+    """
+
+    __name__ = "bool"
+
+    def arguments(self) -> tuple:
+        return ()
+
+    def __call__(self, value: str) -> bool:
+        lowered = value.lower()
+        if lowered in TRUE_STRINGS:
+            return True
+        if lowered in FALSE_STRINGS:
+            return False
+        raise ValueError(value)
+
+
+class LiteralConverter(Converter):
+    """
+    Converts the string form of one of a set of literal values back into the value.
+    """
+
+    values: tuple
+
+    def __init__(self, values: tuple):
+        self.values = values
+        self.__name__ = "literal"
+        self._by_string = {str(item): item for item in values}
+
+    def arguments(self) -> tuple:
+        return (self.values,)
+
+    def __call__(self, value: str):
+        if value not in self._by_string:
+            raise argparse.ArgumentTypeError(
+                f"invalid choice: {value!r} (choose from {', '.join(self._by_string)})"
+            )
+        return self._by_string[value]
+
+
+class EnumConverter(Converter):
+    """
+    Converts the name (case-insensitive) or the value of a member of an enum.
+    """
+
+    enum_type: type
+
+    def __init__(self, enum_type: type):
+        self.enum_type = enum_type
+        self.__name__ = enum_type.__name__
+
+    def arguments(self) -> tuple:
+        return (self.enum_type,)
+
+    def __call__(self, value: str):
+        members = self.enum_type.__members__
+        if value in members:
+            return members[value]
+        for name, member in members.items():
+            if name.lower() == value.lower() or str(member.value) == value:
+                return member
+        raise argparse.ArgumentTypeError(
+            f"invalid choice: {value!r} (choose from {', '.join(name.lower() for name in members)})"
+        )
+
+
+class IsoFormatConverter(Converter):
+    """
+    Converts ISO 8601 strings into datetimes, dates or times.
+    """
+
+    target: type
+
+    def __init__(self, target: type):
+        self.target = target
+        self.__name__ = target.__name__
+
+    def arguments(self) -> tuple:
+        return (self.target,)
+
+    def __call__(self, value: str):
+        return self.target.fromisoformat(value)
+
+
+class UnionConverter(Converter):
+    """
+    Converts with the first of several converters accepting the value.
+    """
+
+    converters: tuple
+
+    def __init__(self, converters: tuple):
+        self.converters = converters
+        self.__name__ = " | ".join(getattr(item, "__name__", repr(item)) for item in converters)
+
+    def arguments(self) -> tuple:
+        return (self.converters,)
+
+    def __call__(self, value: str):
+        for converter in self.converters:
+            try:
+                return converter(value)
+            except (ValueError, TypeError, argparse.ArgumentTypeError):
+                continue
+        raise ValueError(value)
+
+
+def _split(value: str, opening: str) -> list:
+    value = value.strip()
+    if value.startswith(opening):
+        import json  # pylint: disable=import-outside-toplevel
+
+        # JSON values are converted again from their string form, so all converters receive strings.
+        parsed = json.loads(value)
+        if isinstance(parsed, dict):
+            return [(str(key), item if isinstance(item, str) else json.dumps(item)) for key, item in parsed.items()]
+        return [item if isinstance(item, str) else json.dumps(item) for item in parsed]
+    return [item.strip() for item in value.split(",")] if value else []
+
+
+class SequenceConverter(Converter):
+    """
+    Converts a single string holding several values - a JSON array, or comma separated values.
+    Used for sequences nested inside other types, such as list[list[int]].
+    """
+
+    element: Callable
+    collection: type
+
+    def __init__(self, element: Callable, collection: type = list):
+        self.element = element
+        self.collection = collection
+        self.__name__ = f"{collection.__name__}[{getattr(element, '__name__', 'value')}]"
+
+    def arguments(self) -> tuple:
+        return self.element, self.collection
+
+    def __call__(self, value: str):
+        return self.collection(map(self.element, _split(value, "[")))
+
+
+class DictConverter(Converter):
+    """
+    Converts a JSON object, or comma separated key=value pairs.
+    """
+
+    key: Callable
+    value: Callable
+
+    def __init__(self, key: Callable = str, value: Callable = str):
+        self.key = key
+        self.value = value
+        self.__name__ = "dict"
+
+    def arguments(self) -> tuple:
+        return self.key, self.value
+
+    def __call__(self, value: str) -> dict:
+        pairs = _split(value, "{")
+        if value.strip().startswith("{"):
+            return {self.key(key): self.value(item) for key, item in pairs}
+        converted = {}
+        for pair in pairs:
+            key, separator, item = pair.partition("=")
+            if not separator:
+                raise ValueError(value)
+            converted[self.key(key.strip())] = self.value(item.strip())
+        return converted
+
+
+class BulkConvertAction(argparse.Action):
+    """
+    Stores the values of a sequence parameter, converted in a single pass once they were all collected.
+    argparse calls the type of an argument separately for every value, with its error handling around each call,
+    which dominates parsing when hundreds of thousands of numbers are passed.
+    Numbers have no faster path of their own - map(int, values) already loops in C, parsing the joined values as a
+    single JSON array measured no faster, and arrays (or numpy) would change the type the function receives.
+    """
+
+    def __init__(self, option_strings, dest, converter: Callable = str, collection: type = list, **kwargs):
+        super().__init__(option_strings, dest, **kwargs)
+        self.converter = converter
+        # Not 'container', which argparse sets to the group holding the action.
+        self.collection = collection
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            if self.converter is str:
+                converted = self.collection(values)
+            else:
+                converted = self.collection(map(self.converter, values))
+        except (ValueError, TypeError, argparse.ArgumentTypeError) as e:
+            raise argparse.ArgumentError(self, self._describe_failure(values, e)) from None
+        setattr(namespace, self.dest, converted)
+
+    def _describe_failure(self, values: list, error: Exception) -> str:
+        if isinstance(error, argparse.ArgumentTypeError):
+            return str(error)
+        # Only looking for the invalid value once the fast conversion failed.
+        for value in values:
+            try:
+                self.converter(value)
+            except argparse.ArgumentTypeError as e:
+                return str(e)
+            except (ValueError, TypeError):
+                return f"invalid {getattr(self.converter, '__name__', 'value')} value: {value!r}"
+        return str(error)
+
+
+def unwrap_optional(annotation):
+    """
+    :param annotation: The annotation of a parameter.
+    :return: The annotation, without Optional (or | None) and Annotated wrapping it.
+    """
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return unwrap_optional(typing.get_args(annotation)[0])
+    if origin in (typing.Union, types.UnionType):
+        members = [item for item in typing.get_args(annotation) if item is not type(None)]
+        if len(members) == 1:
+            return unwrap_optional(members[0])
+    return annotation
+
+
+def is_sequence(annotation) -> bool:
+    """
+    :param annotation: The annotation of a parameter.
+    :return: Whether the parameter takes any amount of values, such as list[int].
+    """
+    annotation = unwrap_optional(annotation)
+    return (typing.get_origin(annotation) or annotation) in SEQUENCE_TYPES
+
+
+def _is_registered(annotation) -> bool:
+    try:
+        return annotation in _converters
+    except TypeError:
+        # Unhashable annotations can't be registered.
+        return False
+
+
+def compile_converter(annotation) -> Callable:
+    """
+    Compiles an annotation into a callable converting a single command line string.
+    :param annotation: The annotation to convert into.
+    :return: The converter. Annotations that aren't recognized are returned as is, as argparse calls them.
+    """
+    if _is_registered(annotation):
+        return _converters[annotation]
+    annotation = unwrap_optional(annotation)
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if annotation in (typing.Any, str):
+        return str
+    if annotation is bool:
+        return BoolConverter()
+    if origin is typing.Literal:
+        return LiteralConverter(args)
+    if origin in (typing.Union, types.UnionType):
+        return UnionConverter(tuple(compile_converter(item) for item in args if item is not type(None)))
+    if (origin or annotation) in SEQUENCE_TYPES:
+        return SequenceConverter(compile_converter(args[0] if args else str), origin or annotation)
+    if (origin or annotation) is dict:
+        key, value = args if args else (str, str)
+        return DictConverter(compile_converter(key), compile_converter(value))
+    if isinstance(annotation, type):
+        if issubclass(annotation, enum.Enum):
+            return EnumConverter(annotation)
+        # The date and time types, matched by module so the datetime module isn't imported for other annotations.
+        if annotation.__module__ == "datetime" and annotation.__name__ in ("datetime", "date", "time"):
+            return IsoFormatConverter(annotation)
+    return annotation
+
+
+def _compile_settings(annotation) -> dict:
+    if (typing.get_origin(annotation) or annotation) in SEQUENCE_TYPES:
+        args = typing.get_args(annotation)
+        element = unwrap_optional(args[0]) if args else str
+        settings = {
+            "nargs": "*",
+            "action": BulkConvertAction,
+            "converter": compile_converter(element),
+            "collection": typing.get_origin(annotation) or annotation,
+        }
+        element_settings = _element_settings(element)
+        # argparse checks choices before the values are converted, so they're only shown.
+        choices = element_settings.pop("choices", None)
+        if choices:
+            settings["metavar"] = "{" + ",".join(map(str, choices)) + "}"
+        settings.update(element_settings)
+        return settings
+    settings = {"type": compile_converter(annotation)}
+    settings.update(_element_settings(annotation))
+    return settings
+
+
+def _element_settings(annotation) -> dict:
+    if _is_registered(annotation):
+        return {}
+    if typing.get_origin(annotation) is typing.Literal:
+        return {"choices": list(typing.get_args(annotation))}
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return {"metavar": "{" + ",".join(name.lower() for name in annotation.__members__) + "}"}
+    return {}
+
+
+def argument_settings(annotation) -> dict:
+    """
+    Returns the argparse settings converting the values of a parameter, compiled once per annotation.
+    :param annotation: The annotation of the parameter.
+    :return: A dictionary with 'type', or with 'nargs', 'action', 'converter' and 'collection' for sequences,
+     along with 'choices' or 'metavar' where they apply.
+    """
+    annotation = unwrap_optional(annotation)
+    try:
+        return dict(_compiled[annotation])
+    except KeyError:
+        settings = _compile_settings(annotation)
+        _compiled[annotation] = settings
+        return dict(settings)
+    except TypeError:
+        return _compile_settings(annotation)
+
+
+def with_choices(settings: dict) -> dict:
+    """
+    Converts the settings of a sequence parameter to convert its values one by one, as argparse validates choices
+    against the values before they reach the bulk conversion.
+    :param settings: The settings of the parameter.
+    :return: The settings, converting every value separately.
+    """
+    if settings.get("action") is not BulkConvertAction:
+        return settings
+    settings = dict(settings)
+    del settings["action"], settings["collection"]
+    settings["type"] = settings.pop("converter")
+    return settings
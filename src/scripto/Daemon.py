@@ -0,0 +1,320 @@
+"""
+A warm daemon mode, saving the startup and import time of scripts on repeated invocations.
+
+The client (python -m scripto.client script.py ...) connects to a daemon listening on a unix socket,
+starting it if required. It sends its arguments, environment and working directory,
+along with its standard streams as file descriptors, so the output is written directly to the client's terminal.
+The daemon forks a child per invocation, which already has the script and all of its imports loaded,
+and replies with the exit code once the child is done.
+
+POSIX only, as it relies on fork and on passing file descriptors over unix sockets.
+Sockets live in a directory private to the user (mode 0700), are only accessible by their owner (mode 0600),
+and both ends check that the peer runs as the same user where the platform reports it (SO_PEERCRED).
+The socket modules are imported by the functions using them, as every script imports this module
+to check whether it was started as a daemon.
+"""
+
+# pylint: disable=import-outside-toplevel
+import os
+import signal
+import struct
+import sys
+import time
+
+DAEMON_SOCKET_VARIABLE = "SCRIPTO_DAEMON_SOCKET"
+IDLE_TIMEOUT_VARIABLE = "SCRIPTO_DAEMON_IDLE_TIMEOUT"
+MAX_CLIENTS_VARIABLE = "SCRIPTO_DAEMON_MAX_CLIENTS"
+DEFAULT_IDLE_TIMEOUT = 600
+STARTUP_TIMEOUT = 30
+
+_HEADER = struct.Struct("!Q")
+_EXIT_CODE = struct.Struct("!i")
+# The pid, uid and gid of a peer, as reported by SO_PEERCRED.
+_CREDENTIALS = struct.Struct("3i")
+
+
+def _socket_directory() -> str:
+    """
+    Creates the directory of the sockets of the user, private to the user.
+    :return: The path of the directory.
+    """
+    import stat
+
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    directory = os.path.join(base, f"scripto-{os.getuid()}")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # Not following links, so a directory planted by another user in a shared location is never trusted.
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"The daemon socket directory {directory} isn't owned by the current user")
+    if stat.S_IMODE(status.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+    return directory
+
+
+def get_socket_path(script_path: str) -> str:
+    """
+    Returns the path of the socket the daemon of a script listens on, creating its private directory if required.
+    :param script_path: The path of the script.
+    :return: The path of the socket.
+    """
+    import hashlib
+
+    digest = hashlib.sha256(os.path.abspath(script_path).encode()).hexdigest()[:16]
+    return os.path.join(_socket_directory(), f"{digest}.sock")
+
+
+def _same_user(conn: "socket.socket") -> bool:
+    """
+    :param conn: A connected unix socket.
+    :return: Whether the peer runs as the current user, or True where the platform doesn't report peers.
+    """
+    import socket
+
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    _, uid, _ = _CREDENTIALS.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _CREDENTIALS.size))
+    return uid == os.getuid()
+
+
+def _receive_exactly(conn: "socket.socket", size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed unexpectedly")
+        data += chunk
+    return data
+
+
+def _run_child(run, request: dict, fds: list[int]) -> int:
+    """
+    Runs a single invocation inside a forked child, in the environment of the client.
+    :param run: The function running the script, taking the argument list.
+    :param request: The request sent by the client.
+    :param fds: The standard streams of the client.
+    :return: The exit code of the invocation.
+    """
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    code = 0
+    try:
+        run(request["argv"])
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+        if not isinstance(e.code, (int, type(None))):
+            print(e.code, file=sys.stderr)
+    except BaseException:  # pylint: disable=broad-except
+        sys.excepthook(*sys.exc_info())
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return code
+
+
+def serve(run, socket_path: str, fingerprint) -> None:
+    """
+    Serves invocations of a script until idle for too long, or until its sources change.
+    :param run: The function running the script, taking the argument list.
+    :param socket_path: The path of the socket to listen on.
+    :param fingerprint: A function returning a fingerprint of the sources of the script.
+     The daemon exits when it changes, and the next client starts a fresh one.
+    :return: None
+    """
+    import json
+    import select
+    import socket
+
+    idle_timeout = float(os.environ.get(IDLE_TIMEOUT_VARIABLE, DEFAULT_IDLE_TIMEOUT))
+    max_clients = int(os.environ.get(MAX_CLIENTS_VARIABLE, os.cpu_count() or 1))
+    initial_fingerprint = fingerprint()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(max_clients * 4)
+    # Waking up from select whenever a child exits.
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    children = {}
+    last_activity = time.monotonic()
+    try:
+        while True:
+            while children:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    break
+                conn = children.pop(pid)
+                try:
+                    conn.sendall(_EXIT_CODE.pack(os.waitstatus_to_exitcode(status)))
+                except OSError:
+                    pass
+                conn.close()
+                last_activity = time.monotonic()
+            readable = [wakeup_read]
+            if len(children) < max_clients:
+                readable.append(server)
+            timeout = None if children else idle_timeout
+            ready, _, _ = select.select(readable, [], [], timeout)
+            if not ready:
+                if not children and time.monotonic() - last_activity >= idle_timeout:
+                    return
+                continue
+            if wakeup_read in ready:
+                os.read(wakeup_read, 1024)
+            if server not in ready:
+                continue
+            conn, _ = server.accept()
+            if not _same_user(conn):
+                # Never running commands, or receiving file descriptors, for other users.
+                conn.close()
+                continue
+            if fingerprint() != initial_fingerprint:
+                # The sources changed, letting the client start a fresh daemon.
+                conn.close()
+                return
+            try:
+                header, fds, _, _ = socket.recv_fds(conn, _HEADER.size, 3)
+                (size,) = _HEADER.unpack(header)
+                request = json.loads(_receive_exactly(conn, size))
+            except (OSError, ValueError, struct.error):
+                conn.close()
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                conn.close()
+                os._exit(_run_child(run, request, fds))
+            for fd in fds:
+                os.close(fd)
+            children[pid] = conn
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        for conn in children.values():
+            conn.close()
+
+
+def _start_daemon(script_path: str, socket_path: str) -> None:
+    """
+    Starts a daemon for the script in the background.
+    :param script_path: The path of the script.
+    :param socket_path: The socket the daemon should listen on.
+    :return: None
+    """
+    # Imported here, keeping the startup of the client as light as possible.
+    import subprocess
+
+    # pylint: disable=consider-using-with
+    subprocess.Popen(
+        [sys.executable, script_path],
+        env={**os.environ, DAEMON_SOCKET_VARIABLE: socket_path},
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _connect(socket_path: str) -> "socket.socket | None":
+    import socket
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        return None
+    if not _same_user(client):
+        # Never handing the environment and the standard streams to another user's process.
+        client.close()
+        raise PermissionError(f"The daemon listening on {socket_path} runs as another user")
+    return client
+
+
+def _forward(client: "socket.socket", argv: list[str]) -> int | None:
+    """
+    Forwards an invocation to the daemon.
+    :param client: A socket connected to the daemon.
+    :param argv: The arguments to invoke the script with.
+    :return: The exit code, or None if the daemon closed the connection without running the invocation.
+    """
+    import json
+    import socket
+
+    request = json.dumps(
+        {"argv": argv, "env": dict(os.environ), "cwd": os.getcwd()}
+    ).encode()
+    try:
+        socket.send_fds(client, [_HEADER.pack(len(request))], [0, 1, 2])
+        client.sendall(request)
+        (code,) = _EXIT_CODE.unpack(_receive_exactly(client, _EXIT_CODE.size))
+    except (OSError, ConnectionError):
+        return None
+    finally:
+        client.close()
+    return code
+
+
+def client_main(argv: list[str]) -> int:
+    """
+    Runs a script through its daemon, starting the daemon if it isn't running.
+    :param argv: The path of the script, followed by the arguments to pass it.
+    :return: The exit code of the invocation.
+    """
+    import socket
+
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        print("The scripto daemon requires a POSIX system.", file=sys.stderr)
+        return 2
+    if not argv:
+        print("usage: python -m scripto.client SCRIPT [ARGS...]", file=sys.stderr)
+        return 2
+    script_path, arguments = argv[0], argv[1:]
+    try:
+        socket_path = get_socket_path(script_path)
+        return _run_through_daemon(script_path, socket_path, arguments)
+    except PermissionError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+def _run_through_daemon(script_path: str, socket_path: str, arguments: list[str]) -> int:
+    """
+    Runs a script through the daemon listening on a socket, starting the daemon if it isn't running.
+    :param script_path: The path of the script.
+    :param socket_path: The path of the socket of its daemon.
+    :param arguments: The arguments to pass the script.
+    :return: The exit code of the invocation.
+    """
+    for _ in range(2):
+        client = _connect(socket_path)
+        if client is None:
+            _start_daemon(script_path, socket_path)
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while client is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+                client = _connect(socket_path)
+            if client is None:
+                print(f"Failed starting a daemon for {script_path}", file=sys.stderr)
+                return 1
+        code = _forward(client, [script_path, *arguments])
+        if code is not None:
+            return code
+        # The daemon exited due to a change in the script, retrying with a fresh one.
+        time.sleep(0.05)
+    print(f"Failed running {script_path} through its daemon", file=sys.stderr)
+    return 1
@@ -0,0 +1,146 @@
+"""
+A single pass docstring parser, supporting reStructuredText, Google and NumPy docstring styles.
+"""
+
+import functools
+import inspect
+import re
+from types import FunctionType
+
+_DIRECTIVE = re.compile(r":(\w+)([^:\n]*):[ \t]*(.*)")
+_GOOGLE_SECTION = re.compile(
+    r"(Args|Arguments|Parameters|Params|Keyword Args|Keyword Arguments|Other Parameters"
+    r"|Returns?|Yields?|Raises|Notes?|Examples?|Attributes|Warnings?|See Also|References)"
+    r"\s*:\s*"
+)
+_NUMPY_UNDERLINE = re.compile(r"\s*-{3,}\s*")
+_GOOGLE_ITEM = re.compile(r"\**(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)")
+_NUMPY_ITEM = re.compile(r"\**(\w+(?:\s*,\s*\**\w+)*)\s*(?::.*)?")
+
+_PARAMETER_SECTIONS = {
+    "args",
+    "arguments",
+    "parameters",
+    "params",
+    "keyword args",
+    "keyword arguments",
+    "other parameters",
+}
+_RETURN_SECTIONS = {"return", "returns", "yield", "yields"}
+
+
+class ParsedDocstring:
+    """
+    The structured contents of a docstring.
+    """
+
+    description: str
+    params: dict[str, str]
+    returns: str | None
+    directives: dict[str, str]
+    style: str
+
+    def __init__(self, description: str = "", style: str = "rest"):
+        self.description = description
+        self.params = {}
+        self.returns = None
+        self.directives = {}
+        self.style = style
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _parse_items(lines: list[str], numpy: bool) -> dict[str, str]:
+    """
+    Parses the items of a parameters section into descriptions.
+    Items start at the lowest indentation level of the section, deeper lines continue the previous item.
+    :param lines: The lines of the section.
+    :param numpy: Whether the section is in NumPy style (descriptions start in the line following the name).
+    :return: A dictionary mapping parameter names to their descriptions.
+    """
+    content = [line for line in lines if line.strip()]
+    if not content:
+        return {}
+    base_indent = min(_indent(line) for line in content)
+    items = {}
+    names = []
+    for line in lines:
+        if line.strip() and _indent(line) == base_indent:
+            match = (_NUMPY_ITEM if numpy else _GOOGLE_ITEM).fullmatch(line.strip())
+            if match is not None:
+                names = [name.strip().lstrip("*") for name in match.group(1).split(",")]
+                for name in names:
+                    items[name] = [] if numpy else [match.group(2)]
+                continue
+        for name in names:
+            items[name].append(line.strip())
+    return {name: "\n".join(text).strip() for name, text in items.items()}
+
+
+def parse_docstring(docstring: str) -> ParsedDocstring:
+    """
+    Parses a docstring into its description, parameter descriptions and other directives in a single pass.
+    Supports ':param name:' directives, Google style 'Args:' sections and NumPy style underlined sections.
+    :param docstring: The (already dedented) docstring to parse.
+    :return: The parsed docstring.
+    """
+    parsed = ParsedDocstring()
+    description = []
+    # Each block is a tuple of (style, kind, argument, lines).
+    blocks = []
+    current = description
+    lines = docstring.split("\n")
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        stripped = line.strip()
+        directive = _DIRECTIVE.match(stripped) if stripped.startswith(":") else None
+        if directive is not None:
+            current = [directive.group(3)]
+            blocks.append(("rest", directive.group(1), directive.group(2).strip(), current))
+        elif (
+            stripped
+            and index + 1 < len(lines)
+            and _NUMPY_UNDERLINE.fullmatch(lines[index + 1])
+        ):
+            current = []
+            blocks.append(("numpy", stripped.lower(), "", current))
+            index += 1
+        elif _indent(line) == 0 and _GOOGLE_SECTION.fullmatch(line):
+            current = []
+            blocks.append(("google", stripped[:-1].strip().lower(), "", current))
+        else:
+            current.append(line)
+        index += 1
+    parsed.description = "\n".join(description).strip()
+    for style, kind, argument, block_lines in blocks:
+        if style != "rest":
+            parsed.style = style
+        text = "\n".join(block_lines).strip()
+        if style == "rest" and kind == "param" and argument:
+            # Supporting the typed ':param int name:' form as well.
+            parsed.params[argument.split()[-1]] = text
+        elif style != "rest" and kind in _PARAMETER_SECTIONS:
+            parsed.params.update(_parse_items(block_lines, style == "numpy"))
+        elif kind in _RETURN_SECTIONS:
+            parsed.returns = text
+        else:
+            key = f"{kind} {argument}" if argument else kind
+            parsed.directives[key] = text
+    return parsed
+
+
+@functools.lru_cache(maxsize=None)
+def parse_function_docstring(func: FunctionType) -> ParsedDocstring | None:
+    """
+    Parses the docstring of a function, escaped for use in argparse messages.
+    The result is memoized, so every function is only parsed once.
+    :param func: The function to parse the docstring of.
+    :return: The parsed docstring, or None if the function has no documentation.
+    """
+    doc = inspect.getdoc(func)
+    if not doc:
+        return None
+    return parse_docstring(doc.replace("%", "%%"))
@@ -0,0 +1,258 @@
+"""
+Parallel execution of many calls of registered functions, over thread or process pools,
+or concurrently on an event loop for coroutine functions.
+asyncio and concurrent.futures are imported once calls are made, as most scripts never need them.
+"""
+
+# pylint: disable=import-outside-toplevel
+import collections
+import contextlib
+import importlib
+import importlib.util
+import inspect
+import sys
+import threading
+from types import FunctionType
+from typing import Iterable, Iterator, Tuple
+
+from scripto.FileTypes import with_files
+
+EXECUTORS = ("thread", "process")
+
+# Functions resolved inside worker processes, keyed by their reference.
+_resolved = {}
+
+
+def function_reference(func: FunctionType) -> Tuple[str, str, str]:
+    """
+    Creates a picklable reference to a function, to be resolved again inside worker processes.
+    :param func: The function to reference.
+    :return: A tuple of the module name, qualified name and source file of the function.
+    """
+    # Wrappers, such as cached functions, are referenced by the function they wrap.
+    func = inspect.unwrap(func)
+    return func.__module__, func.__qualname__, func.__code__.co_filename
+
+
+def resolve_function(reference: Tuple[str, str, str]) -> FunctionType:
+    """
+    Resolves a function reference by importing its module.
+    Functions of the main script are loaded from its file, as the worker's __main__ is a different module.
+    :param reference: The reference, as created by function_reference.
+    :return: The function.
+    """
+    if reference in _resolved:
+        return _resolved[reference]
+    module_name, qualname, path = reference
+    module = sys.modules.get(module_name)
+    if module is None or not hasattr(module, qualname.split(".")[0]):
+        if module_name == "__main__":
+            spec = importlib.util.spec_from_file_location("__scripto_main__", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(module_name)
+    func = module
+    for part in qualname.split("."):
+        func = getattr(func, part)
+    _resolved[reference] = func
+    return func
+
+
+def _format_error(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def run_coroutine(coroutine, loop_factory=None):
+    """
+    Runs a coroutine to completion on a new event loop.
+    :param coroutine: The coroutine to run.
+    :param loop_factory: A function creating the event loop, such as uvloop.new_event_loop.
+     Defaults to asyncio.new_event_loop.
+    :return: The result of the coroutine.
+    """
+    import asyncio
+
+    loop = (loop_factory or asyncio.new_event_loop)()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+class AsyncRunner:
+    """
+    Runs coroutine functions on an event loop in a background thread, with a bounded concurrency.
+    """
+
+    _limit: int
+    _loop: "asyncio.AbstractEventLoop"
+    _thread: threading.Thread
+    _semaphore: "asyncio.Semaphore | None"
+
+    def __init__(self, limit: int, loop_factory=None):
+        """
+        :param limit: The maximal amount of coroutines running at once.
+        :param loop_factory: A function creating the event loop, defaults to asyncio.new_event_loop.
+        """
+        import asyncio
+
+        self._limit = max(limit, 1)
+        self._semaphore = None
+        self._loop = (loop_factory or asyncio.new_event_loop)()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, func: FunctionType, kwargs: dict) -> "concurrent.futures.Future":
+        """
+        Schedules a call of a coroutine function.
+        :param func: The coroutine function.
+        :param kwargs: The arguments to call it with.
+        :return: A future of a tuple of whether the call succeeded, and its result or error message.
+        """
+        import asyncio
+
+        return asyncio.run_coroutine_threadsafe(self._bounded(func, kwargs), self._loop)
+
+    async def _bounded(self, func: FunctionType, kwargs: dict) -> Tuple[bool, object]:
+        import asyncio
+
+        if self._semaphore is None:
+            # Created lazily, so it belongs to the running loop.
+            self._semaphore = asyncio.Semaphore(self._limit)
+        async with self._semaphore:
+            try:
+                return True, await func(**kwargs)
+            except Exception as e:  # pylint: disable=broad-except
+                return False, _format_error(e)
+
+    def close(self) -> None:
+        """
+        Stops the event loop and its thread.
+        :return: None
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def _call(func: FunctionType, kwargs: dict) -> Tuple[bool, object]:
+    try:
+        output = func(**kwargs)
+        if inspect.iscoroutine(output):
+            output = run_coroutine(output)
+        return True, output
+    except Exception as e:  # pylint: disable=broad-except
+        return False, _format_error(e)
+
+
+def _call_reference(reference: Tuple[str, str, str], kwargs: dict) -> Tuple[bool, object]:
+    """
+    Calls a function by its reference, inside a worker process.
+    :param reference: The reference to the function.
+    :param kwargs: The arguments to call the function with.
+    :return: A tuple of whether the call succeeded, and its result or error message.
+    """
+    try:
+        func = resolve_function(reference)
+    except Exception as e:  # pylint: disable=broad-except
+        return False, f"Failed resolving {reference[1]}: {_format_error(e)}"
+    return _call(with_files(func, kwargs), kwargs)
+
+
+def _completed(result: Tuple[bool, object]) -> "concurrent.futures.Future":
+    import concurrent.futures
+
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
+
+def fan_out(
+    calls: Iterable,
+    jobs: int = 1,
+    executor: str = "thread",
+    ordered: bool = True,
+    loop_factory=None,
+) -> Iterator[Tuple[int, bool, object]]:
+    """
+    Runs many function calls, yielding each result as soon as it can be reported.
+    At most a few calls per worker are in flight at once, so the calls are consumed lazily.
+    :param calls: The calls to make - tuples of a function and its keyword arguments.
+     An exception instead of a tuple is reported as a failed call, keeping its place in the order.
+    :param jobs: The amount of workers, calls are made in the current thread if 1.
+     Coroutine functions all run on a single event loop, with jobs limiting how many run at once.
+    :param executor: 'thread' or 'process'. Process workers resolve the functions by their module path.
+    :param ordered: Whether to yield the results in the order of the calls, rather than as they complete.
+    :param loop_factory: A function creating the event loop for coroutine functions.
+    :return: Generates tuples of the index of the call, whether it succeeded, and its result or error message.
+    """
+    import concurrent.futures
+
+    with contextlib.ExitStack() as stack:
+        pools = {}
+
+        def submit(call) -> "concurrent.futures.Future":
+            if isinstance(call, BaseException):
+                return _completed((False, _format_error(call)))
+            func, kwargs = call
+            if jobs > 1 and executor == "process":
+                if "process" not in pools:
+                    pools["process"] = stack.enter_context(
+                        concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+                    )
+                return pools["process"].submit(
+                    _call_reference, function_reference(func), kwargs
+                )
+            if inspect.iscoroutinefunction(func):
+                if "async" not in pools:
+                    pools["async"] = AsyncRunner(jobs, loop_factory)
+                    stack.callback(pools["async"].close)
+                return pools["async"].submit(func, kwargs)
+            if jobs <= 1:
+                return _completed(_call(func, kwargs))
+            if "thread" not in pools:
+                pools["thread"] = stack.enter_context(
+                    concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+                )
+            return pools["thread"].submit(_call, func, kwargs)
+
+        window = max(jobs, 1) * 4 if jobs > 1 else 1
+        pending = collections.deque()
+        for index, call in enumerate(calls):
+            pending.append((index, submit(call)))
+            while len(pending) >= window:
+                yield from _collect(pending, ordered)
+        while pending:
+            yield from _collect(pending, ordered)
+
+
+def _collect(pending: collections.deque, ordered: bool) -> Iterator[Tuple[int, bool, object]]:
+    """
+    Waits for in flight calls, yielding the results that can be reported.
+    :param pending: The in flight calls, tuples of their index and future. Reported calls are removed.
+    :param ordered: Whether results must be reported in order.
+    :return: Generates tuples of the index of the call, whether it succeeded, and its result or error message.
+    """
+    if ordered:
+        index, future = pending.popleft()
+        yield (index, *_result(future))
+        return
+    import concurrent.futures
+
+    done, _ = concurrent.futures.wait(
+        [future for _, future in pending],
+        return_when=concurrent.futures.FIRST_COMPLETED,
+    )
+    for item in [item for item in pending if item[1] in done]:
+        pending.remove(item)
+        yield (item[0], *_result(item[1]))
+
+
+def _result(future: "concurrent.futures.Future") -> Tuple[bool, object]:
+    try:
+        return future.result()
+    except Exception as e:  # pylint: disable=broad-except
+        # Failures of the pool itself, such as results which cannot be pickled.
+        return False, _format_error(e)
@@ -0,0 +1,261 @@
+"""
+File parameter types, opened by Scripto right before the function is called, and closed once it finishes.
+Annotate a parameter with one of them instead of taking a path and opening it:
+
+- MappedFile - a read-only memory map of the file.
+- BinaryStream - a buffered binary stream.
+- Lines - an iterator over the lines of the file, without their line endings.
+- OutputFile / BinaryOutputFile - a file written atomically, replacing its target only if the function succeeds.
+
+A path of '-' stands for stdin (or stdout for output files).
+"""
+
+import contextlib
+import functools
+import inspect
+import io
+import mmap
+import os
+import stat
+import sys
+from typing import Callable, Iterator
+
+from scripto.Output import is_stream
+
+STDIO_PATH = "-"
+# Large reads amortize the cost of system calls on big inputs.
+BUFFER_SIZE = 1024 * 1024
+
+
+class FileArgument:
+    """
+    A path given on the command line, opened right before the function is called.
+    """
+
+    path: str
+    metavar = "FILE"
+    help = "'-' for stdin."
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r})"
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.path == self.path
+
+    def __hash__(self):
+        return hash((type(self), self.path))
+
+    def open(self):
+        """
+        :return: A context manager yielding the value passed to the function.
+        """
+        raise NotImplementedError
+
+    def fingerprint(self) -> tuple | None:
+        """
+        Identifies the current content of the file for result caches, without reading it.
+        :return: The absolute path, modification time and size of the file,
+         or None if its content can't be identified - for stdin, and for files which can't be accessed.
+        """
+        if self.path == STDIO_PATH:
+            return None
+        try:
+            status = os.stat(self.path)
+        except OSError:
+            return None
+        return os.path.abspath(self.path), status.st_mtime_ns, status.st_size
+
+
+class MappedFile(FileArgument):
+    """
+    A read-only memory map of a file, so its content is paged in on demand rather than read into memory.
+    Supports slicing, find and regular expressions like bytes. Pipes can't be mapped, so a piped stdin is read instead.
+    """
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[mmap.mmap | bytes]:
+        if self.path == STDIO_PATH:
+            if not stat.S_ISREG(os.fstat(sys.stdin.fileno()).st_mode):
+                yield sys.stdin.buffer.read()
+                return
+            source = open(sys.stdin.fileno(), "rb", closefd=False)
+        else:
+            source = open(self.path, "rb")
+        with source:
+            if os.fstat(source.fileno()).st_size == 0:
+                # Empty files cannot be mapped.
+                yield b""
+                return
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+
+class BinaryStream(FileArgument):
+    """
+    A buffered binary stream of a file.
+    """
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[io.BufferedReader]:
+        if self.path == STDIO_PATH:
+            yield sys.stdin.buffer
+            return
+        with open(self.path, "rb", buffering=BUFFER_SIZE) as stream:
+            yield stream
+
+
+class Lines(FileArgument):
+    """
+    A lazy iterator over the lines of a text file, without their line endings.
+    """
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[Iterator[str]]:
+        if self.path == STDIO_PATH:
+            yield (line.rstrip("\r\n") for line in sys.stdin)
+            return
+        with open(self.path, "r", encoding="utf-8", buffering=BUFFER_SIZE) as stream:
+            yield (line.rstrip("\r\n") for line in stream)
+
+
+class OutputFile(FileArgument):
+    """
+    A text file written atomically - the function writes to a temporary file next to the target,
+    which replaces the target once the function succeeds, and is removed if it fails.
+    Readers never see a partially written file, and a file can safely be rewritten in place.
+    """
+
+    help = "'-' for stdout."
+    mode = "w"
+
+    def fingerprint(self) -> None:
+        # Writing the file is the point of calling the function, so it's never skipped.
+        return None
+
+    @contextlib.contextmanager
+    def open(self):
+        if self.path == STDIO_PATH:
+            yield sys.stdout.buffer if "b" in self.mode else sys.stdout
+            return
+        # Imported here, as most scripts never write output files.
+        import tempfile  # pylint: disable=import-outside-toplevel
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp"
+        )
+        try:
+            encoding = None if "b" in self.mode else "utf-8"
+            with open(descriptor, self.mode, encoding=encoding) as output:
+                yield output
+            try:
+                # Keeping the permissions of a rewritten file.
+                os.chmod(temp_path, stat.S_IMODE(os.stat(self.path).st_mode))
+            except FileNotFoundError:
+                os.chmod(temp_path, 0o666 & ~_umask())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+
+class BinaryOutputFile(OutputFile):
+    """
+    A binary file written atomically, as OutputFile.
+    """
+
+    mode = "wb"
+
+
+@functools.lru_cache(maxsize=None)
+def _umask() -> int:
+    """
+    Reads the umask once, when the first new output file is written.
+    Read from /proc where available, as elsewhere it can only be read by setting it - briefly to 0,
+    racing with files created by other threads meanwhile.
+    :return: The umask of the process.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def is_file_type(annotation) -> bool:
+    """
+    :param annotation: The annotation of a parameter.
+    :return: Whether the annotation is one of the file parameter types.
+    """
+    return isinstance(annotation, type) and issubclass(annotation, FileArgument)
+
+
+def file_arguments(kwargs: dict) -> Iterator[FileArgument]:
+    """
+    :param kwargs: The arguments a function is called with.
+    :return: Generates the file arguments among them, including those in lists.
+    """
+    for value in kwargs.values():
+        if isinstance(value, FileArgument):
+            yield value
+        elif isinstance(value, list):
+            yield from (item for item in value if isinstance(item, FileArgument))
+
+
+def _open_arguments(stack: contextlib.ExitStack, kwargs: dict) -> dict:
+    opened = {}
+    for key, value in kwargs.items():
+        if isinstance(value, FileArgument):
+            value = stack.enter_context(value.open())
+        elif isinstance(value, list) and any(isinstance(item, FileArgument) for item in value):
+            value = [
+                stack.enter_context(item.open()) if isinstance(item, FileArgument) else item
+                for item in value
+            ]
+        opened[key] = value
+    return opened
+
+
+def _closing(output: Iterator, stack: contextlib.ExitStack) -> Iterator:
+    with stack:
+        yield from output
+
+
+def with_files(func: Callable, kwargs: dict) -> Callable:
+    """
+    Wraps a function so the file arguments it's called with are opened before calling it, and closed after.
+    Files stay open until iterators returned by the function are exhausted, so outputs can still be streamed.
+    :param func: The function.
+    :param kwargs: The arguments the function is about to be called with.
+    :return: The wrapping function, or the function itself if none of the arguments are files.
+    """
+    if next(file_arguments(kwargs), None) is None:
+        return func
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(**arguments):
+            with contextlib.ExitStack() as stack:
+                return await func(**_open_arguments(stack, arguments))
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(**arguments):
+        with contextlib.ExitStack() as stack:
+            output = func(**_open_arguments(stack, arguments))
+            if is_stream(output):
+                return _closing(output, stack.pop_all())
+            return output
+
+    return wrapper
@@ -1,13 +1,14 @@
-# pylint: disable=W1401
 """
 A utility module for various function parsing functions.
 """
 import inspect
-import re
 import warnings
 from types import FunctionType
 from typing import List, Dict
 
+from scripto.Context import is_context
+from scripto.DocParser import parse_function_docstring
+
 
 def get_description(func: FunctionType) -> str:
     """
@@ -15,20 +16,21 @@ def get_description(func: FunctionType) -> str:
     :param func: The function to retrieve documentation from.
     :return: The documentation of the function.
     """
-    docstring = get_escaped_docstring(func)
+    docstring = parse_function_docstring(func)
     if docstring is not None:
-        doc_end = docstring.find("\n:")
-        if doc_end == -1:
-            return docstring
-        return docstring[:doc_end].strip()
+        return docstring.description
     return ""
 
 
-def get_escaped_docstring(func):
-    doc = inspect.getdoc(func)
-    if doc:
-        return doc.replace("%", "%%")
-    return None
+def _infer_type(default) -> type:
+    """
+    Infers the type of an unannotated parameter from its default value, so it's still converted and checked.
+    :param default: The default value of the parameter.
+    :return: The type of simple default values, str otherwise.
+    """
+    if type(default) in (bool, int, float):
+        return type(default)
+    return str
 
 
 def get_parameters(func: FunctionType) -> List[Dict]:
@@ -39,24 +41,19 @@ def get_parameters(func: FunctionType) -> List[Dict]:
     :return: A dictionary with data regarding the parameter.
     """
     signature = inspect.signature(func)
-    docstring = get_escaped_docstring(func)
+    docstring = parse_function_docstring(func)
     parameters = []
     for param in signature.parameters.values():
-        result = None
-        if docstring:
-            # Update regex to handle multi-line parameter descriptions
-            result = re.search(
-                rf":param {param.name}:\s*(?P<desc>.*?)(?=\n\s*:\w|\Z)",
-                # Stops at the next directive or end-of-docstring
-                docstring,
-                flags=re.DOTALL,
-            )
         parameter = {
             "name": param.name,
             "type": (
-                param.annotation if param.annotation != inspect.Parameter.empty else str
+                param.annotation
+                if param.annotation != inspect.Parameter.empty
+                else _infer_type(param.default)
+            ),
+            "description": (
+                docstring.params.get(param.name, "") if docstring is not None else ""
             ),
-            "description": result.group("desc").strip() if result is not None else "",
         }
         if param.default is not inspect.Parameter.empty:
             parameter["default"] = param.default
@@ -96,34 +93,51 @@ def validate_parameters_in_docstring(
     :return: None
     """
     signature = inspect.signature(func)
-    docstring = get_escaped_docstring(func)
+    docstring = parse_function_docstring(func)
 
     for param in signature.parameters.values():
-        if docstring:
-            # Updated regex to correctly handle multi-line descriptions and stop at the next directive
-            result = re.search(
-                rf":param {param.name}:\s*(?P<desc>.*?)(?=\n\s*:\w|\Z)",
-                # Stops at the next directive or end of docstring
-                docstring,
-                flags=re.DOTALL,
-            )
-            if result is None and not suppress_warnings:
-                warnings.warn(
+        if is_context(param.annotation):
+            # The execution context is injected rather than parsed, so it needs no documentation.
+            continue
+        if docstring is not None:
+            if param.name not in docstring.params and not suppress_warnings:
+                _warn(
+                    func,
                     f'Documentation not sufficient to parse description for parameter: "{param.name}" in function: "{func.__name__}".',
-                    stacklevel=3,
                 )
         else:
-            warnings.warn(
-                f'No documentation for function: "{func.__name__}", no description will be generated.',
-                stacklevel=3,
-            )
+            _warn(func, f'No documentation for function: "{func.__name__}", no description will be generated.')
         if param.annotation is inspect.Parameter.empty and not suppress_warnings:
-            warnings.warn(
+            _warn(
+                func,
                 f'No type annotations for: "{param.name}" in function: "{func.__name__}", may result in unexpected behaviour.',
-                stacklevel=3,
             )
 
 
+def _warn(func: FunctionType, message: str) -> None:
+    """
+    Issues a warning about a function, pointing at its definition - functions may be validated long after
+    they were registered, such as in deferred validation mode, where no frame on the stack belongs to the script.
+    :param func: The function the warning is about.
+    :param message: The warning message.
+    :return: None
+    """
+    code = getattr(inspect.unwrap(func), "__code__", None)
+    if code is None:
+        warnings.warn(message, stacklevel=4)
+        return
+    module_globals = getattr(inspect.unwrap(func), "__globals__", {})
+    warnings.warn_explicit(
+        message,
+        UserWarning,
+        code.co_filename,
+        code.co_firstlineno,
+        module=func.__module__,
+        registry=module_globals.setdefault("__warningregistry__", {}),
+        module_globals=module_globals,
+    )
+
+
 def get_argument_names(func: FunctionType) -> List[str]:
     """
     Retrieves all argument names from a function's signature.
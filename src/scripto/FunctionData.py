@@ -1,22 +1,109 @@
+import importlib
+import inspect
 from types import FunctionType
+from typing import Callable
+
+from scripto.FuncUtils import make_kebab_case
 
 
 class FunctionData:
     """
-    Convenience holder for function data, to be used later for parsing data.
+    The registration record of a single command, to be used later for parsing data.
+    Functions registered lazily are only held by their import target ("module:qualname"),
+    and are imported the first time they are accessed.
+    Slotted, as scripts may hold thousands of these.
     """
 
-    function: FunctionType
+    __slots__ = (
+        "function",
+        "name",
+        "aliases",
+        "is_async",
+        "target",
+        "summary",
+        "initializers",
+        "spec",
+        "result_cache",
+        "cached_call",
+        "validated",
+        "pipe_input",
+    )
+
+    function: FunctionType | None
     name: str
     aliases: list[str]
+    is_async: bool
+    target: str | None
+    summary: str | None
+    initializers: dict
+    spec: dict | None
+    result_cache: object | None
+    cached_call: Callable | None
+    validated: bool
+    pipe_input: str | None
 
     def __init__(
-        self, function: FunctionType, name: str = None, aliases: list[str] = None
+        self,
+        function: FunctionType | None,
+        name: str = None,
+        aliases: list[str] = None,
+        is_async: bool = False,
+        target: str = None,
+        summary: str = None,
+        initializers: dict = None,
+        pipe_input: str = None,
     ):
         self.function = function
         self.name = name
         self.aliases = aliases
+        self.is_async = is_async
+        self.target = target
+        self.summary = summary
+        self.initializers = initializers or {}
+        # The parser specification, generated (or read from the spec cache) the first time it's needed.
+        self.spec = None
+        # The result cache of the function and the function wrapped by it, if registered with one.
+        self.result_cache = None
+        self.cached_call = None
+        self.validated = False
+        # The parameter receiving the output of the previous stage in pipelines, the first parameter if not set.
+        self.pipe_input = pipe_input
 
     def func(self) -> FunctionType:
+        if self.function is None:
+            module_name, _, qualname = self.target.partition(":")
+            function = importlib.import_module(module_name)
+            for part in qualname.split("."):
+                function = getattr(function, part)
+            self.function = function
+            self.is_async = inspect.iscoroutinefunction(function)
         # noinspection PyTypeChecker
         return self.function
+
+    def is_resolved(self) -> bool:
+        """
+        :return: Whether the function is loaded, always True for functions that weren't registered lazily.
+        """
+        return self.function is not None
+
+    def function_name(self) -> str:
+        """
+        :return: The name of the function, known without importing lazily registered functions.
+        """
+        if self.target is not None:
+            return self.target.rpartition(":")[2].split(".")[-1]
+        return self.function.__name__
+
+    def qualified_name(self) -> str:
+        """
+        :return: The module and qualified name of the function, as "module:qualname".
+        """
+        if self.target is not None:
+            return self.target
+        return f"{self.function.__module__}:{self.function.__qualname__}"
+
+    def command_name(self) -> str:
+        """
+        :return: The name the function is exposed to the CLI with.
+        """
+        return make_kebab_case(self.function_name()) if self.name is None else self.name
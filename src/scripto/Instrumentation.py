@@ -0,0 +1,133 @@
+"""
+Timing, profiling and memory tracing of the phases of running a script.
+The profiling and tracing modules are only imported when requested.
+"""
+
+# pylint: disable=import-outside-toplevel
+import contextlib
+import sys
+import time
+from typing import Dict, TextIO
+
+# The time scripto was first imported, the closest point to the start of the script it can observe.
+IMPORT_TIME = time.perf_counter()
+
+PROFILE_ENTRIES = 25
+
+
+class Instrumentation:
+    """
+    Accumulates the time spent in every phase of running a script.
+    """
+
+    phases: Dict[str, float]
+    _run_start: float | None
+
+    def __init__(self):
+        self.phases = {}
+        self._run_start = None
+
+    def mark_run(self) -> None:
+        """
+        Marks the start of Scripto.run, ending the import phase.
+        :return: None
+        """
+        self._run_start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """
+        Measures the time spent in a phase, adding it to previous measurements of the same phase.
+        :param name: The name of the phase.
+        :return: A context manager measuring its body.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def execution(self, profile: str = None, trace_memory: int = None):
+        """
+        Measures the execution phase, optionally profiling it and tracing its memory allocations.
+        :param profile: '-' to print the profile to stderr, or a path to dump the pstats data to.
+        :param trace_memory: The amount of top allocating lines to report, if tracing memory.
+        :return: A context manager measuring its body.
+        """
+        profiler = None
+        if profile is not None:
+            import cProfile
+
+            profiler = cProfile.Profile()
+        if trace_memory is not None:
+            import tracemalloc
+
+            tracemalloc.start()
+        try:
+            with self.phase("execution"):
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    yield
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if profiler is not None:
+                self.report_profile(profiler, profile)
+            if trace_memory is not None:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.report_memory(snapshot, peak, trace_memory)
+
+    def report_times(self, stream: TextIO = None) -> None:
+        """
+        Prints the time spent in every phase.
+        The import phase is the time between importing scripto and running the script,
+        excluding the registration of functions.
+        :param stream: The stream to print to, defaults to stderr.
+        :return: None
+        """
+        stream = stream or sys.stderr
+        phases = dict(self.phases)
+        if self._run_start is not None:
+            phases = {
+                "import": self._run_start - IMPORT_TIME - phases.get("registration", 0),
+                **phases,
+            }
+        print(f"{'phase':<16} {'time (ms)':>12}", file=stream)
+        for name, seconds in phases.items():
+            print(f"{name:<16} {seconds * 1000:>12.3f}", file=stream)
+        print(f"{'total':<16} {sum(phases.values()) * 1000:>12.3f}", file=stream)
+
+    @staticmethod
+    def report_profile(profiler: "cProfile.Profile", destination: str) -> None:
+        """
+        Reports the profile of the execution.
+        :param profiler: The profiler used.
+        :param destination: '-' to print the top entries to stderr, or a path to dump the pstats data to.
+        :return: None
+        """
+        if destination != "-":
+            profiler.dump_stats(destination)
+            print(f"Profile written to {destination}", file=sys.stderr)
+            return
+        import pstats
+
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_ENTRIES)
+
+    @staticmethod
+    def report_memory(snapshot: "tracemalloc.Snapshot", peak: int, top: int) -> None:
+        """
+        Reports the lines allocating the most memory during the execution.
+        :param snapshot: The snapshot taken at the end of the execution.
+        :param peak: The peak traced memory, in bytes.
+        :param top: The amount of lines to report.
+        :return: None
+        """
+        print(f"Peak traced memory: {peak / 1024:.1f} KiB", file=sys.stderr)
+        for statistic in snapshot.statistics("lineno")[:top]:
+            print(statistic, file=sys.stderr)
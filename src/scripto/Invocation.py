@@ -0,0 +1,167 @@
+"""
+Utilities for invoking scripts in-process, capturing their standard streams and exit code,
+so testing or embedding a script doesn't require spawning a process per command line.
+The standard streams are captured per thread, so many invocations may run at once.
+"""
+
+import contextlib
+import io
+import sys
+import threading
+from typing import Iterator, List
+
+_local = threading.local()
+_lock = threading.Lock()
+# The amount of active captures, and the standard streams replaced while there are any.
+_active = 0
+_originals = {}
+_STREAMS = ("stdin", "stdout", "stderr")
+
+
+class InvocationResult:
+    """
+    The result of invoking a script in-process.
+    """
+
+    __slots__ = ("argv", "exit_code", "stdout_bytes", "stderr", "error")
+
+    argv: List[str]
+    exit_code: int
+    stdout_bytes: bytes
+    stderr: str
+    error: BaseException | None
+
+    def __init__(self, argv: List[str], exit_code: int, stdout_bytes: bytes, stderr: str, error: BaseException = None):
+        """
+        :param argv: The command line the script was invoked with.
+        :param exit_code: The exit code, as the script would have exited with.
+        :param stdout_bytes: Everything written to stdout, including binary output formats.
+        :param stderr: Everything written to stderr.
+        :param error: The unhandled error raised by the command, if any. Its traceback is also written to stderr.
+        """
+        self.argv = argv
+        self.exit_code = exit_code
+        self.stdout_bytes = stdout_bytes
+        self.stderr = stderr
+        self.error = error
+
+    @property
+    def stdout(self) -> str:
+        """
+        :return: Everything written to stdout, decoded.
+        """
+        return self.stdout_bytes.decode("utf-8", "replace")
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        :return: Whether the exit code is 0.
+        """
+        return self.exit_code == 0
+
+    def lines(self) -> List[str]:
+        """
+        :return: The lines written to stdout.
+        """
+        return self.stdout.splitlines()
+
+    def json(self):
+        """
+        Parses stdout, as written with --scripto-output-format json.
+        :return: The parsed output.
+        """
+        import json  # pylint: disable=import-outside-toplevel
+
+        return json.loads(self.stdout_bytes)
+
+    def json_lines(self) -> list:
+        """
+        Parses stdout, as written with --scripto-output-format jsonl.
+        :return: The parsed items.
+        """
+        import json  # pylint: disable=import-outside-toplevel
+
+        return [json.loads(line) for line in self.stdout_bytes.splitlines() if line]
+
+    def __repr__(self):
+        return f"InvocationResult(argv={self.argv!r}, exit_code={self.exit_code}, error={self.error!r})"
+
+
+class _Capture:
+    """
+    The standard streams of a single invocation.
+    """
+
+    def __init__(self, stdin: str | bytes = None):
+        self._stdout = io.BytesIO()
+        self._stderr = io.BytesIO()
+        if isinstance(stdin, str):
+            stdin = stdin.encode()
+        # Text streams over binary buffers, like the real standard streams, so binary output formats work.
+        self.stdin = io.TextIOWrapper(io.BytesIO(stdin or b""), encoding="utf-8")
+        self.stdout = io.TextIOWrapper(self._stdout, encoding="utf-8", errors="backslashreplace", newline="")
+        self.stderr = io.TextIOWrapper(self._stderr, encoding="utf-8", errors="backslashreplace", newline="")
+
+    def stdout_bytes(self) -> bytes:
+        self.stdout.flush()
+        return self._stdout.getvalue()
+
+    def stderr_text(self) -> str:
+        self.stderr.flush()
+        return self._stderr.getvalue().decode("utf-8", "replace")
+
+
+class _ThreadStream:
+    """
+    Stands in for a standard stream while captures are active, forwarding to the stream captured by the current thread,
+    or to the original stream in threads which aren't capturing.
+    """
+
+    def __init__(self, name: str, original):
+        self._name = name
+        self._original = original
+
+    def _target(self):
+        capture = getattr(_local, "capture", None)
+        return self._original if capture is None else getattr(capture, self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __iter__(self):
+        return iter(self._target())
+
+    def write(self, data):
+        return self._target().write(data)
+
+    def flush(self):
+        return self._target().flush()
+
+
+@contextlib.contextmanager
+def captured(stdin: str | bytes = None) -> Iterator[_Capture]:
+    """
+    Captures the standard streams of the current thread.
+    Output written by other threads, such as the workers of --scripto-jobs, isn't captured.
+    :param stdin: The standard input to provide, empty if not given.
+    :return: A context manager providing the captured streams.
+    """
+    global _active  # pylint: disable=global-statement
+    capture = _Capture(stdin)
+    with _lock:
+        if _active == 0:
+            for name in _STREAMS:
+                _originals[name] = getattr(sys, name)
+                setattr(sys, name, _ThreadStream(name, _originals[name]))
+        _active += 1
+    previous = getattr(_local, "capture", None)
+    _local.capture = capture
+    try:
+        yield capture
+    finally:
+        _local.capture = previous
+        with _lock:
+            _active -= 1
+            if _active == 0:
+                for name in _STREAMS:
+                    setattr(sys, name, _originals.pop(name))
@@ -0,0 +1,412 @@
+"""
+Utilities for writing the outputs of functions, streaming iterators item by item.
+Structured formats are serialized by encoders selected on first use - orjson and msgpack when installed,
+falling back to the standard library and a built-in MessagePack packer - and more can be registered.
+Dataclasses, objects with __slots__, enums, dates and sets are serialized as plain values.
+"""
+
+# pylint: disable=import-outside-toplevel
+import collections.abc
+import enum
+import functools
+import importlib
+import os
+import struct
+import sys
+import time
+from typing import Callable, Dict, Tuple, TextIO
+
+# The formats handled by write_output itself, followed by the encoders in _ENCODERS.
+BUILTIN_FORMATS = ("text", "json", "csv")
+# Streamed items are flushed at most this often, in seconds, rather than one by one.
+FLUSH_INTERVAL = 0.05
+
+
+def is_stream(output) -> bool:
+    """
+    Checks whether the output of a function should be streamed item by item.
+    :param output: The output of the function.
+    :return: True for iterators and generators.
+    """
+    return isinstance(output, collections.abc.Iterator)
+
+
+# The attributes serialized for objects of types which aren't natively serializable, by type.
+_FIELDS: Dict[type, Tuple[str, ...] | None] = {}
+
+
+def _fields(value_type: type) -> Tuple[str, ...] | None:
+    """
+    :param value_type: The type of an object.
+    :return: The names of the fields of dataclasses, or of the slots of objects with __slots__, None for other types.
+    """
+    if value_type not in _FIELDS:
+        import dataclasses
+
+        if dataclasses.is_dataclass(value_type):
+            names = tuple(field.name for field in dataclasses.fields(value_type))
+        else:
+            names = []
+            for base in reversed(value_type.__mro__):
+                slots = base.__dict__.get("__slots__", ())
+                for name in [slots] if isinstance(slots, str) else slots:
+                    if name not in ("__dict__", "__weakref__") and name not in names:
+                        names.append(name)
+            names = tuple(names) if names else None
+        _FIELDS[value_type] = names
+    return _FIELDS[value_type]
+
+
+def to_plain(value):
+    """
+    Converts a value the encoders can't serialize natively into one they can, used as their fallback.
+    :param value: The value.
+    :return: A dictionary of the fields of dataclasses and objects with __slots__, the value of enums,
+     the ISO format of dates and times, a list for sets, and the string of anything else.
+    """
+    names = _fields(type(value))
+    if names is not None:
+        return {name: getattr(value, name) for name in names if hasattr(value, name)}
+    if isinstance(value, enum.Enum):
+        return value.value
+    import datetime
+
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, collections.abc.Mapping):
+        return dict(value)
+    return str(value)
+
+
+# The optional encoder packages by name, imported on first use, or None if they aren't installed.
+_packages = {}
+
+
+def _optional_package(name: str):
+    """
+    Imports an optional encoder package once it's first needed, so scripts writing text never import it.
+    :param name: The name of the package.
+    :return: The package, or None if it isn't installed.
+    """
+    if name not in _packages:
+        try:
+            _packages[name] = importlib.import_module(name)
+        except ImportError:
+            _packages[name] = None
+    return _packages[name]
+
+
+@functools.lru_cache(maxsize=None)
+def _json_encoder() -> "json.JSONEncoder":
+    """
+    :return: The standard library JSON encoder, compact like orjson, so the output doesn't depend on which is used.
+    """
+    import json
+
+    return json.JSONEncoder(default=to_plain, separators=(",", ":"))
+
+
+def encode_json(value) -> bytes:
+    """
+    Serializes a value as JSON, with orjson when installed.
+    :param value: The value.
+    :return: The JSON document.
+    """
+    orjson = _optional_package("orjson")
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=to_plain, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Such as integers beyond 64 bits, supported by the standard library.
+            pass
+    return _json_encoder().encode(value).encode()
+
+
+# The MessagePack integer types, from the smallest - the bound of their range, their marker and struct format.
+_UNSIGNED = ((1 << 8, 0xCC, ">BB"), (1 << 16, 0xCD, ">BH"), (1 << 32, 0xCE, ">BI"), (1 << 64, 0xCF, ">BQ"))
+_SIGNED = ((-(1 << 7), 0xD0, ">Bb"), (-(1 << 15), 0xD1, ">Bh"), (-(1 << 31), 0xD2, ">Bi"), (-(1 << 63), 0xD3, ">Bq"))
+
+
+def _pack(value, out: bytearray, depth: int = 0) -> None:
+    """
+    Serializes a value as MessagePack, for when the msgpack package isn't installed.
+    :param value: The value.
+    :param out: The buffer to append the serialized value to.
+    :param depth: The nesting depth of the value, limiting the conversion of recursive objects.
+    :return: None
+    """
+    # Fast paths for the most common values.
+    value_type = type(value)
+    if value_type is str and len(value) < 32 and value.isascii():
+        out.append(0xA0 | len(value))
+        out += value.encode()
+        return
+    if value_type is int and 0 <= value < 0x80:
+        out.append(value)
+        return
+    if depth > 512:
+        raise ValueError("The value is nested too deeply to serialize")
+    if value is None:
+        out.append(0xC0)
+    elif value is True or value is False:
+        out.append(0xC3 if value else 0xC2)
+    elif isinstance(value, int) and not isinstance(value, enum.Enum):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -0x20 <= value < 0:
+            out.append(value & 0xFF)
+        elif 0 <= value < (1 << 64):
+            for limit, marker, code in _UNSIGNED:
+                if value < limit:
+                    out += struct.pack(code, marker, value)
+                    break
+        elif -(1 << 63) <= value < 0:
+            for limit, marker, code in _SIGNED:
+                if value >= limit:
+                    out += struct.pack(code, marker, value)
+                    break
+        else:
+            # Beyond 64 bits, which MessagePack doesn't support.
+            _pack(str(value), out, depth)
+    elif isinstance(value, float):
+        out += struct.pack(">Bd", 0xCB, value)
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        size = len(data)
+        if size < 32:
+            out.append(0xA0 | size)
+        elif size < 0x100:
+            out += struct.pack(">BB", 0xD9, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDA, size)
+        else:
+            out += struct.pack(">BI", 0xDB, size)
+        out += data
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        size = len(value)
+        if size < 0x100:
+            out += struct.pack(">BB", 0xC4, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xC5, size)
+        else:
+            out += struct.pack(">BI", 0xC6, size)
+        out += value
+    elif isinstance(value, (list, tuple)):
+        size = len(value)
+        if size < 16:
+            out.append(0x90 | size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDC, size)
+        else:
+            out += struct.pack(">BI", 0xDD, size)
+        for item in value:
+            _pack(item, out, depth + 1)
+    elif isinstance(value, dict):
+        size = len(value)
+        if size < 16:
+            out.append(0x80 | size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xDE, size)
+        else:
+            out += struct.pack(">BI", 0xDF, size)
+        for key, item in value.items():
+            _pack(key, out, depth + 1)
+            _pack(item, out, depth + 1)
+    else:
+        _pack(to_plain(value), out, depth + 1)
+
+
+def encode_msgpack(value) -> bytes:
+    """
+    Serializes a value as MessagePack, with the msgpack package when installed.
+    Integers beyond 64 bits are written as strings either way.
+    :param value: The value.
+    :return: The serialized value.
+    """
+    msgpack = _optional_package("msgpack")
+    if msgpack is not None:
+        try:
+            return msgpack.packb(value, default=to_plain, use_bin_type=True)
+        except OverflowError:
+            # Integers beyond 64 bits, which MessagePack doesn't support - written as strings, like without msgpack.
+            pass
+    out = bytearray()
+    _pack(value, out)
+    return bytes(out)
+
+
+# Output formats serializing every item on its own - the encoding function, and the delimiter following every item.
+_ENCODERS: Dict[str, Tuple[Callable[[object], bytes], bytes]] = {
+    "jsonl": (encode_json, b"\n"),
+    "msgpack": (encode_msgpack, b""),
+}
+
+
+def register_encoder(name: str, encode: Callable[[object], bytes], delimiter: bytes = b"\n") -> None:
+    """
+    Registers an output format, or replaces the encoder of one, such as a faster JSON encoder for 'jsonl'.
+    Should be called before the script runs, so the format is accepted by --scripto-output-format.
+    :param name: The name of the format, as passed to --scripto-output-format.
+    :param encode: Serializes a single item into bytes.
+    :param delimiter: Written after every item, such as a newline for line based formats.
+    :return: None
+    """
+    if name in BUILTIN_FORMATS:
+        raise ValueError(f"Cannot replace the built-in output format: {name}")
+    _ENCODERS[name] = (encode, delimiter)
+
+
+def output_formats() -> Tuple[str, ...]:
+    """
+    :return: The names of the available output formats.
+    """
+    return (*BUILTIN_FORMATS, *_ENCODERS)
+
+
+class _CsvWriter:
+    """
+    Writes items as CSV rows. Mappings are written with a header taken from the first item.
+    """
+
+    def __init__(self, stream: TextIO):
+        import csv
+
+        self._stream = stream
+        self._writer = csv.writer(stream)
+        self._fields = None
+
+    def write(self, item) -> None:
+        if _fields(type(item)) is not None:
+            item = to_plain(item)
+        if isinstance(item, collections.abc.Mapping):
+            if self._fields is None:
+                self._fields = list(item.keys())
+                self._writer.writerow(self._fields)
+            self._writer.writerow([item.get(field, "") for field in self._fields])
+        elif isinstance(item, (str, bytes)) or not isinstance(
+            item, collections.abc.Iterable
+        ):
+            self._writer.writerow([item])
+        else:
+            self._writer.writerow(item)
+
+
+def _binary(stream: TextIO):
+    """
+    :param stream: A text stream, such as stdout.
+    :return: The binary stream underlying it, after flushing the text written to it so far.
+    """
+    stream.flush()
+    return stream.buffer
+
+
+def _item_writer(output_format: str, stream: TextIO):
+    """
+    Creates a function writing a single item in the requested format.
+    :param output_format: One of output_formats(), other than 'json'.
+    :param stream: The stream to write to.
+    :return: The writing function, and the stream it writes to.
+    """
+    if output_format in _ENCODERS:
+        encode, delimiter = _ENCODERS[output_format]
+        binary = _binary(stream)
+        write = binary.write
+        if delimiter:
+            return (lambda item: write(encode(item) + delimiter)), binary
+        return (lambda item: write(encode(item))), binary
+    if output_format == "csv":
+        return _CsvWriter(stream).write, stream
+    write = stream.write
+    return (lambda item: write(f"{item}\n")), stream
+
+
+def _write_items(items, write: Callable, stream, flush: bool = True) -> None:
+    """
+    Writes items, flushing every FLUSH_INTERVAL rather than after every item.
+    Items produced slowly are thus still written as they come, while quickly produced items are written in bulk.
+    :param items: The items.
+    :param write: Writes a single item.
+    :param stream: The stream written to.
+    :param flush: Whether to flush after the last item.
+    :return: None
+    """
+    clock = time.monotonic
+    next_flush = clock() + FLUSH_INTERVAL
+    try:
+        for item in items:
+            write(item)
+            now = clock()
+            if now >= next_flush:
+                stream.flush()
+                next_flush = now + FLUSH_INTERVAL
+    finally:
+        # Also when the output stops early, such as when cancelled, so the items written so far are complete.
+        if flush:
+            stream.flush()
+
+
+def _write_json(output, stream: TextIO) -> None:
+    """
+    Writes the output as a single JSON document. Streams are written as an array, item by item.
+    :param output: The output of the function.
+    :param stream: The stream to write to.
+    :return: None
+    """
+    binary = _binary(stream)
+    if not is_stream(output):
+        binary.write(encode_json(output) + b"\n")
+        binary.flush()
+        return
+    write = binary.write
+    separator = [b"[\n"]
+
+    def write_item(item):
+        write(separator[0] + encode_json(item))
+        separator[0] = b",\n"
+
+    try:
+        _write_items(output, write_item, binary)
+    finally:
+        write(b"[]\n" if separator[0] == b"[\n" else b"\n]\n")
+        binary.flush()
+
+
+def write_output(output, output_format: str = "text", stream: TextIO = None, flush: bool = True) -> None:
+    """
+    Writes the output of a function.
+    Iterators are consumed lazily, with every item written as soon as it is produced, and flushed at least every
+    FLUSH_INTERVAL, so the memory used doesn't depend on the size of the output.
+    :param output: The output of the function.
+    :param output_format: One of output_formats() - 'text' prints every item on its own line,
+     'json' writes the output as a single JSON document (streams as an array), 'csv' writes every item as a row,
+     and encoders such as 'jsonl' and 'msgpack' write every item on its own.
+    :param stream: The stream to write to, defaults to stdout. Binary formats write to its buffer.
+    :param flush: Whether to flush the stream once the output is written, rather than leaving it to the caller,
+     such as when writing many outputs.
+    :return: None
+    """
+    stream = stream or sys.stdout
+    if output_format == "json":
+        _write_json(output, stream)
+        return
+    if not is_stream(output):
+        if output_format == "text" or output is None:
+            if output:
+                print(output, file=stream)
+            return
+        # Structured formats write lists as one item per line/row.
+        output = output if isinstance(output, (list, tuple)) else [output]
+    write, target = _item_writer(output_format, stream)
+    _write_items(output, write, target, flush)
+
+
+def silence_broken_pipe() -> None:
+    """
+    Handles the reader of stdout going away (such as piping into `head`), by pointing stdout to devnull.
+    Prevents Python from failing again when flushing stdout at exit.
+    :return: None
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
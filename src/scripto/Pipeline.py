@@ -0,0 +1,112 @@
+"""
+The pipeline mode, chaining registered commands in-process.
+The output of every stage is passed as is to the input parameter of the next stage - plain values directly,
+and iterators lazily, so items flow through the whole pipeline one at a time.
+"""
+
+import queue
+import shlex
+import threading
+from typing import Callable, Iterator, List, Tuple
+
+from scripto.ArgParserUtils import ArgumentParsingError
+from scripto.Output import is_stream
+
+PIPE_SEPARATOR = "|"
+# The amount of items a threaded stage may produce ahead of the stage consuming them.
+DEFAULT_BUFFER_SIZE = 1024
+# How often a blocked producer checks whether its consumer went away, in seconds.
+_STOP_POLL_INTERVAL = 0.1
+
+
+def split_pipeline(pipeline: str) -> List[List[str]]:
+    """
+    Splits a pipeline into the command lines of its stages.
+    :param pipeline: The stages, separated by '|', such as "load x | transform --k 3 | dump y".
+    :return: The arguments of every stage.
+    """
+    lexer = shlex.shlex(pipeline, posix=True, punctuation_chars=PIPE_SEPARATOR)
+    lexer.whitespace_split = True
+    stages = [[]]
+    for token in lexer:
+        if token == PIPE_SEPARATOR:
+            stages.append([])
+        elif set(token) == {PIPE_SEPARATOR}:
+            raise ArgumentParsingError(f"Invalid separator in the pipeline: {token}")
+        else:
+            stages[-1].append(token)
+    if any(len(stage) == 0 for stage in stages):
+        raise ArgumentParsingError(f"Empty stage in the pipeline: {pipeline!r}")
+    return stages
+
+
+def threaded(iterator: Iterator, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator:
+    """
+    Consumes an iterator in a thread of its own, so it keeps producing items while they are being consumed.
+    Exceptions raised by the iterator are raised to the consumer, and the thread stops once the consumer stops.
+    :param iterator: The iterator to consume.
+    :param buffer_size: The amount of items produced ahead of the consumer.
+    :return: An iterator over the same items.
+    """
+    items = queue.Queue(buffer_size)
+    stopped = threading.Event()
+
+    def put(entry) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=_STOP_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put((True, item)):
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            put((False, e))
+            return
+        put((False, None))
+
+    def consume():
+        thread = threading.Thread(target=produce, name="scripto-pipeline-stage", daemon=True)
+        thread.start()
+        try:
+            while True:
+                is_item, value = items.get()
+                if is_item:
+                    yield value
+                elif value is None:
+                    return
+                else:
+                    raise value
+        finally:
+            stopped.set()
+
+    return consume()
+
+
+def run_pipeline(
+    calls: List[Tuple[Callable, dict, str | None]],
+    call: Callable[[Callable, dict], object],
+    threads: bool = False,
+):
+    """
+    Runs the stages of a pipeline, passing the output of every stage to the next one.
+    :param calls: Tuples of the function of every stage, its keyword arguments, and the name of the parameter
+     receiving the output of the previous stage (ignored for the first stage).
+    :param call: Calls a function with its keyword arguments, returning the output.
+    :param threads: Whether stages producing iterators run in threads of their own, rather than producing
+     every item when the next stage asks for it.
+    :return: The output of the last stage.
+    """
+    output = None
+    for index, (func, kwargs, input_name) in enumerate(calls):
+        if index > 0:
+            kwargs = {**kwargs, input_name: output}
+        output = call(func, kwargs)
+        if threads and is_stream(output):
+            output = threaded(output)
+    return output
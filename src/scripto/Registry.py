@@ -0,0 +1,86 @@
+"""
+The index of the registered commands, with constant time lookups by command name, alias, qualified name and function.
+"""
+
+from types import FunctionType
+from typing import Dict, Iterator
+
+from scripto.FunctionData import FunctionData
+
+
+class Registry:
+    """
+    Holds the registration records of the commands of a script, in registration order.
+    Records are keyed by the qualified name of their function, so functions with the same name in different
+    modules don't collide. A function registered more than once is keyed by its command name as well.
+    """
+
+    __slots__ = ("_records", "_by_command", "_by_function")
+
+    _records: Dict[str, FunctionData]
+    _by_command: Dict[str, FunctionData]
+    _by_function: Dict[FunctionType, FunctionData]
+
+    def __init__(self):
+        self._records = {}
+        self._by_command = {}
+        self._by_function = {}
+
+    def add(self, func_data: FunctionData) -> str:
+        """
+        Adds a registration record.
+        :param func_data: The record to add.
+        :return: The key of the record.
+        """
+        key = func_data.qualified_name()
+        if key in self._records:
+            key = f"{key}#{func_data.command_name()}"
+        if key in self._records:
+            raise ValueError(f"{key} is already registered")
+        self._records[key] = func_data
+        for command in (func_data.command_name(), *(func_data.aliases or ())):
+            # Like argparse, later registrations take over names used before.
+            self._by_command[command] = func_data
+        self.index_function(func_data)
+        return key
+
+    def index_function(self, func_data: FunctionData) -> None:
+        """
+        Indexes a record by its function, once loaded. Lazily registered functions are indexed after being imported.
+        :param func_data: The record to index.
+        :return: None
+        """
+        if func_data.function is not None:
+            self._by_function.setdefault(func_data.function, func_data)
+
+    def lookup(self, command: str) -> FunctionData | None:
+        """
+        :param command: A command name or alias.
+        :return: The record of the command, or None if unknown.
+        """
+        return self._by_command.get(command)
+
+    def for_function(self, func: FunctionType) -> FunctionData | None:
+        """
+        :param func: A registered function.
+        :return: Its first registration record, or None for unregistered (or lazily registered) functions.
+        """
+        return self._by_function.get(func)
+
+    def __getitem__(self, key: str) -> FunctionData:
+        return self._records[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._records
+
+    def __iter__(self) -> Iterator[FunctionData]:
+        return iter(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def first(self) -> FunctionData:
+        """
+        :return: The first registered record.
+        """
+        return next(iter(self._records.values()))
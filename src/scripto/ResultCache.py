@@ -0,0 +1,210 @@
+"""
+A memoization cache for the results of pure commands, in memory and optionally on disk.
+"""
+
+import collections
+import functools
+import hashlib
+import inspect
+import io
+import os
+import pickle
+import sys
+import threading
+import time
+import zlib
+from types import FunctionType
+from typing import Callable, TextIO, Tuple
+
+from scripto.Context import is_context
+from scripto.Converters import unwrap_optional
+from scripto.FileTypes import file_arguments, with_files
+from scripto.Output import is_stream
+from scripto.SpecCache import SpecCache, function_fingerprint, get_cache_directory, stable_repr
+
+DEFAULT_MAX_ENTRIES = 128
+
+
+class _CompressedCache(SpecCache):
+    """
+    A SpecCache storing its entries as zlib compressed pickles.
+    """
+
+    _suffix = ".zpickle"
+
+    @staticmethod
+    def _dumps(entry: dict) -> bytes:
+        return zlib.compress(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _loads(data: bytes) -> dict:
+        return pickle.loads(zlib.decompress(data))
+
+
+class ResultCache:
+    """
+    A least recently used cache of results with an optional time to live, keyed by hex digests.
+    Entries are kept in memory, and on disk if persistent, where they are shared between runs of the script.
+    """
+
+    ttl: float | None
+    max_entries: int
+    hits: int
+    misses: int
+    _entries: collections.OrderedDict
+    _disk: _CompressedCache | None
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        ttl: float = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        directory: str = None,
+    ):
+        """
+        :param ttl: The amount of seconds results are valid for, forever if None.
+        :param max_entries: The maximal amount of results to keep, in memory and on disk.
+        :param directory: The directory to persist results in, kept in memory only if None.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._disk = _CompressedCache(directory, max_entries) if directory else None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, object]:
+        """
+        Looks up a result, counting a hit or a miss.
+        :param key: The key of the result.
+        :return: A tuple of whether the result was found, and the result.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._disk is not None:
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is not None and entry[0] is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key: str, result) -> None:
+        """
+        Stores a result. Results which cannot be pickled are only kept in memory.
+        :param key: The key of the result.
+        :param result: The result.
+        :return: None
+        """
+        entry = (None if self.ttl is None else time.time() + self.ttl, result)
+        with self._lock:
+            self._store(key, entry)
+        if self._disk is not None:
+            self._disk.put(key, entry)
+
+    def _store(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def report(self, name: str, stream: TextIO = None) -> None:
+        """
+        Prints the hit and miss statistics of the cache.
+        :param name: The name of the cached command.
+        :param stream: The stream to print to, defaults to stderr.
+        :return: None
+        """
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        print(
+            f"{name}: {self.hits} hits, {self.misses} misses ({ratio:.0f}% hit rate), "
+            f"{len(self._entries)}/{self.max_entries} entries in memory",
+            file=stream or sys.stderr,
+        )
+
+
+def cache_directory(func: FunctionType) -> str:
+    """
+    :param func: The cached function.
+    :return: The directory the persistent results of the function are stored in.
+    """
+    module = func.__module__
+    if module == "__main__":
+        # Naming scripts by their file, so functions of different scripts don't share a directory.
+        module = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    return get_cache_directory("results", f"{module}.{func.__qualname__}")
+
+
+def cached(func: FunctionType, cache: ResultCache, *extra) -> Callable:
+    """
+    Wraps a function so its results are looked up in a cache before calling it.
+    Results are keyed by the arguments and a fingerprint of the function, so changing the function invalidates them.
+    Parameters taking the execution context are left out of the keys.
+    Iterators and generators are streamed and are never cached.
+    File arguments are keyed by their paths, modification times and sizes, and opened only when the function
+    is actually called. Calls reading stdin, writing output files or taking open streams are never cached,
+    as their results can't be told apart by their arguments.
+    :param func: The function to wrap.
+    :param cache: The cache to store the results in.
+    :param extra: Additional values the results depend on, such as the registration arguments.
+    :return: The wrapping function, a coroutine function if func is one.
+    """
+    fingerprint = []
+    contexts = set()
+
+    def key(kwargs: dict) -> str | None:
+        if any(isinstance(value, io.IOBase) for value in kwargs.values()):
+            return None
+        files = [argument.fingerprint() for argument in file_arguments(kwargs)]
+        if None in files:
+            return None
+        if not fingerprint:
+            # Computed on the first call, so registering cached functions costs nothing.
+            fingerprint.append(function_fingerprint(func, *extra))
+            contexts.update(
+                name
+                for name, param in inspect.signature(func).parameters.items()
+                if is_context(unwrap_optional(param.annotation))
+            )
+        digest = hashlib.sha256(fingerprint[0].encode())
+        # The injected contexts are per call, and never change the result.
+        digest.update(stable_repr(sorted(item for item in kwargs.items() if item[0] not in contexts)).encode())
+        digest.update(stable_repr(files).encode())
+        return digest.hexdigest()
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(**kwargs):
+            result_key = key(kwargs)
+            if result_key is None:
+                return await with_files(func, kwargs)(**kwargs)
+            found, result = cache.get(result_key)
+            if not found:
+                result = await with_files(func, kwargs)(**kwargs)
+                cache.put(result_key, result)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(**kwargs):
+        result_key = key(kwargs)
+        if result_key is None:
+            return with_files(func, kwargs)(**kwargs)
+        found, result = cache.get(result_key)
+        if not found:
+            result = with_files(func, kwargs)(**kwargs)
+            if not is_stream(result):
+                cache.put(result_key, result)
+        return result
+
+    return wrapper
@@ -0,0 +1,233 @@
+"""
+The HTTP service mode, exposing the registered functions as endpoints.
+Every command is served at /<name> (and /<alias>), taking its parameters as a JSON object in the request body,
+or as query parameters. The parsers validating the requests are built once, when the server starts.
+"""
+
+import argparse
+import concurrent.futures
+import http.server
+import inspect
+import json
+import os
+import sys
+import urllib.parse
+from typing import Callable, Dict, Tuple
+
+from scripto.ArgParserUtils import ArgumentParsingError
+from scripto.Batch import dict_to_argv
+from scripto.Executor import AsyncRunner
+from scripto.Output import encode_json, is_stream
+
+# Idle keep-alive connections are closed after this many seconds, releasing their worker.
+KEEP_ALIVE_TIMEOUT = 5
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Parses the address to serve on.
+    :param address: '[HOST:]PORT', the host defaults to localhost.
+    :return: A tuple of the host and port.
+    """
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid address: {address}, expected [HOST:]PORT")
+    return host or "127.0.0.1", int(port)
+
+
+def _to_json(value) -> bytes:
+    return encode_json(value)
+
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """
+    An HTTP server handling connections on a fixed size thread pool, rather than a new thread per connection.
+    """
+
+    _pool: concurrent.futures.ThreadPoolExecutor
+
+    def __init__(self, address: Tuple[str, int], handler, workers: int):
+        super().__init__(address, handler)
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_handler(
+    routes: Dict[str, argparse.ArgumentParser],
+    summaries: Dict[str, str],
+    prepare_call: Callable[[argparse.Namespace], Tuple[Callable, dict]],
+    async_runner: AsyncRunner,
+):
+    """
+    Creates the request handler class serving the commands.
+    :param routes: The parsers of the commands, keyed by their paths. The parsers must raise ArgumentParsingError.
+    :param summaries: The one line summaries of the commands, keyed by their paths, listed at /.
+    :param prepare_call: Extracts the function and its arguments from the parsed arguments.
+    :param async_runner: The runner of coroutine functions, shared by all requests.
+    :return: The handler class.
+    """
+    index = {path: summaries.get(path) or "" for path in routes}
+
+    class CommandHandler(http.server.BaseHTTPRequestHandler):
+        """
+        Handles the requests of a single connection, keeping it alive between requests.
+        """
+
+        protocol_version = "HTTP/1.1"
+        timeout = KEEP_ALIVE_TIMEOUT
+        # The headers and body are sent separately, which Nagle's algorithm delays on keep-alive connections.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            self._handle()
+
+        def do_POST(self):  # pylint: disable=invalid-name
+            self._handle()
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            # Logging every request to stderr costs more than handling most of them.
+            pass
+
+        def _handle(self):
+            path, _, query = self.path.partition("?")
+            path = urllib.parse.unquote(path.rstrip("/")) or "/"
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            parser = routes.get(path)
+            if parser is None:
+                if path == "/":
+                    self._send_json(200, {"commands": index})
+                else:
+                    self._send_json(404, {"error": f"Unknown command: {path[1:]}"})
+                return
+            try:
+                call = prepare_call(parser.parse_args(self._argv(parser, query, body)))
+            except (ArgumentParsingError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._respond(*call)
+
+        @staticmethod
+        def _argv(parser: argparse.ArgumentParser, query: str, body: bytes) -> list:
+            """
+            Converts the parameters of a request to command line arguments.
+            The body may hold a JSON object mapping parameters to values, or a JSON list of arguments.
+            Query parameters given more than once are passed as lists.
+            """
+            values = {
+                key: value[0] if len(value) == 1 else value
+                for key, value in urllib.parse.parse_qs(query, keep_blank_values=True).items()
+            }
+            if body.strip():
+                parsed = json.loads(body)
+                if isinstance(parsed, list):
+                    return [*map(str, parsed), *dict_to_argv(parser, values)]
+                if not isinstance(parsed, dict):
+                    raise ArgumentParsingError("The body must be a JSON object or list")
+                values.update(parsed)
+            return dict_to_argv(parser, values)
+
+        def _respond(self, func: Callable, kwargs: dict):
+            try:
+                if inspect.iscoroutinefunction(func):
+                    succeeded, output = async_runner.submit(func, kwargs).result()
+                    if not succeeded:
+                        self._send_json(500, {"error": output})
+                        return
+                else:
+                    output = func(**kwargs)
+                if is_stream(output):
+                    self._stream(output)
+                else:
+                    self._send_json(200, {"result": output})
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away mid-response.
+                self.close_connection = True
+            except Exception as e:  # pylint: disable=broad-except
+                self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def _send_json(self, status: int, payload: dict):
+            data = _to_json(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, output):
+            """
+            Streams the items of an iterator as JSON lines, in a chunk per item.
+            The first item is produced before responding, so failing generators still get an error status.
+            """
+            iterator = iter(output)
+            try:
+                first = [next(iterator)]
+            except StopIteration:
+                first = []
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for items in (first, iterator):
+                    for item in items:
+                        self._write_chunk(_to_json(item) + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:  # pylint: disable=broad-except
+                self._write_chunk(_to_json({"error": f"{type(e).__name__}: {e}"}) + b"\n")
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return CommandHandler
+
+
+def serve_http(
+    routes: Dict[str, argparse.ArgumentParser],
+    summaries: Dict[str, str],
+    prepare_call: Callable[[argparse.Namespace], Tuple[Callable, dict]],
+    address: str,
+    workers: int = None,
+    loop_factory=None,
+) -> None:
+    """
+    Serves the commands over HTTP until interrupted.
+    :param routes: The parsers of the commands, keyed by their paths. The parsers must raise ArgumentParsingError.
+    :param summaries: The one line summaries of the commands, keyed by their paths, listed at /.
+    :param prepare_call: Extracts the function and its arguments from the parsed arguments.
+    :param address: '[HOST:]PORT' to listen on.
+    :param workers: The amount of worker threads, each serving a single connection at a time.
+     Defaults to 4 per CPU.
+    :param loop_factory: A function creating the event loop coroutine functions run on.
+    :return: None
+    """
+    workers = workers or (os.cpu_count() or 1) * 4
+    async_runner = AsyncRunner(workers, loop_factory)
+    server = PooledHTTPServer(
+        parse_address(address), create_handler(routes, summaries, prepare_call, async_runner), workers
+    )
+    host, port = server.server_address[:2]
+    print(f"Serving {len(routes)} routes on http://{host}:{port}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        async_runner.close()
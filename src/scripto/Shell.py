@@ -0,0 +1,178 @@
+"""
+The interactive mode, running commands entered line by line against a parser built once.
+"""
+
+import argparse
+import os
+import shlex
+import sys
+from typing import Callable, Dict, List
+
+from scripto.ArgParserUtils import ArgumentParsingError
+from scripto.SpecCache import get_cache_directory
+
+try:
+    import readline
+except ImportError:  # Not available on Windows.
+    readline = None
+
+EXIT_COMMANDS = ("exit", "quit")
+HISTORY_LENGTH = 1000
+
+
+class OutputClosed(Exception):
+    """
+    Raised by the executor of the shell once the reader of stdout went away, such as `head` exiting,
+    ending the shell - unlike other errors, which are reported without stopping it.
+    """
+
+
+def get_history_path(prog: str) -> str:
+    """
+    Returns the path of the history file of a script.
+    :param prog: The name the script is invoked with.
+    :return: The path of the history file.
+    """
+    return get_cache_directory("history", f"{prog}.history")
+
+
+class ShellCompleter:
+    """
+    Completes commands, flags and choices from the actions of the parser.
+    """
+
+    _top_level: List[str]
+    _commands: Dict[str, argparse.ArgumentParser]
+
+    def __init__(self, parser: argparse.ArgumentParser, top_level: List[str]):
+        """
+        :param parser: The parser of the script.
+        :param top_level: Words completed at the start of a line, besides the commands.
+        """
+        # pylint: disable=protected-access
+        self._commands = {"": parser}
+        for action in parser._actions:
+            if isinstance(action, argparse._SubParsersAction):
+                self._commands = dict(action.choices)
+        self._top_level = [*top_level, *(command for command in self._commands if command)]
+        self._matches = []
+
+    def candidates(self, words: List[str], current: str) -> List[str]:
+        """
+        Finds the completion candidates of a word.
+        :param words: The words preceding the completed word on the line.
+        :param current: The completed word, possibly empty.
+        :return: The candidates starting with the completed word.
+        """
+        # pylint: disable=protected-access
+        if "" in self._commands:
+            parser = self._commands[""]
+        elif not words:
+            return [word for word in self._top_level if word.startswith(current)]
+        else:
+            parser = self._commands.get(words[0])
+            if parser is None:
+                return []
+        previous = parser._option_string_actions.get(words[-1]) if words else None
+        if previous is not None and previous.nargs != 0 and previous.choices:
+            options = [str(choice) for choice in previous.choices]
+        elif current.startswith("-"):
+            options = list(parser._option_string_actions)
+        else:
+            options = [
+                str(choice)
+                for action in parser._actions
+                if not action.option_strings and action.choices
+                for choice in action.choices
+            ]
+        return [option for option in options if option.startswith(current)]
+
+    def complete(self, text: str, state: int) -> str | None:
+        """
+        The readline completer function.
+        :param text: The completed word.
+        :param state: The index of the requested candidate.
+        :return: The candidate, or None when there are no more.
+        """
+        if state == 0:
+            line = readline.get_line_buffer()[: readline.get_begidx()]
+            try:
+                words = shlex.split(line)
+            except ValueError:
+                words = line.split()
+            self._matches = [f"{match} " for match in self.candidates(words, text)]
+        return self._matches[state] if state < len(self._matches) else None
+
+
+def run_shell(
+    prog: str,
+    parser: argparse.ArgumentParser,
+    execute: Callable[[List[str]], int],
+    stdin=None,
+) -> None:
+    """
+    Runs commands entered line by line until end of input or an exit command.
+    :param prog: The name of the script, used for the prompt and the history file.
+    :param parser: The parser of the script, used for completion.
+    :param execute: Runs a single command line, already split to arguments.
+     Errors raised are reported without stopping the shell, except for OutputClosed, which exits with code 1.
+    :param stdin: The stream to read lines from, defaults to stdin. No prompt is printed when it isn't a terminal.
+    :return: None
+    """
+    stdin = stdin or sys.stdin
+    interactive = stdin.isatty()
+    history_path = get_history_path(prog)
+    if readline is not None and interactive:
+        readline.set_completer(ShellCompleter(parser, ["help", *EXIT_COMMANDS]).complete)
+        readline.set_completer_delims(" \t\n")
+        readline.parse_and_bind("tab: complete")
+        readline.set_history_length(HISTORY_LENGTH)
+        try:
+            readline.read_history_file(history_path)
+        except OSError:
+            pass
+        print(f"{prog} interactive shell - 'help' lists the commands, 'exit' or Ctrl-D leaves.")
+    try:
+        while True:
+            try:
+                line = input(f"{prog}> ") if interactive else stdin.readline()
+            except KeyboardInterrupt:
+                print()
+                continue
+            except EOFError:
+                print()
+                break
+            if not interactive and not line:
+                break
+            try:
+                words = shlex.split(line, comments=True)
+            except ValueError as e:
+                print(f"Invalid line: {e}", file=sys.stderr)
+                continue
+            if not words:
+                continue
+            if words[0] in EXIT_COMMANDS:
+                break
+            if words[0] == "help":
+                parser.print_help()
+                continue
+            try:
+                execute(words)
+            except OutputClosed:
+                raise SystemExit(1) from None
+            except (ArgumentParsingError, SystemExit) as e:
+                # Errors of argparse, and --help, which exits after printing.
+                if isinstance(e, ArgumentParsingError):
+                    print(f"error: {e}", file=sys.stderr)
+            except KeyboardInterrupt:
+                print("Interrupted", file=sys.stderr)
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"{type(e).__name__}: {e}", file=sys.stderr)
+            sys.stdout.flush()
+    finally:
+        if readline is not None and interactive:
+            try:
+                os.makedirs(os.path.dirname(history_path), exist_ok=True)
+                readline.write_history_file(history_path)
+            except OSError:
+                pass
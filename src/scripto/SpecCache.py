@@ -0,0 +1,189 @@
+"""
+An on-disk cache for parser specifications, saving the introspection of functions on every run.
+"""
+
+# pylint: disable=import-outside-toplevel
+import marshal
+import os
+import sys
+from types import FunctionType
+
+# Bump whenever the structure generated by generate_parser_spec changes.
+SPEC_FORMAT_VERSION = 3
+DEFAULT_MAX_ENTRIES = 512
+
+
+def get_cache_directory(*parts: str) -> str:
+    """
+    Returns the scripto directory inside the user's cache directory.
+    :param parts: Sub-directories to append to the path.
+    :return: The path of the directory, which might not exist yet.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~/AppData/Local"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "scripto", *parts)
+
+
+def stable_repr(value) -> str:
+    """
+    Returns a representation of a value which doesn't change between runs.
+    Sets are sorted, as their iteration order depends on the hash seed of the process.
+    :param value: The value to represent.
+    :return: The representation of the value.
+    """
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(stable_repr(item) for item in value)) + "}"
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ", ".join(
+                f"{stable_repr(key)}: {stable_repr(item)}"
+                for key, item in value.items()
+            )
+            + "}"
+        )
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}(" + ", ".join(map(stable_repr, value)) + ")"
+    return repr(value)
+
+
+def function_fingerprint(func: FunctionType, *extra) -> str:
+    """
+    Hashes everything the parser of a function is derived from.
+    Any change to the code, signature or documentation of the function results in a new fingerprint.
+    :param func: The function to fingerprint.
+    :param extra: Additional values that affect the result, such as the registration arguments.
+    :return: A hex digest identifying the function.
+    """
+    import hashlib
+
+    digest = hashlib.sha256()
+    digest.update(marshal.dumps(func.__code__))
+    for part in (
+        SPEC_FORMAT_VERSION,
+        func.__module__,
+        func.__qualname__,
+        func.__doc__,
+        func.__defaults__,
+        func.__kwdefaults__,
+        func.__annotations__,
+        *extra,
+    ):
+        digest.update(stable_repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SpecCache:
+    """
+    Stores parser specifications as files in a directory, one file per fingerprint.
+    Entries of functions that changed are never looked up again, and are eventually evicted,
+    as the least recently used entries are removed once the cache grows past its size cap.
+    """
+
+    _directory: str
+    _max_entries: int
+    _suffix = ".pickle"
+
+    def __init__(self, directory: str = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param directory: The directory to store the cache in, defaults to the user's cache directory.
+        :param max_entries: The maximal amount of specifications to keep.
+        """
+        self._directory = directory or get_cache_directory("specs")
+        self._max_entries = max_entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}{self._suffix}")
+
+    @staticmethod
+    def _dumps(entry: dict) -> bytes:
+        import pickle
+
+        return pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data: bytes) -> dict:
+        import pickle
+
+        return pickle.loads(data)
+
+    def get(self, key: str) -> dict | None:
+        """
+        Retrieves a specification from the cache.
+        :param key: The fingerprint of the function.
+        :return: The cached specification, or None if missing or unreadable.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                entry = self._loads(cache_file.read())
+        except FileNotFoundError:
+            return None
+        except Exception:  # pylint: disable=broad-except
+            # A corrupt entry, or one referencing types that no longer exist - rebuilding it.
+            self._remove(path)
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            self._remove(path)
+            return None
+        try:
+            # Marking the entry as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["spec"]
+
+    def put(self, key: str, spec: dict) -> None:
+        """
+        Stores a specification in the cache, evicting old entries if the cache is full.
+        Specifications which cannot be serialized (for example, containing lambdas) are silently skipped.
+        :param key: The fingerprint of the function.
+        :param spec: The specification to store.
+        :return: None
+        """
+        try:
+            data = self._dumps({"key": key, "spec": spec})
+        except Exception:  # pylint: disable=broad-except
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            self._remove(temp_path)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache is within its size cap.
+        :return: None
+        """
+        try:
+            entries = [
+                entry
+                for entry in os.scandir(self._directory)
+                if entry.name.endswith(self._suffix)
+            ]
+        except OSError:
+            return
+        if len(entries) <= self._max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self._max_entries]:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -4,24 +4,90 @@ Contains the Scripto class, which is the main holder of the script data/metadata
 """
 
 import argparse
+import contextlib
 import functools
+import importlib.util
+import inspect
 import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import warnings
 from argparse import ArgumentParser
 from types import FunctionType
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Tuple
 
 from scripto.ArgParserUtils import (
+    RUNNER_HELP_FLAG,
+    ArgumentParsingError,
+    RaisingArgumentParser,
+    ScriptoArgumentParser,
     add_logging_flags,
-    generate_parser_definitions,
-    generate_action_settings,
+    apply_parser_spec,
+    generate_parser_spec,
+    make_optional,
+    split_runner_options,
 )
+from scripto.Completion import (
+    COMPLETION_FLAG,
+    INDEX_ONLY,
+    SHELLS,
+    build_index,
+    completion_script,
+    get_index_path,
+    sources_fingerprint,
+    write_index,
+)
+from scripto.Context import (
+    INTERRUPT_EXIT_CODE,
+    PROGRESS_FORMATS,
+    CancellationToken,
+    Cancelled,
+    Context,
+    finish_after,
+    handle_signals,
+)
+from scripto.Converters import converters_version
+from scripto.Daemon import DAEMON_SOCKET_VARIABLE
+from scripto.Executor import EXECUTORS, fan_out, run_coroutine
+from scripto.FileTypes import with_files
 from scripto.FuncUtils import (
     validate_parameters_in_docstring,
     get_argument_names,
-    make_kebab_case,
 )
+from scripto.Instrumentation import Instrumentation
+from scripto.Invocation import InvocationResult, captured
+from scripto.Output import FLUSH_INTERVAL, output_formats, silence_broken_pipe, write_output
+from scripto.SpecCache import SpecCache, function_fingerprint
 
 from scripto.FunctionData import FunctionData
+from scripto.Registry import Registry
+
+# The modules of the runner modes, such as Server or Config, are imported by the code paths using them,
+# so scripts only pay for importing what a run actually uses.
+# pylint: disable=import-outside-toplevel
+
+VALIDATION_MODES = ("eager", "deferred", "off")
+# Overrides the validation mode of every script, such as 'off' in production, or 'eager' in CI.
+VALIDATION_VARIABLE = "SCRIPTO_VALIDATION"
+# The attribute of parsed arguments holding the registration record of the command, never a parameter name.
+RECORD_DEST = "scripto:record"
+
+
+class _RunState(threading.local):
+    """
+    The cancellation token and progress format of the current run, shared by the contexts of its calls.
+    Kept per thread, so the script can be invoked from many threads at once.
+    """
+
+    token: CancellationToken
+    progress: str
+
+    def __init__(self):
+        self.token = CancellationToken()
+        self.progress = "off"
 
 
 class Scripto:
@@ -31,33 +97,443 @@ class Scripto:
 
     _description: str
     _silence: bool
-    _functions: List[FunctionData]
-    _arg_initializers: dict
+    _registry: Registry
     _use_logger: bool
+    _lazy: bool
+    _spec_cache: SpecCache | None
+    _loop_factory: Callable[[], "asyncio.AbstractEventLoop"] | None
+    _instrument: bool
+    _instrumentation: Instrumentation
+    _validation: str
+    _config: "ConfigSources | None"
+    _effective_config: dict
+    _run: _RunState
+    _parsers: Tuple[ArgumentParser, ArgumentParser] | None
+    _parsers_lock: threading.Lock
 
-    def __init__(self, description, suppress_warnings=False, auto_log=False):
+    def __init__(
+        self,
+        description,
+        suppress_warnings=False,
+        auto_log=False,
+        lazy=False,
+        cache_specs=False,
+        loop_factory=None,
+        instrument=False,
+        validation="eager",
+        config=False,
+    ):
+        """
+        :param description: The description of the script, shown in the help message.
+        :param suppress_warnings: Whether to suppress the warnings generated while registering functions.
+        :param auto_log: Whether to add logging level flags to every command.
+        :param lazy: Whether to only build the parser of the command being invoked.
+         The full parser tree is still built for the top level help message or an unknown command.
+        :param cache_specs: Whether to cache the parser specifications of the functions on disk,
+         saving the introspection of the functions on following runs.
+         May also be a SpecCache instance, for a custom location or size.
+        :param loop_factory: A function creating the event loop that async functions run on,
+         such as uvloop.new_event_loop. Defaults to asyncio.new_event_loop.
+        :param instrument: Whether to add the --scripto-time, --scripto-profile and --scripto-trace-memory flags,
+         reporting the time spent in every phase of running the script, and profiling the commands.
+        :param validation: When the documentation and annotations of functions are checked for issues:
+         'eager' when registering them, 'deferred' only when their command is invoked, or 'off'.
+         `python -m scripto.lint` checks all commands of a script at once.
+         The SCRIPTO_VALIDATION environment variable takes precedence, when set.
+        :param config: Whether to read the values of parameters from the user and project config files,
+         and from SCRIPTO_<COMMAND>_<PARAMETER> environment variables, overridden by the command line.
+         Adds the --scripto-show-effective-config flag. May also be a ConfigSources instance, for custom locations.
+        """
         self._description = description
         self._silence = suppress_warnings
         self._use_logger = auto_log
-        self._functions = []
-        self._arg_initializers = {}
+        self._lazy = lazy
+        self._loop_factory = loop_factory
+        self._instrument = instrument
+        self._validation = os.environ.get(VALIDATION_VARIABLE) or validation
+        if self._validation not in VALIDATION_MODES:
+            raise ValueError(
+                f"Invalid validation mode: {self._validation}, choose from: {', '.join(VALIDATION_MODES)}"
+            )
+        self._instrumentation = Instrumentation()
+        self._spec_cache = (
+            cache_specs
+            if isinstance(cache_specs, SpecCache)
+            else SpecCache() if cache_specs else None
+        )
+        self._config = None
+        if config:
+            from scripto.Config import ConfigSources
 
+            self._config = config if isinstance(config, ConfigSources) else ConfigSources()
+        # The values applied from the config sources to the parsers built, by command.
+        self._effective_config = {}
+        self._run = _RunState()
+        # The parsers used by invoke, built on the first invocation.
+        self._parsers = None
+        self._parsers_lock = threading.Lock()
+        self._registry = Registry()
 
-    def run(self) -> None:
+    def run(self, interactive=False) -> None:
         """
         Parses the functions into an ArgumentParser and runs the script accordingly.
+        :param interactive: Whether to run an interactive shell, reading commands line by line,
+         as with the --scripto-shell runner option.
         :return: None
         """
-        parser = argparse.ArgumentParser(
+        self._instrumentation.mark_run()
+        if len(self._registry) == 0:
+            raise ValueError("No functions registered...")
+        socket_path = os.environ.get(DAEMON_SOCKET_VARIABLE)
+        if socket_path:
+            # Started by the client of the daemon mode, serving invocations instead of running.
+            del os.environ[DAEMON_SOCKET_VARIABLE]
+            from scripto.Daemon import serve
+
+            serve(self._run_with_argv, socket_path, self._sources_fingerprint)
+            return
+        prog = os.path.basename(sys.argv[0])
+        if sys.argv[1:2] == [COMPLETION_FLAG]:
+            self._print_completion(prog, sys.argv[2:])
+            return
+        runner_options, argv = split_runner_options(
+            self._create_runner_parser(), sys.argv[1:]
+        )
+        if interactive or getattr(runner_options, "shell", False):
+            self._run_shell(prog)
+            return
+        code = self._execute(runner_options, argv)
+        if code:
+            exit(code)
+
+    def invoke(self, argv: List[str], stdin: str | bytes = None) -> InvocationResult:
+        """
+        Runs the script in-process as if it was invoked with the given command line, capturing its output
+        and exit code instead of writing to the terminal and exiting.
+        The parsers are built once, and reused by following invocations.
+        Safe to call from many threads at once, as the standard streams are captured per thread.
+        :param argv: The command line arguments, excluding the program name.
+        :param stdin: The standard input of the invocation, such as the records of `--scripto-batch -`. Empty if not given.
+        :return: The result of the invocation.
+        """
+        if len(self._registry) == 0:
+            raise ValueError("No functions registered...")
+        argv = list(argv)
+        runner_parser, parser = self._invocation_parsers()
+        error = None
+        with captured(stdin) as capture:
+            try:
+                runner_options, rest = split_runner_options(runner_parser, argv)
+                if getattr(runner_options, "shell", False):
+                    self._run_shell(parser.prog)
+                    code = 0
+                else:
+                    code = self._execute(runner_options, rest, parser)
+            except ArgumentParsingError as e:
+                print(f"{parser.prog}: error: {e}", file=sys.stderr)
+                code = 2
+            except SystemExit as e:
+                # Such as --help, or invalid runner options.
+                if e.code is None or isinstance(e.code, int):
+                    code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except Exception as e:  # pylint: disable=broad-except
+                traceback.print_exc()
+                code, error = 1, e
+            return InvocationResult(argv, code, capture.stdout_bytes(), capture.stderr_text(), error)
+
+    def invoke_many(self, cases: Iterable, jobs: int = 1) -> Iterator[InvocationResult]:
+        """
+        Invokes the script once per case, in-process, such as for running a table of test cases.
+        :param cases: The command lines to invoke, or tuples of a command line and its standard input.
+        :param jobs: The amount of cases invoked at once, in threads.
+        :return: Generates the results, in the order of the cases.
+        """
+        calls = (
+            (self.invoke, {"argv": case[0], "stdin": case[1]} if isinstance(case, tuple) else {"argv": case})
+            for case in cases
+        )
+        for _, succeeded, result in fan_out(calls, jobs=jobs):
+            if not succeeded:
+                raise RuntimeError(result)
+            yield result
+
+    def _invocation_parsers(self) -> Tuple[ArgumentParser, ArgumentParser]:
+        """
+        Builds the parsers used by invoke, once.
+        :return: A tuple of the runner options parser and the parser of the script.
+        """
+        with self._parsers_lock:
+            if self._parsers is None:
+                runner_parser = self._create_runner_parser()
+                with self._instrumentation.phase("parser build"):
+                    parser = self._build_parser([], RaisingArgumentParser, complete=True)
+                parser.prog = os.path.basename(sys.argv[0])
+                self._parsers = (runner_parser, parser)
+            return self._parsers
+
+    def _execute(
+        self, runner_options: argparse.Namespace, argv: List[str], parser: ArgumentParser = None
+    ) -> int:
+        """
+        Runs a command line, and reports the run according to the runner options.
+        :param runner_options: The parsed runner options.
+        :param argv: The rest of the command line arguments.
+        :param parser: A parser of the script to reuse, built if not given.
+        :return: The exit code.
+        """
+        try:
+            code = self._dispatch(runner_options, argv, parser)
+        except BrokenPipeError:
+            # The reader of the output went away, such as when piping into `head`.
+            silence_broken_pipe()
+            code = 1
+        except (Cancelled, KeyboardInterrupt) as e:
+            code = self._report_cancelled(e)
+        if getattr(runner_options, "time", False):
+            self._instrumentation.report_times()
+        if getattr(runner_options, "cache_stats", False):
+            self._report_cache_stats()
+        return code
+
+    def _dispatch(
+        self, runner_options: argparse.Namespace, argv: List[str], parser: ArgumentParser = None
+    ) -> int:
+        """
+        Parses the command line and runs the selected function according to the runner options.
+        :param runner_options: The parsed runner options.
+        :param argv: The rest of the command line arguments.
+        :param parser: A parser of the script to reuse, built if not given.
+        :return: The exit code.
+        """
+        self._run.token = CancellationToken(getattr(runner_options, "timeout", None))
+        self._run.progress = getattr(runner_options, "progress", "auto")
+        execution = self._execution(runner_options)
+        if getattr(runner_options, "batch", None) is not None:
+            with execution:
+                return self._run_batch(runner_options, argv)
+        if getattr(runner_options, "serve", None) is not None:
+            self._serve_http(runner_options)
+            return 0
+        if getattr(runner_options, "pipe", None) is not None:
+            with execution:
+                return self._run_pipeline(runner_options, argv)
+        if parser is None:
+            with self._instrumentation.phase("parser build"):
+                parser = self._build_parser(argv)
+        if getattr(runner_options, "show_effective_config", False):
+            self._show_effective_config(parser, argv)
+            return 0
+        # Parsing the arguments passed to the program.
+        with self._instrumentation.phase("parse"):
+            args = parser.parse_args(argv)
+
+        # Handling a weird edge case where when nothing is passed, part 2
+        if len(vars(args)) == 0:
+            parser.print_help()
+            return 1
+
+        with execution:
+            if getattr(runner_options, "fan_out", None) is not None:
+                return self._run_fan_out(runner_options, parser, args)
+            write_output(self._run.token.guard(self._call(args)), getattr(runner_options, "output_format", "text"))
+        return 0
+
+    @contextlib.contextmanager
+    def _execution(self, runner_options: argparse.Namespace):
+        """
+        Runs the command under the cancellation and instrumentation runner options.
+        :param runner_options: The parsed runner options.
+        :return: A context manager wrapping the execution.
+        """
+        with handle_signals(self._run.token), self._instrumentation.execution(
+            getattr(runner_options, "profile", None),
+            getattr(runner_options, "trace_memory", None),
+        ):
+            yield
+
+    def _create_runner_parser(self) -> ArgumentParser:
+        """
+        Creates the parser of the options controlling how the script is run, rather than the function itself.
+        These options are only accepted before the command, and never reach the functions.
+        They are all prefixed with RUNNER_OPTION_PREFIX, so they never shadow the parameters of the functions,
+        and are listed by --scripto-help rather than by the help message of the script.
+        :return: The runner options parser.
+        """
+        runner_parser = argparse.ArgumentParser(
+            prog=os.path.basename(sys.argv[0]),
+            usage="%(prog)s [runner options] [command] [arguments]",
+            description="Runner options control how the script is run, and are only accepted before the command.",
+            add_help=False,
+            argument_default=argparse.SUPPRESS,
+        )
+        runner = runner_parser.add_argument_group("runner options")
+        runner.add_argument(
+            RUNNER_HELP_FLAG,
+            action="help",
+            help="Show this help message and exit.",
+        )
+        runner.add_argument(
+            "--scripto-batch",
+            dest="batch",
+            metavar="FILE",
+            help="Run the command once per record in FILE ('-' for stdin). "
+            "Arguments given after the runner options are prepended to every record.",
+        )
+        runner.add_argument(
+            "--scripto-batch-format",
+            dest="batch_format",
+            choices=["lines", "json"],
+            help="The format of the batch records: shell-like argument lines (the default), "
+            "or JSON lines holding argument lists or objects mapping parameters to values.",
+        )
+        runner.add_argument(
+            "--scripto-output-format",
+            dest="output_format",
+            choices=output_formats(),
+            help="The format of the output: 'text' (the default) prints the output as is, "
+            "'json' writes a single JSON document, 'jsonl' writes JSON lines, 'csv' writes CSV rows "
+            "and 'msgpack' writes MessagePack values. "
+            "Commands returning iterators or generators are streamed, an item per line, row or value.",
+        )
+        runner.add_argument(
+            "--scripto-fan-out",
+            dest="fan_out",
+            metavar="PARAM",
+            help="Call the command once per item of the list parameter PARAM, instead of once with the whole list.",
+        )
+        runner.add_argument(
+            "--scripto-jobs",
+            dest="jobs",
+            type=int,
+            metavar="N",
+            help="The amount of parallel workers for --scripto-batch and --scripto-fan-out, "
+            "or the amount of calls running at once for async commands. Defaults to 1.",
+        )
+        runner.add_argument(
+            "--scripto-executor",
+            dest="executor",
+            choices=EXECUTORS,
+            help="Whether the parallel workers are threads (the default) or processes.",
+        )
+        runner.add_argument(
+            "--scripto-as-completed",
+            dest="as_completed",
+            action="store_true",
+            help="Output results as they complete, rather than in the order of the inputs.",
+        )
+        runner.add_argument(
+            "--scripto-serve",
+            dest="serve",
+            metavar="[HOST:]PORT",
+            help="Serve the commands over HTTP instead of running one, at /<command>, "
+            "taking the parameters as a JSON object or as query parameters. "
+            "--scripto-jobs sets the amount of connections handled at once.",
+        )
+        runner.add_argument(
+            "--scripto-pipe",
+            dest="pipe",
+            metavar="PIPELINE",
+            help="Run a pipeline of commands in-process, such as \"load x | transform --k 3 | dump y\", "
+            "passing the output of every command to the input parameter of the next one "
+            "(its first parameter, unless registered with pipe_input). Iterators are passed on lazily.",
+        )
+        runner.add_argument(
+            "--scripto-pipe-threads",
+            dest="pipe_threads",
+            action="store_true",
+            help="Run every --scripto-pipe stage producing an iterator in a thread of its own, "
+            "so all stages work at once.",
+        )
+        runner.add_argument(
+            "--scripto-shell",
+            dest="shell",
+            action="store_true",
+            help="Run an interactive shell, reading commands (optionally preceded by runner options) line by line.",
+        )
+        runner.add_argument(
+            "--scripto-timeout",
+            dest="timeout",
+            type=float,
+            metavar="SECONDS",
+            help="Cancel the command once SECONDS pass, exiting with code 124. "
+            "Commands taking a Context stop at their next progress report or check, "
+            "and streamed output is cut after the last item produced in time.",
+        )
+        runner.add_argument(
+            "--scripto-progress",
+            dest="progress",
+            choices=PROGRESS_FORMATS,
+            help="How commands taking a Context report their progress to stderr: "
+            "'auto' (the default) renders it when stderr is a terminal, 'text' always renders it, "
+            "'json' writes JSON lines events, and 'off' disables it.",
+        )
+        if any(func_data.result_cache is not None for func_data in self._registry):
+            runner.add_argument(
+                "--scripto-cache-stats",
+                dest="cache_stats",
+                action="store_true",
+                help="Print the hits and misses of the result caches of the commands to stderr.",
+            )
+        if self._config is not None:
+            runner.add_argument(
+                "--scripto-show-effective-config",
+                dest="show_effective_config",
+                action="store_true",
+                help="Print the value of every parameter of the command and where it came from "
+                "(the command line, the environment, a config file or the default), instead of running it. "
+                "Without a command, prints the configured values of all commands.",
+            )
+        if self._instrument:
+            instrumentation = runner_parser.add_argument_group("instrumentation options")
+            instrumentation.add_argument(
+                "--scripto-time",
+                dest="time",
+                action="store_true",
+                help="Print the time spent in every phase of running the script to stderr.",
+            )
+            instrumentation.add_argument(
+                "--scripto-profile",
+                dest="profile",
+                nargs="?",
+                const="-",
+                metavar="FILE",
+                help="Profile the execution of the command, printing the top entries to stderr, "
+                "or dumping the pstats data to FILE (given as --scripto-profile=FILE).",
+            )
+            instrumentation.add_argument(
+                "--scripto-trace-memory",
+                dest="trace_memory",
+                nargs="?",
+                const=10,
+                type=int,
+                metavar="N",
+                help="Trace the memory allocations of the command, printing the top N "
+                "(given as --scripto-trace-memory=N, 10 by default) allocating lines to stderr.",
+            )
+        return runner_parser
+
+    def _build_parser(
+        self, argv: List[str], parser_class=ScriptoArgumentParser, complete=False
+    ) -> ArgumentParser:
+        """
+        Builds the parser of the script.
+        :param argv: The command line arguments, used to only build the required sub-parser in lazy mode.
+        :param parser_class: The class of the parser to build.
+        :param complete: Whether to build the parsers of all commands even in lazy mode.
+        :return: The parser.
+        """
+        parser = parser_class(
             description=self._description,
             conflict_handler="resolve",
             formatter_class=argparse.RawDescriptionHelpFormatter,
+            epilog=f"Runner options, controlling how the script is run, are listed by {RUNNER_HELP_FLAG}.",
         )
-        if len(self._functions) == 0:
-            raise ValueError("No functions registered...")
-        if len(self._functions) == 1:
-            function = self._functions[0]
-            self.add_function_to_parser(function.func(), parser)
+        if len(self._registry) == 1:
+            func_data = self._registry.first()
+            self.add_function_to_parser(func_data.func(), parser, self._get_spec(func_data), func_data)
         else:
             # Handling a weird edge case where when nothing is passed, part 1.
             # You can look up this error:
@@ -65,117 +541,616 @@ class Scripto:
             # There's all sorts of stuff about this online - setting this to false and handling the
             #  lack of parameters seems like the best workaround for now
             sub = parser.add_subparsers(required=False)
-            for func_data in self._functions:
-                name, settings = generate_parser_definitions(func_data.func())
-                if func_data.aliases is None:
-                    sub_parser = sub.add_parser(
-                        name if func_data.name is None else func_data.name,
-                        **settings,
-                        conflict_handler="resolve",
-                        formatter_class=argparse.RawDescriptionHelpFormatter,
-                    )
-                    self.add_function_to_parser(func_data.func(), sub_parser)
-                else:
-                    sub_parser = sub.add_parser(
-                        name if func_data.name is None else func_data.name,
-                        **settings,
-                        conflict_handler="resolve",
-                        formatter_class=argparse.RawDescriptionHelpFormatter,
-                        aliases=func_data.aliases,
-                    )
-                    self.add_function_to_parser(func_data.func(), sub_parser)
-        # Parsing the arguments passed to the program.
-        args = parser.parse_args()
-        func_args = {**vars(args)}
-
-        # Handling a weird edge case where when nothing is passed, part 2
-        if (len(func_args)) == 0:
-            parser.print_help()
-            exit(1)
+            lazy = self._lazy and not complete
+            selected = self._select_function(argv) if lazy else None
+            if selected is None:
+                for func_data in self._registry:
+                    if lazy and not func_data.is_resolved():
+                        self._add_stub_parser(sub, func_data)
+                    else:
+                        self._add_sub_parser(sub, func_data)
+            else:
+                self._add_sub_parser(sub, selected)
+        return parser
 
+    def _prepare_call(self, args: argparse.Namespace):
+        """
+        Extracts the function selected by the parsed arguments, and the arguments to call it with.
+        :param args: The parsed arguments.
+        :return: A tuple of the function and its keyword arguments.
+        """
+        func_args = {**vars(args)}
         # Popping the function used out of the arguments passed to the function.
-        func_args.pop("func")
+        func = func_args.pop("func")
+        func_data = func_args.pop(RECORD_DEST, None) or self._registry.for_function(func)
+        if func_data is not None and self._validation == "deferred" and not func_data.validated:
+            func_data.validated = True
+            validate_parameters_in_docstring(func, self._silence)
+        if func_data is not None and func_data.cached_call is not None:
+            func = func_data.cached_call
+        else:
+            func = with_files(func, func_args)
         if self._use_logger:
             logging.basicConfig(level=func_args["log_level"])
             func_args.pop("log_level")
-        output = args.func(**func_args)
-        if output:
-            print(output)
+        if func_data is not None:
+            for name in self._get_spec(func_data).get("context", ()):
+                func_args[name] = Context(self._run.token, self._run.progress)
+        return func, func_args
+
+    def _call(self, args: argparse.Namespace):
+        """
+        Calls the function selected by the parsed arguments.
+        :param args: The parsed arguments.
+        :return: The output of the function.
+        """
+        return self._invoke(*self._prepare_call(args))
+
+    def _fan_out(self, runner_options: argparse.Namespace, calls):
+        """
+        Runs calls according to the parallelism runner options.
+        :param runner_options: The parsed runner options.
+        :param calls: The calls to make, as accepted by Executor.fan_out.
+        :return: Generates the results, as generated by Executor.fan_out.
+        """
+        return fan_out(
+            calls,
+            jobs=getattr(runner_options, "jobs", 1),
+            executor=getattr(runner_options, "executor", "thread"),
+            ordered=not getattr(runner_options, "as_completed", False),
+            loop_factory=self._loop_factory,
+        )
+
+    @staticmethod
+    def _report(runner_options: argparse.Namespace, results, describe) -> int:
+        """
+        Prints the outputs of many calls, and reports their failures to stderr.
+        :param runner_options: The parsed runner options.
+        :param results: The results, as generated by Executor.fan_out.
+        :param describe: A function describing a call by its index, used when reporting failures.
+        :return: The amount of failed calls.
+        """
+        output_format = getattr(runner_options, "output_format", "text")
+        failures = 0
+        # Flushing the outputs periodically rather than one by one, as many calls produce small outputs.
+        next_flush = time.monotonic() + FLUSH_INTERVAL
+        try:
+            for index, succeeded, output in results:
+                if not succeeded:
+                    failures += 1
+                    print(f"{describe(index)} failed: {output}", file=sys.stderr, flush=True)
+                else:
+                    write_output(output, output_format, flush=False)
+                    if time.monotonic() >= next_flush:
+                        sys.stdout.flush()
+                        next_flush = time.monotonic() + FLUSH_INTERVAL
+        finally:
+            sys.stdout.flush()
+        return failures
+
+    def _run_batch(self, runner_options: argparse.Namespace, prefix: List[str]) -> int:
+        """
+        Runs the script once per batch record, in-process, streaming the results.
+        :param runner_options: The parsed runner options.
+        :param prefix: Arguments to prepend to every record, usually the command to run.
+        :return: The exit code - 0 if all records succeeded, 1 otherwise.
+        """
+        from scripto.Batch import open_batch_source, read_records, record_to_argv
+
+        with self._instrumentation.phase("parser build"):
+            parser = self._build_parser(prefix, RaisingArgumentParser)
+        line_numbers = []
+
+        def calls():
+            with open_batch_source(runner_options.batch) as source:
+                records = read_records(source, getattr(runner_options, "batch_format", "lines"))
+                for number, record in records:
+                    self._run.token.check()
+                    line_numbers.append(number)
+                    try:
+                        args = parser.parse_args(record_to_argv(parser, prefix, record))
+                        if "func" not in args:
+                            raise ArgumentParsingError("No command given")
+                        yield self._prepare_call(args)
+                    except (Exception, SystemExit) as e:  # pylint: disable=broad-except
+                        yield e
+
+        failures = self._report(
+            runner_options,
+            self._fan_out(runner_options, calls()),
+            lambda index: f"Record {line_numbers[index]}",
+        )
+        print(
+            f"Batch finished: {len(line_numbers) - failures} succeeded, {failures} failed",
+            file=sys.stderr,
+        )
+        return 1 if failures else 0
+
+    def _run_fan_out(
+        self, runner_options: argparse.Namespace, parser: ArgumentParser, args: argparse.Namespace
+    ) -> int:
+        """
+        Calls the selected function once per item of one of its list parameters.
+        :param runner_options: The parsed runner options.
+        :param parser: The parser the arguments were parsed with, used for reporting errors.
+        :param args: The parsed arguments.
+        :return: The exit code - 0 if all calls succeeded, 1 otherwise.
+        """
+        func, func_args = self._prepare_call(args)
+        parameter = runner_options.fan_out.replace("-", "_")
+        items = func_args.get(parameter)
+        if not isinstance(items, (list, tuple)):
+            parser.error(f"--scripto-fan-out requires a list parameter, got: {runner_options.fan_out}")
+        calls = ((func, {**func_args, parameter: [item]}) for item in self._checked(items))
+        failures = self._report(
+            runner_options,
+            self._fan_out(runner_options, calls),
+            lambda index: f"Item {index + 1} ({items[index]})",
+        )
+        return 1 if failures else 0
+
+    def _checked(self, items):
+        """
+        Stops iterating once the run is cancelled, so no further calls are made.
+        :param items: The items to iterate over.
+        :return: Generates the items.
+        """
+        for item in items:
+            self._run.token.check()
+            yield item
+
+    def _report_cancelled(self, error: BaseException) -> int:
+        """
+        Reports a cancelled run to stderr, after flushing the output written so far.
+        :param error: The Cancelled or KeyboardInterrupt error stopping the run.
+        :return: The exit code.
+        """
+        try:
+            sys.stdout.flush()
+        except BrokenPipeError:
+            silence_broken_pipe()
+        if isinstance(error, Cancelled):
+            print(error, file=sys.stderr)
+            return error.exit_code
+        print("Interrupted", file=sys.stderr)
+        return INTERRUPT_EXIT_CODE
+
+    def _invoke(self, func: Callable, func_args: dict):
+        """
+        Calls a prepared function, running it to completion if it's a coroutine function.
+        :param func: The function, as returned by _prepare_call.
+        :param func_args: The arguments to call it with.
+        :return: The output of the function.
+        """
+        contexts = [value for value in func_args.values() if isinstance(value, Context)]
+        try:
+            output = func(**func_args)
+            if inspect.iscoroutine(output):
+                output = run_coroutine(output, self._loop_factory)
+        except Cancelled:
+            for context in contexts:
+                context.finish("cancelled")
+            raise
+        return finish_after(output, contexts) if contexts else output
+
+    def _run_pipeline(self, runner_options: argparse.Namespace, argv: List[str]) -> int:
+        """
+        Runs the stages of a pipeline in-process, passing the output of every stage to the next one as is.
+        :param runner_options: The parsed runner options.
+        :param argv: The arguments following the runner options, which should be empty.
+        :return: The exit code.
+        """
+        from scripto.Pipeline import run_pipeline, split_pipeline
+
+        calls = []
+        try:
+            if argv:
+                raise ArgumentParsingError(f"Unexpected arguments after the pipeline: {' '.join(argv)}")
+            for index, words in enumerate(split_pipeline(runner_options.pipe)):
+                func_data = self._registry.lookup(words[0])
+                if func_data is not None:
+                    words = words[1:]
+                elif len(self._registry) == 1:
+                    func_data = self._registry.first()
+                else:
+                    raise ArgumentParsingError(f"Unknown command: {words[0]}")
+                func, spec = func_data.func(), self._get_spec(func_data)
+                parser = RaisingArgumentParser(
+                    prog=func_data.command_name(),
+                    description=spec["parser"]["description"],
+                    add_help=False,
+                    conflict_handler="resolve",
+                )
+                self.add_function_to_parser(func, parser, spec, func_data)
+                # The injected context can't take the output of the previous stage.
+                names = [name for name in get_argument_names(func) if name not in spec["context"]]
+                input_name = func_data.pipe_input or (names[0] if names else None)
+                if index > 0:
+                    if input_name is None:
+                        raise ArgumentParsingError(
+                            f"Stage {index + 1} ({func_data.command_name()}) takes no input from the previous stage"
+                        )
+                    make_optional(parser, input_name)
+                calls.append((*self._prepare_call(parser.parse_args(words)), input_name))
+        except ArgumentParsingError as e:
+            print(f"Invalid pipeline: {e}", file=sys.stderr)
+            return 2
+        output = run_pipeline(calls, self._invoke, getattr(runner_options, "pipe_threads", False))
+        write_output(self._run.token.guard(output), getattr(runner_options, "output_format", "text"))
+        return 0
+
+    def _run_shell(self, prog: str) -> None:
+        """
+        Runs the interactive shell, parsing and dispatching every line in-process with a parser built once.
+        :param prog: The name the script is invoked with.
+        :return: None
+        """
+        from scripto.Shell import OutputClosed, run_shell
+
+        runner_parser = self._create_runner_parser()
+        with self._instrumentation.phase("parser build"):
+            parser = self._build_parser([], RaisingArgumentParser, complete=True)
+        parser.prog = prog
+
+        def execute(words: List[str]) -> int:
+            runner_options, argv = split_runner_options(runner_parser, words)
+            try:
+                return self._dispatch(runner_options, argv, parser)
+            except BrokenPipeError as e:
+                silence_broken_pipe()
+                raise OutputClosed() from e
+            except Cancelled as e:
+                return self._report_cancelled(e)
+            finally:
+                if getattr(runner_options, "cache_stats", False):
+                    self._report_cache_stats()
+
+        run_shell(prog, parser, execute)
+
+    def _show_effective_config(self, parser: ArgumentParser, argv: List[str]) -> None:
+        """
+        Prints the value of every parameter of the invoked command, and the source it came from.
+        Without a command, prints the values the config sources set for all commands.
+        :param parser: The parser of the script, with the config sources applied.
+        :param argv: The command line arguments.
+        :return: None
+        """
+        from scripto.Config import COMMAND_LINE_SOURCE, DEFAULT_SOURCE
+
+        args = parser.parse_args(argv)
+        func = getattr(args, "func", None)
+        if func is None:
+            for command, applied in self._effective_config.items():
+                if not applied:
+                    continue
+                print(f"{command}:")
+                for dest, (value, source) in applied.items():
+                    print(f"  {dest} = {value!r} ({source})")
+            return
+        command = (getattr(args, RECORD_DEST, None) or self._registry.for_function(func)).command_name()
+        applied = self._effective_config.get(command, {})
+        defaults = inspect.signature(func).parameters
+        print(f"{command}:")
+        for dest, value in vars(args).items():
+            if dest not in defaults:
+                continue
+            # Values equal to the ones they default to are assumed not to be given on the command line.
+            if dest in applied:
+                source = applied[dest][1] if applied[dest][0] == value else COMMAND_LINE_SOURCE
+            elif defaults[dest].default is not inspect.Parameter.empty and defaults[dest].default == value:
+                source = DEFAULT_SOURCE
+            else:
+                source = COMMAND_LINE_SOURCE
+            print(f"  {dest} = {value!r} ({source})")
+
+    def _report_cache_stats(self) -> None:
+        """
+        Prints the hit and miss statistics of the result caches that were used to stderr.
+        :return: None
+        """
+        for func_data in self._registry:
+            cache = func_data.result_cache
+            if cache is not None and (cache.hits or cache.misses):
+                cache.report(func_data.command_name())
+
+    def _serve_http(self, runner_options: argparse.Namespace) -> None:
+        """
+        Serves the registered functions over HTTP, with their parsers built once up front.
+        :param runner_options: The parsed runner options.
+        :return: None
+        """
+        from scripto.Server import serve_http
+
+        with self._instrumentation.phase("parser build"):
+            routes = {}
+            summaries = {}
+            for func_data in self._registry:
+                spec = self._get_spec(func_data)
+                parser = RaisingArgumentParser(
+                    prog=func_data.command_name(),
+                    description=spec["parser"]["description"],
+                    add_help=False,
+                    conflict_handler="resolve",
+                )
+                self.add_function_to_parser(func_data.func(), parser, spec, func_data)
+                names = [func_data.command_name(), *(func_data.aliases or ())]
+                if len(self._registry) == 1:
+                    names.append("")
+                routes.update((f"/{name}", parser) for name in names)
+                summaries.update((f"/{name}", spec["parser"]["help"]) for name in names)
+        try:
+            address = runner_options.serve
+            serve_http(
+                routes,
+                summaries,
+                self._prepare_call,
+                address,
+                getattr(runner_options, "jobs", None),
+                self._loop_factory,
+            )
+        except (ValueError, OSError) as e:
+            print(f"Cannot serve on {runner_options.serve}: {e}", file=sys.stderr)
+            exit(2)
+
+    def _select_function(self, argv: List[str]) -> FunctionData | None:
+        """
+        Peeks at the command line to find the single function that is about to be invoked.
+        Only the first token is considered, as the top level parser takes no positional arguments.
+        :param argv: The command line arguments, excluding the program name.
+        :return: The matching function data, or None if the full parser tree is required
+         (no command, top level flags such as --help, or an unknown command).
+        """
+        if len(argv) == 0 or argv[0].startswith("-"):
+            return None
+        return self._registry.lookup(argv[0])
+
+    def _add_sub_parser(self, sub, func_data: FunctionData) -> None:
+        """
+        Builds the sub parser of a single registered function.
+        :param sub: The subparsers action to add the parser to.
+        :param func_data: The function to build the parser for.
+        :return: None
+        """
+        spec = self._get_spec(func_data)
+        name, settings = spec["name"], {**spec["parser"]}
+        if func_data.aliases is not None:
+            settings["aliases"] = func_data.aliases
+        sub_parser = sub.add_parser(
+            name if func_data.name is None else func_data.name,
+            **settings,
+            conflict_handler="resolve",
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+        )
+        self.add_function_to_parser(func_data.func(), sub_parser, spec, func_data)
+
+    @staticmethod
+    def _add_stub_parser(sub, func_data: FunctionData) -> None:
+        """
+        Adds a help-only sub parser for a lazily registered function, without importing it.
+        Used in the full parser tree, which is only built for the help message and unknown commands.
+        :param sub: The subparsers action to add the parser to.
+        :param func_data: The lazily registered function.
+        :return: None
+        """
+        summary = func_data.summary.replace("%", "%%") if func_data.summary else None
+        sub.add_parser(
+            func_data.command_name(),
+            help=summary,
+            description=summary,
+            aliases=func_data.aliases or [],
+        )
+
+    def _run_with_argv(self, argv: List[str]) -> None:
+        """
+        Runs the script as if it was invoked with the given command line.
+        :param argv: The command line, including the program name.
+        :return: None
+        """
+        sys.argv = argv
+        self.run()
+
+    def _sources_fingerprint(self) -> str:
+        """
+        :return: A cheap fingerprint of the source files of the script and its registered functions.
+        """
+        # Lazily registered functions are identified by their target, so checking doesn't import them.
+        return sources_fingerprint(
+            [
+                func_data.function.__code__.co_filename
+                for func_data in self._registry
+                if func_data.target is None
+            ],
+            [func_data.qualified_name() for func_data in self._registry],
+        )
 
-    def add_function_to_parser(self, func: FunctionType, parser: ArgumentParser):
+    def _print_completion(self, prog: str, argv: List[str]) -> None:
+        """
+        Writes the completion index of the script, and prints the completion script for the requested shell.
+        Meant to be used as: eval "$(my_script.py --scripto-completion bash)"
+        The completion scripts pass INDEX_ONLY instead of a shell, to only regenerate a stale index.
+        :param prog: The name the script is invoked with.
+        :param argv: The arguments following the completion flag, optionally containing the shell name.
+        :return: None
+        """
+        shell = argv[0] if argv else "bash"
+        if shell not in (*SHELLS, INDEX_ONLY):
+            print(f"Unsupported shell: {shell}, choose from: {', '.join(SHELLS)}", file=sys.stderr)
+            exit(2)
+        script_path = os.path.abspath(sys.argv[0])
+        index_path = get_index_path(script_path)
+        self._write_completion_index(index_path, script_path)
+        if shell != INDEX_ONLY:
+            print(completion_script(shell, prog, script_path, index_path))
+
+    def _write_completion_index(self, index_path: str, script_path: str) -> None:
+        """
+        Builds the completion index from the specifications of all registered functions.
+        :param index_path: The path to write the index to.
+        :param script_path: The absolute path of the script, listed among the sources the index is built from.
+        :return: None
+        """
+        if len(self._registry) == 1:
+            commands = [([""], self._get_spec(self._registry.first()))]
+        else:
+            commands = []
+            for func_data in self._registry:
+                spec = self._get_spec(func_data)
+                name = spec["name"] if func_data.name is None else func_data.name
+                commands.append(([name, *(func_data.aliases or ())], spec))
+        # Lazily registered functions were imported by building their specifications, so their files are known.
+        sources = [script_path]
+        for func_data in self._registry:
+            code = getattr(inspect.unwrap(func_data.func()), "__code__", None)
+            if code is not None:
+                sources.append(os.path.abspath(code.co_filename))
+        try:
+            write_index(index_path, build_index(sources, commands, self._use_logger))
+        except OSError:
+            pass
+
+    def lint(self) -> dict:
+        """
+        Validates all registered functions at once, regardless of the validation mode.
+        Checks the documentation and annotations of every function, that its parser can be built,
+        and that no two commands claim the same name.
+        :return: A mapping of command names to the list of issues found with them, for commands with issues.
+        """
+        issues = {}
+        claimed = {}
+        for func_data in self._registry:
+            found = []
+            for command in (func_data.command_name(), *(func_data.aliases or ())):
+                claimed.setdefault(command, []).append(func_data.qualified_name())
+            try:
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter("always")
+                    validate_parameters_in_docstring(func_data.func())
+                # The same warning may be issued once per parameter.
+                found += dict.fromkeys(str(warning.message) for warning in caught)
+                self._get_spec(func_data)
+            except Exception as e:  # pylint: disable=broad-except
+                found.append(f"{type(e).__name__}: {e}")
+            if found:
+                # Functions registered more than once share their command's issues, rather than replacing them.
+                issues.setdefault(func_data.command_name(), []).extend(found)
+        for command, owners in claimed.items():
+            if len(owners) > 1:
+                issues.setdefault(command, []).append(
+                    f'The name "{command}" is claimed by {len(owners)} commands: {", ".join(owners)}'
+                )
+        return issues
+
+    def compile(self, source: str = "") -> str:
+        """
+        Generates a standalone entry point module for the script, with its parsers spelled out as literal
+        argparse calls, only importing the function that runs and never importing scripto.app.
+        Runner options, such as --scripto-batch, result caches and config sources are not available in the generated
+        module - see scripto.Compiler.
+        :param source: The name of the script, mentioned in the generated module.
+        :return: The source of the generated module.
+        """
+        from scripto.Compiler import generate_module
+
+        commands = [
+            (
+                func_data.func(),
+                self._get_spec(func_data),
+                func_data.name,
+                func_data.aliases,
+            )
+            for func_data in self._registry
+        ]
+        return generate_module(self._description, source, commands, self._use_logger)
+
+    def _get_spec(self, func_data: FunctionData) -> dict:
+        """
+        Retrieves the parser specification of a registered function, from the spec cache if enabled.
+        The specification is kept on the registration record, so it's only generated once per run.
+        :param func_data: The registration record of the function.
+        :return: The parser specification of the function.
+        """
+        if func_data.spec is not None:
+            return func_data.spec
+        func, initializers = func_data.func(), func_data.initializers
+        self._registry.index_function(func_data)
+        if self._spec_cache is None:
+            spec = generate_parser_spec(func, initializers)
+        else:
+            # Specifications hold the converters of the parameters, so they're keyed by the registered converters.
+            key = function_fingerprint(func, initializers, converters_version())
+            spec = self._spec_cache.get(key)
+            if spec is None:
+                spec = generate_parser_spec(func, initializers)
+                self._spec_cache.put(key, spec)
+        func_data.spec = spec
+        return spec
+
+    def add_function_to_parser(
+        self, func: FunctionType, parser: ArgumentParser, spec: dict = None, func_data: FunctionData = None
+    ):
         """
         Registers a new function into the parser definitions.
         :param func: The function to register.
         :param parser: The parser that the function should be added to.
+        :param spec: The parser specification of the function, retrieved if not provided.
+        :param func_data: The registration record the parser is built for, stored in the parsed arguments so
+         calls are dispatched by it. Defaults to the first record of the function, as one may be registered twice.
         :return: None
         """
-        for name, settings in generate_action_settings(func):
-            target_name = name
-            if isinstance(name, list):
-                target_name = name[0][2:].replace("-", "_")
-            if target_name in self._arg_initializers[func.__name__]:
-                argument_values = self._arg_initializers[func.__name__][target_name]
-                if isinstance(argument_values, dict):
-                    parser.description += f'\n\t{target_name} - {settings["help"]}'
-                    should_be_required = True
-                    if settings.get("default") and settings.get("default") not in argument_values.values():
-                        should_be_required = False
-                        parser.set_defaults(**{f"{target_name}": settings["default"]})
-                        argument_values[target_name] = settings["default"]
-                    mutex_group = parser.add_mutually_exclusive_group(
-                        required=should_be_required
-                    )
-                    for value in argument_values.items():
-                        mutex_group.add_argument(
-                            f"--{make_kebab_case(value[0])}",
-                            f"-{make_kebab_case(value[0])[0]}",
-                            dest=target_name,
-                            action="store_const",
-                            const=value[1],
-                            help=f"Sets {target_name} to {value[1]}",
-                        )
-                elif isinstance(argument_values, list):
-                    if settings.get("default") and settings.get("default") not in argument_values:
-                        argument_values.append(settings["default"])
-                    if isinstance(name, list):
-                        parser.add_argument(
-                            *name, **settings, choices=sorted(argument_values)
-                        )
-                    else:
-                        parser.add_argument(
-                            name, **settings, choices=sorted(argument_values)
-                        )
-                elif isinstance(argument_values, set):
-                    parser.description += f'\n\t{target_name} - {settings["help"]}'
-                    should_be_required = True
-
-                    if settings.get("default") and settings.get("default") not in argument_values:
-                        should_be_required = False
-                        parser.set_defaults(**{f"{target_name}": settings["default"]})
-                        argument_values.add(settings["default"])
+        if func_data is None:
+            func_data = self._registry.for_function(func)
+        if spec is None:
+            spec = self._get_spec(func_data or FunctionData(func))
+        apply_parser_spec(parser, spec)
+        if self._config is not None and func_data is not None:
+            # pylint: disable=protected-access
+            from scripto.Config import apply_config
 
-                    mutex_group = parser.add_mutually_exclusive_group(
-                        required=should_be_required
-                    )
-                    for value in argument_values:
-                        mutex_group.add_argument(
-                            f"--{make_kebab_case(value)}",
-                            f"-{make_kebab_case(value)[0]}",
-                            dest=target_name,
-                            action="store_const",
-                            const=value,
-                            help=f"Sets {target_name} to {value}",
-                        )
-            else:
-                if isinstance(name, list):
-                    parser.add_argument(*name, **settings)
-                else:
-                    parser.add_argument(name, **settings)
+            command = func_data.command_name()
+            values = self._config.values(
+                script_name(), command, [action.dest for action in parser._actions]
+            )
+            self._effective_config[command] = apply_config(parser, values)
         if self._use_logger:
             add_logging_flags(parser)
-        parser.set_defaults(func=func)
+        parser.set_defaults(func=func, **{RECORD_DEST: func_data})
+
+    def register_lazy(
+        self, target: str, /, name=None, aliases: list[str] = None, summary: str = None, **config_kwargs
+    ) -> None:
+        """
+        Registers a function by its import target, without importing it.
+        The function is only imported once its command is invoked, and is only validated in deferred mode.
+        Should be used together with lazy mode, as otherwise all functions are imported to build the parser.
+        :param target: The function to register, as "module:qualname", such as "os.path:exists".
+        :param name: An override for the name to expose the function to the CLI with.
+        :param aliases: Possible aliases for the function.
+        :param summary: A short description of the function, shown in the help message without importing it.
+        :param config_kwargs: Argument configurations, as accepted by register.
+        :return: None
+        """
+        if ":" not in target:
+            raise ValueError(f"Expected a target of the form module:qualname, got: {target}")
+        with self._instrumentation.phase("registration"):
+            self._registry.add(
+                FunctionData(
+                    None, name, aliases, target=target, summary=summary, initializers=dict(config_kwargs)
+                )
+            )
+            self._parsers = None
 
-    def register(self, /, name=None, aliases: list[str] = None, **config_kwargs):
+    def register(
+        self,
+        /,
+        name=None,
+        aliases: list[str] = None,
+        cache=False,
+        ttl: float = None,
+        max_entries: int = None,
+        persist=False,
+        pipe_input: str = None,
+        **config_kwargs,
+    ):
         """
         A function for registering new function in your script.
         A parameter with a name as any argument your function takes will be consumed in the following manner:
@@ -186,25 +1161,82 @@ class Scripto:
          In both cases, the defaults set in the signature are also included in the enforced values.
         :param name: An override for the name to expose the function to the CLI with.
         :param aliases: Possible aliases for the function.
+        :param cache: Whether to memoize the results of the function, keyed by its parsed arguments.
+         Meant for pure functions. May also be a ResultCache instance.
+        :param ttl: The amount of seconds cached results are valid for, forever if not given.
+        :param max_entries: The maximal amount of cached results, the least recently used are evicted.
+         Defaults to ResultCache.DEFAULT_MAX_ENTRIES.
+        :param persist: Whether to also store cached results on disk, sharing them between runs.
+        :param pipe_input: The parameter receiving the output of the previous command in --scripto-pipe pipelines,
+         defaults to the first parameter.
         :param config_kwargs:
         :return:
         """
 
         def registration_function(func: FunctionType):
-            @functools.wraps(func)
-            def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
+            is_async = inspect.iscoroutinefunction(func)
+            if is_async:
 
-            try:
-                validate_parameters_in_docstring(func, self._silence)
-            except TypeError as e:
-                raise e
-            self._functions.append(FunctionData(func, name, aliases))
-            self._arg_initializers[func.__name__] = dict(
-                config_arg
-                for config_arg in config_kwargs.items()
-                if config_arg[0] in get_argument_names(func)
-            )
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    return await func(*args, **kwargs)
+
+            else:
+
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    return func(*args, **kwargs)
+
+            with self._instrumentation.phase("registration"):
+                if self._validation == "eager":
+                    validate_parameters_in_docstring(func, self._silence)
+                initializers = dict(
+                    config_arg
+                    for config_arg in config_kwargs.items()
+                    if config_arg[0] in get_argument_names(func)
+                )
+                func_data = FunctionData(
+                    func, name, aliases, is_async, initializers=initializers, pipe_input=pipe_input
+                )
+                if cache:
+                    from scripto.ResultCache import DEFAULT_MAX_ENTRIES, ResultCache, cache_directory, cached
+
+                    func_data.result_cache = (
+                        cache
+                        if isinstance(cache, ResultCache)
+                        else ResultCache(
+                            ttl,
+                            DEFAULT_MAX_ENTRIES if max_entries is None else max_entries,
+                            cache_directory(func) if persist else None,
+                        )
+                    )
+                    func_data.cached_call = cached(func, func_data.result_cache, initializers)
+                self._registry.add(func_data)
+                self._parsers = None
             return wrapper
 
         return registration_function
+
+
+def script_name() -> str:
+    """
+    :return: The name of the running script, without its extension, naming its config files.
+    """
+    return os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+
+def load_script(script_path: str) -> Scripto:
+    """
+    Loads a script without running it, and finds its Scripto instance.
+    :param script_path: The path of the script.
+    :return: The Scripto instance defined by the script.
+    """
+    spec = importlib.util.spec_from_file_location("__scripto_script__", script_path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered like an imported module, so the types the script defines can be found by their module.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    for value in vars(module).values():
+        if isinstance(value, Scripto):
+            return value
+    raise ValueError(f"No Scripto instance found in {script_path}")
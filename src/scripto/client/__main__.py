@@ -0,0 +1,11 @@
+"""
+A thin client, running scripts through a warm daemon.
+Usage: python -m scripto.client path/to/script.py [ARGS...]
+"""
+
+import sys
+
+from scripto.Daemon import client_main
+
+if __name__ == "__main__":
+    sys.exit(client_main(sys.argv[1:]))
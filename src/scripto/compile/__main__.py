@@ -0,0 +1,31 @@
+"""
+A script compiling tool!
+Generates a standalone entry point module from a scripto script, for the lowest possible startup time.
+"""
+
+import os.path
+
+from scripto.app import Scripto, load_script
+
+
+def compile_script(script_path: str, output_path: str = None):
+    """
+    Compiles a script into a standalone module, with the parser definitions spelled out as literal argparse calls.
+    The generated module only imports the function being run, and never inspects functions at startup.
+    The definitions of the script itself are embedded in it, so it doesn't depend on the script's location.
+    :param script_path: The path of the script to compile.
+    :param output_path: The path of the generated module. Defaults to the script's name with a '_compiled' suffix.
+    :return: None
+    """
+    if output_path is None:
+        root, extension = os.path.splitext(script_path)
+        output_path = f"{root}_compiled{extension or '.py'}"
+    source = load_script(script_path).compile(os.path.basename(script_path))
+    with open(output_path, "w", encoding="utf-8") as compiled_file:
+        compiled_file.write(source)
+
+
+if __name__ == "__main__":
+    script = Scripto("Script Compiling Utility")
+    script.register()(compile_script)
+    script.run()
@@ -0,0 +1,37 @@
+"""
+A script linting tool!
+Validates the documentation, annotations and parsers of all the commands of scripto scripts in one batch,
+for running in CI while the scripts themselves run with validation deferred or off.
+"""
+
+import os
+import sys
+
+from scripto.app import VALIDATION_VARIABLE, Scripto, load_script
+
+
+def lint(script_path: str):
+    """
+    Validates all commands of a script, printing a report of the issues found.
+    Exits with a non-zero code if any issue was found, so it can fail a CI pipeline.
+    :param script_path: The path of the script to lint.
+    :return: None
+    """
+    # Validating all commands below at once, rather than as they are registered.
+    os.environ[VALIDATION_VARIABLE] = "off"
+    issues = load_script(script_path).lint()
+    if not issues:
+        print(f"{script_path}: OK")
+        return
+    print(f"{script_path}: {sum(map(len, issues.values()))} issues in {len(issues)} commands")
+    for command, found in issues.items():
+        print(f"  {command}:")
+        for issue in found:
+            print(f"    {issue}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    script = Scripto("Script Linting Utility")
+    script.register()(lint)
+    script.run()
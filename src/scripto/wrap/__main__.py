@@ -1,69 +1,249 @@
 """
 A module wrapping tool!
+Functions are discovered statically by scanning the source of the wrapped modules, and the generated script
+registers them lazily - a module is only imported once one of its functions is invoked.
 """
 
+import ast
+import importlib
+import importlib.util
+import inspect
 import os.path
+import pkgutil
+from typing import Dict, List, Tuple
 
-MODULE_TEMPLATE = """
+from scripto.DocParser import parse_docstring
+from scripto.FuncUtils import make_kebab_case
+
+SCRIPT_TEMPLATE = """
 from scripto.app import Scripto
-import $MODULE_NAME
-script = Scripto("$CAP_MODULE_NAME Wrapper", suppress_warnings=True)
 
-functions = [
-    eval(f"$MODULE_NAME.{func}")
-    for func in dir($MODULE_NAME)
-    if eval(f"type($MODULE_NAME.{func})").__name__ == "function" and not func.startswith("_")
+script = Scripto("$CAP_MODULE_NAME Wrapper", suppress_warnings=True, lazy=True)
+
+# Tuples of the import target, command name and summary of every wrapped function.
+COMMANDS = [
+$COMMANDS
 ]
-for func in functions:
-    script.register()(func)
+for target, name, summary in COMMANDS:
+    script.register_lazy(target, name=name, summary=summary)
 script.run()
-
 """
 
-FUNC_TEMPLATE = """
-from scripto.app import Scripto
-import $MODULE_NAME
-script = Scripto("$CAP_MODULE_NAME Wrapper", suppress_warnings=True)
 
-functions = [
-    eval(f"$MODULE_NAME.{func}")
-    for func in dir($MODULE_NAME)
-    if eval(f"type($MODULE_NAME.{func})").__name__ == "function" and not func.startswith("_") and eval(f"$MODULE_NAME.{func}").__name__ == "$FUNC_NAME"
-]
-for func in functions:
-    script.register()(func)
-script.run()
+def _source_path(spec) -> str | None:
+    """
+    Finds the source file of a module without importing it.
+    :param spec: The spec of the module.
+    :return: The path of the source file, or None for modules without Python source (such as extension modules).
+    """
+    if spec is None:
+        return None
+    # Frozen standard library modules keep the path of their source in the loader state.
+    path = getattr(spec.loader_state, "filename", None) or spec.origin
+    if path and path.endswith(".py") and os.path.isfile(path):
+        return path
+    return None
 
-"""
+
+def _summary(docstring: str | None) -> str | None:
+    """
+    :param docstring: The docstring of a function.
+    :return: The first sentence of the description in the docstring, on a single line.
+    """
+    if not docstring:
+        return None
+    description = " ".join(parse_docstring(docstring).description.split())
+    return description.split(". ")[0].rstrip(".") or None
+
+
+def _top_level(body: List[ast.stmt]):
+    """
+    Generates the module level statements, including those nested in if and try blocks.
+    :param body: The statements of the module.
+    :return: Generates the statements.
+    """
+    for node in body:
+        yield node
+        if isinstance(node, ast.If):
+            yield from _top_level(node.body)
+            yield from _top_level(node.orelse)
+        elif isinstance(node, ast.Try):
+            for block in (node.body, node.orelse, node.finalbody, *(h.body for h in node.handlers)):
+                yield from _top_level(block)
+
+
+def _literal_names(node: ast.expr) -> List[str]:
+    try:
+        names = ast.literal_eval(node)
+    except ValueError:
+        return []
+    return [name for name in names if isinstance(name, str)]
+
+
+def scan_module(
+    module_name: str, package: str | None = None, _seen: frozenset = frozenset()
+) -> Dict[str, str | None]:
+    """
+    Statically finds the public functions of a module, without importing it.
+    Functions re-exported through __all__ are followed into the modules they are imported from.
+    Modules without Python source are imported and inspected instead.
+    :param module_name: The name of the module, may be relative to the package.
+    :param package: The package relative module names are resolved against.
+    :return: A mapping of the names of the functions to their summaries.
+    """
+    module_name = importlib.util.resolve_name(module_name, package) if package else module_name
+    if module_name in _seen:
+        return {}
+    spec = importlib.util.find_spec(module_name)
+    path = _source_path(spec)
+    if path is None:
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {module_name!r}")
+        module = importlib.import_module(module_name)
+        return {
+            name: _summary(inspect.getdoc(value))
+            for name, value in vars(module).items()
+            if inspect.isroutine(value) and not name.startswith("_")
+        }
+    with open(path, "rb") as source:
+        tree = ast.parse(source.read(), path)
+    is_package = spec.submodule_search_locations is not None
+    own_package = module_name if is_package else module_name.rpartition(".")[0]
+
+    functions = {}
+    exported = None
+    imported = {}
+    star_imports = []
+    for node in _top_level(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions[node.name] = _summary(ast.get_docstring(node))
+        elif isinstance(node, ast.ImportFrom):
+            source_module = "." * node.level + (node.module or "")
+            for alias in node.names:
+                if alias.name == "*":
+                    star_imports.append(source_module)
+                else:
+                    imported[alias.asname or alias.name] = (source_module, alias.name)
+        elif isinstance(node, (ast.Assign, ast.AugAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(target, ast.Name) and target.id == "__all__" for target in targets):
+                names = _literal_names(node.value)
+                exported = names if isinstance(node, ast.Assign) else (exported or []) + names
+            else:
+                # A name assigned at the module level isn't a function, even if defined as one earlier.
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        functions.pop(target.id, None)
+
+    if exported is None:
+        return {name: summary for name, summary in functions.items() if not name.startswith("_")}
+    seen = _seen | {module_name}
+    result = {}
+    for name in exported:
+        if name in functions:
+            result[name] = functions[name]
+        elif name in imported:
+            source_module, source_name = imported[name]
+            found = _scan_quietly(source_module, own_package, seen)
+            if source_name in found:
+                result[name] = found[source_name]
+        else:
+            for source_module in star_imports:
+                found = _scan_quietly(source_module, own_package, seen)
+                if name in found:
+                    result[name] = found[name]
+                    break
+    return result
+
+
+def _scan_quietly(module_name: str, package: str, seen: frozenset) -> Dict[str, str | None]:
+    """
+    Scans a module a name is re-exported from, treating modules that cannot be found as exporting nothing.
+    """
+    try:
+        return scan_module(module_name, package or None, seen)
+    except (ImportError, SyntaxError, ValueError):
+        return {}
+
+
+def find_commands(module_name: str, recursive: bool = False) -> List[Tuple[str, str, str | None]]:
+    """
+    Finds the functions to wrap in a module, and optionally in all the modules of a package.
+    :param module_name: The name of the module or package.
+    :param recursive: Whether to also wrap the public submodules of a package, recursively.
+    :return: Tuples of the import target, command name and summary of every function.
+     Functions of submodules are named after the module path relative to the package, such as 'sub.module.func'.
+    """
+    commands = [
+        (f"{module_name}:{name}", make_kebab_case(name), summary)
+        for name, summary in scan_module(module_name).items()
+    ]
+    spec = importlib.util.find_spec(module_name)
+    if not recursive or spec.submodule_search_locations is None:
+        return commands
+    for submodule in _submodules(module_name, spec.submodule_search_locations):
+        relative = submodule[len(module_name) + 1 :]
+        try:
+            functions = scan_module(submodule)
+        except (ImportError, SyntaxError) as e:
+            print(f"Skipping {submodule}: {e}")
+            continue
+        commands += [
+            (f"{submodule}:{name}", f"{relative}.{make_kebab_case(name)}", summary)
+            for name, summary in functions.items()
+        ]
+    return commands
+
+
+def _submodules(package_name: str, locations: List[str]):
+    """
+    Finds the public submodules of a package recursively.
+    Unlike pkgutil.walk_packages, the subpackages are found by their directories rather than imported.
+    :param package_name: The name of the package.
+    :param locations: The directories of the package.
+    :return: Generates the full names of the submodules.
+    """
+    for info in pkgutil.iter_modules(locations):
+        if info.name.startswith("_"):
+            continue
+        name = f"{package_name}.{info.name}"
+        yield name
+        if info.ispkg:
+            yield from _submodules(name, [os.path.join(info.module_finder.path, info.name)])
 
 
 def wrap(
     module_name: str,
     output_path: str = os.path.expanduser("~/scripto"),
     function_name: str = None,
+    recursive: bool = False,
 ):
     """
     Automatically generates a script wrapping a module, and places it under a 'scripto' directory in the user's home folder.
     :param module_name: The name of the module to wrap.
     :param output_path: The path to place the script in.
     :param function_name: A single function to wrap within a module. If not supplied wraps the entire module.
+    :param recursive: Whether to wrap all the submodules of a package as well.
     :return: None
     """ ""
     if not (os.path.exists(output_path) and os.path.isdir(output_path)):
         os.makedirs(output_path, exist_ok=True)
     if function_name:
-        with open(os.path.join(output_path, f"{function_name}.py"), "w") as sc_file:
-            named_template = FUNC_TEMPLATE.replace(
-                "$CAP_MODULE_NAME", module_name.upper()
-            )
-            named_template = named_template.replace("$FUNC_NAME", function_name)
-            sc_file.write(named_template.replace("$MODULE_NAME", module_name))
+        functions = scan_module(module_name)
+        commands = [
+            (f"{module_name}:{function_name}", make_kebab_case(function_name), functions.get(function_name))
+        ]
+        if function_name not in functions:
+            print(f"{function_name} was not found in the source of {module_name}, wrapping it anyway.")
+        script_path = os.path.join(output_path, f"{function_name}.py")
     else:
-        with open(os.path.join(output_path, f"auto_{module_name}.py"), "w") as sc_file:
-            named_template = MODULE_TEMPLATE.replace(
-                "$CAP_MODULE_NAME", module_name.upper()
-            )
-            sc_file.write(named_template.replace("$MODULE_NAME", module_name))
+        commands = find_commands(module_name, recursive)
+        script_path = os.path.join(output_path, f"auto_{module_name}.py")
+    with open(script_path, "w", encoding="utf-8") as sc_file:
+        named_template = SCRIPT_TEMPLATE.replace("$CAP_MODULE_NAME", module_name.upper())
+        sc_file.write(
+            named_template.replace("$COMMANDS", "\n".join(f"    {command!r}," for command in commands))
+        )
 
 
 if __name__ == "__main__":